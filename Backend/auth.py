@@ -3,11 +3,16 @@ from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hmac
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 from db import users_collection
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 
 router = APIRouter()
 
@@ -19,17 +24,43 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 RESET_TOKEN_EXPIRE_MINUTES = 15
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+# /stats, /metrics and /model take either METRICS_TOKEN as the bearer (for a
+# Prometheus scraper) or a signed-in user listed in OPS_USER_EMAILS. Signup is
+# open, so being signed in alone is not enough. OPS_ENDPOINTS_PUBLIC opens
+# them up, e.g. on a private network.
+OPS_ENDPOINTS_PUBLIC = os.getenv("OPS_ENDPOINTS_PUBLIC", "false").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+OPS_USER_EMAILS = {email.strip().lower() for email in os.getenv("OPS_USER_EMAILS", "").split(",") if email.strip()}
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
+# bcrypt is deliberately slow; it runs on its own small pool so a burst of
+# logins queues there instead of stalling the event loop.
+bcrypt_executor = ThreadPoolExecutor(max_workers=max(1, BCRYPT_WORKERS), thread_name_prefix="bcrypt")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Principals resolved by get_current_user, keyed by user id. Entries are
+# dropped on logout and password reset, and otherwise expire after the TTL.
+user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL) if AUTH_USER_CACHE_TTL > 0 else None
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def verify_password(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, pwd_context.hash, password)
+
+
+def invalidate_user(user_id: str):
+    if user_cache is not None:
+        user_cache.pop(user_id, None)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -60,10 +91,33 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
 
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id) if user_cache is not None else None
     if user is None:
-        raise credentials_exception
-    return user
+        try:
+            user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"hashed_password": 0})
+        except InvalidId:
+            raise credentials_exception
+        if user is None:
+            raise credentials_exception
+        if user_cache is not None:
+            user_cache[user_id] = user
+    return dict(user)
+
+
+async def require_ops_access(token: str = Depends(optional_oauth2_scheme)):
+    if OPS_ENDPOINTS_PUBLIC:
+        return
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return
+    user = await get_current_user(token)
+    if user.get("email", "").lower() not in OPS_USER_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to view operational data")
 
 def create_password_reset_token(email: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=RESET_TOKEN_EXPIRE_MINUTES)
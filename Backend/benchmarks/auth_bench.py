@@ -0,0 +1,135 @@
+"""Authenticated request throughput and event-loop stalls, before and after.
+
+Run from Backend/ against a test database (MONGO_URI / DB_NAME):
+
+    python -m benchmarks.auth_bench --requests 5000 --concurrency 64 --logins 20
+
+A throwaway user is created and removed afterwards. Two measurements are
+taken in-process through the ASGI app:
+
+* throughput of an endpoint that only depends on get_current_user, with the
+  principal cache disabled (one find_one per request) and enabled;
+* the longest event-loop stall seen by a 1ms ticker while a burst of logins
+  verifies passwords with bcrypt on the loop and on the bcrypt pool.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import numpy as np
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI
+
+import auth
+from auth import create_access_token, get_current_user, pwd_context
+from db import users_collection
+
+
+def probe_app():
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user=Depends(get_current_user)):
+        return {"id": str(user["_id"])}
+
+    return app
+
+
+async def throughput(app, token, requests, concurrency):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/me", headers=headers)
+        queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                t0 = time.perf_counter()
+                response = await client.get("/me", headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+async def loop_stall(verify, hashed, logins):
+    stalls = []
+    running = True
+
+    async def ticker():
+        while running:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - t0 - 0.001)
+
+    task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(verify("bench-password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    running = False
+    await task
+
+    return {
+        "logins_per_s": round(logins / elapsed, 1),
+        "max_loop_stall_ms": round(max(stalls) * 1000, 2) if stalls else None,
+    }
+
+
+async def blocking_verify(plain, hashed):
+    return pwd_context.verify(plain, hashed)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("bench-password")
+    result = await users_collection.insert_one({
+        "full_name": "Benchmark",
+        "email": f"bench-{uuid.uuid4().hex}@example.com",
+        "hashed_password": hashed,
+    })
+    token = create_access_token({"sub": str(result.inserted_id)})
+    app = probe_app()
+
+    try:
+        report = {}
+        auth.user_cache = None
+        report["auth_uncached"] = await throughput(app, token, args.requests, args.concurrency)
+        auth.user_cache = TTLCache(maxsize=auth.AUTH_USER_CACHE_SIZE, ttl=max(auth.AUTH_USER_CACHE_TTL, 60))
+        report["auth_cached"] = await throughput(app, token, args.requests, args.concurrency)
+
+        report["bcrypt_on_loop"] = await loop_stall(blocking_verify, hashed, args.logins)
+        report["bcrypt_pool"] = await loop_stall(auth.verify_password, hashed, args.logins)
+    finally:
+        await users_collection.delete_one({"_id": result.inserted_id})
+
+    for name, entry in report.items():
+        print(f"{name:<15} " + " ".join(f"{key}={value}" for key, value in entry.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+"""Query-embedding accuracy and latency: current path vs the batched engine.
+
+Run from Backend/ after ingesting the corpus and exporting the ONNX model:
+
+    python -m utils.ingest --target mmap
+    python -m utils.embedding_engine --out embedding_onnx
+    python -m benchmarks.embedding_bench --onnx embedding_onnx --queries 512 --concurrency 32
+
+Recall: the corpus is embedded once with sentence-transformers (or taken
+from the ingest state). Each query's top-k chunks are found with the
+reference query embedding and with the candidate's; recall@k is the overlap.
+Queries are the opening words of random corpus chunks unless --query-file
+gives one query per line.
+
+Latency and throughput are measured at the given concurrency for:
+
+* current: one sentence-transformers call per query in asyncio.to_thread,
+  as chatbot_utils did before the engine;
+* batched-<backend>: queries coalesced by a MicroBatcher into one forward
+  pass on a single dedicated thread, for sentence-transformers and, with
+  --onnx, the exported model.
+
+The exit status is 1 when recall@k falls below --min-recall.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from utils.batching import MicroBatcher
+from utils.embedding_engine import OnnxEncoder, SentenceTransformerEncoder, EMBEDDING_MAX_BATCH, EMBEDDING_BATCH_WINDOW_MS
+from utils.ingest import CHUNKS_FILE, VECTORS_FILE, VECTOR_INGEST_STATE_DIR, VECTOR_INDEX_DIR
+from utils.vector_index import TEXTS_FILE
+
+
+def load_corpus(state_dir, index_dir, reference):
+    state_chunks = os.path.join(state_dir, CHUNKS_FILE)
+    if os.path.exists(state_chunks):
+        with open(state_chunks) as f:
+            texts = [chunk["text"] for chunk in json.load(f)["chunks"]]
+        vectors = np.load(os.path.join(state_dir, VECTORS_FILE))
+    else:
+        with open(os.path.join(index_dir, TEXTS_FILE)) as f:
+            texts = json.load(f)
+        vectors = np.concatenate([reference.encode(texts[i:i + 256]) for i in range(0, len(texts), 256)])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return texts, vectors / np.where(norms == 0, 1, norms)
+
+
+def make_queries(texts, count, rng, query_file=None):
+    if query_file:
+        with open(query_file) as f:
+            return [line.strip() for line in f if line.strip()][:count]
+    return [" ".join(rng.choice(texts).split()[:rng.randint(6, 16)]) for _ in range(count)]
+
+
+def top_k(corpus, queries, k):
+    queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_report(corpus, reference_vectors, candidate_vectors, k):
+    expected = top_k(corpus, reference_vectors, k)
+    found = top_k(corpus, candidate_vectors, k)
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(expected, found)]
+    cosine = np.sum(reference_vectors * candidate_vectors, axis=1) / (
+        np.linalg.norm(reference_vectors, axis=1) * np.linalg.norm(candidate_vectors, axis=1))
+    return {
+        f"recall_at_{k}": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(expected[:, 0] == found[:, 0])), 4),
+        "mean_cosine_to_reference": round(float(cosine.mean()), 5),
+        "min_cosine_to_reference": round(float(cosine.min()), 5),
+    }
+
+
+def latency_report(latencies, elapsed):
+    values = np.array(latencies) * 1000
+    return {
+        "queries": len(values),
+        "qps": round(len(values) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+async def drive(embed, queries, concurrency):
+    pending = list(queries)
+    latencies = []
+
+    async def client():
+        while pending:
+            query = pending.pop()
+            t0 = time.perf_counter()
+            await embed(query)
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latency_report(latencies, time.perf_counter() - started)
+
+
+async def current_path(encoder, queries, concurrency):
+    return await drive(lambda query: asyncio.to_thread(encoder.encode, [query]), queries, concurrency)
+
+
+async def batched_path(encoder, queries, concurrency, max_batch, window_ms):
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-bench")
+
+    async def handler(texts):
+        return list(await asyncio.get_running_loop().run_in_executor(executor, encoder.encode, texts))
+
+    batcher = MicroBatcher(handler, max_batch_size=max_batch, max_wait_ms=window_ms)
+    try:
+        report = await drive(batcher.submit, queries, concurrency)
+    finally:
+        executor.shutdown()
+    stats = batcher.stats()
+    report["avg_batch_size"] = stats["avg_batch_size"]
+    report["largest_batch"] = stats["largest_batch"]
+    return report
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    reference = SentenceTransformerEncoder()
+    candidates = {"sentence-transformers": reference}
+    if args.onnx:
+        candidates["onnx"] = OnnxEncoder(args.onnx, threads=args.threads)
+
+    texts, corpus = load_corpus(args.state, args.index, reference)
+    queries = make_queries(texts, args.queries, rng, args.query_file)
+    report = {"corpus": len(texts), "queries": len(queries), "k": args.k, "accuracy": {}, "latency": {}}
+
+    reference_vectors = reference.encode(queries)
+    for name, encoder in candidates.items():
+        if encoder is not reference:
+            report["accuracy"][name] = recall_report(corpus, reference_vectors, encoder.encode(queries), args.k)
+
+    for encoder in candidates.values():
+        encoder.encode(queries[:8])
+    report["latency"]["current"] = await current_path(reference, queries, args.concurrency)
+    for name, encoder in candidates.items():
+        report["latency"][f"batched-{name}"] = await batched_path(
+            encoder, queries, args.concurrency, args.max_batch, args.window_ms)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--onnx", help="exported model directory to compare")
+    parser.add_argument("--state", default=VECTOR_INGEST_STATE_DIR)
+    parser.add_argument("--index", default=VECTOR_INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--query-file")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=EMBEDDING_MAX_BATCH)
+    parser.add_argument("--window-ms", type=float, default=EMBEDDING_BATCH_WINDOW_MS)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0: default)")
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"corpus={report['corpus']} queries={report['queries']} k={report['k']}")
+    for section in ("accuracy", "latency"):
+        for name, entry in report[section].items():
+            print(f"{section:<8} {name:<30} " + " ".join(f"{key}={value}" for key, value in entry.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [name for name, entry in report["accuracy"].items() if entry[f"recall_at_{args.k}"] < args.min_recall]
+    if failed:
+        print(f"Recall below {args.min_recall} for: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Check the compiled featurizer and folded scaler against the pandas pipeline.
+
+Run from Backend/ with the production model available:
+
+    python -m benchmarks.featurizer_parity --rows 50000
+
+Every path must reproduce the reference (DataFrame -> RobustScaler ->
+booster) bit for bit: probabilities and contributions are compared with
+np.array_equal, not a tolerance. Inputs cover the realistic ranges, values
+next to every split threshold, and out-of-range integers. Exits non-zero on
+any mismatch and prints single-row and batch latency for each path.
+"""
+import argparse
+import json
+import sys
+import time
+import numpy as np
+
+from models import LoanApplication
+from utils.inference_engine import CompiledModel, fold_scaler, boundary_probe, native_scores
+from utils.loan_predictor_utils import build_feature_frame
+
+EDUCATION = ['Not Graduate', 'Graduate']
+
+
+def applications_from_rows(rows):
+    return [
+        LoanApplication(
+            no_of_dependents=int(row[0]),
+            education=EDUCATION[int(row[1]) % 2],
+            self_employed=bool(row[2]),
+            income_annum=int(row[3]),
+            loan_amount=int(row[4]),
+            loan_term=int(row[5]),
+            cibil_score=int(row[6])
+        )
+        for row in rows
+    ]
+
+
+def parity_rows(compiled, count, seed=0):
+    rng = np.random.default_rng(seed)
+    realistic = np.column_stack([
+        rng.integers(0, 6, count),
+        rng.integers(0, 2, count),
+        rng.integers(0, 2, count),
+        rng.integers(2, 100, count) * 100000 + rng.integers(-50000, 50000, count),
+        rng.integers(3, 395, count) * 100000 + rng.integers(-50000, 50000, count),
+        rng.integers(1, 11, count) * 2,
+        rng.integers(300, 901, count),
+    ])
+    extreme = np.column_stack([
+        rng.integers(0, 50, count // 10),
+        rng.integers(0, 2, count // 10),
+        rng.integers(0, 2, count // 10),
+        rng.integers(0, 10 ** 9, count // 10),
+        rng.integers(0, 10 ** 9, count // 10),
+        rng.integers(0, 100, count // 10),
+        rng.integers(0, 1000, count // 10),
+    ])
+    _, _, boundaries = fold_scaler(compiled.booster, compiled.center, compiled.scale)
+    boundary = boundary_probe(boundaries, compiled.center)
+    boundary[:, 1:3] = np.clip(boundary[:, 1:3], 0, 1)
+    return np.vstack([realistic, extreme, boundary]).astype(np.int64)
+
+
+def paths(pipeline, compiled, folded):
+    scaler = pipeline.named_steps['scaler']
+    booster = pipeline.named_steps['model'].get_booster()
+    return {
+        "pandas": lambda applications: native_scores(booster, scaler.transform(build_feature_frame(applications))),
+        "compiled": lambda applications: compiled.scores(compiled.encode(applications)),
+        "folded": lambda applications: folded.scores(folded.encode(applications)),
+    }
+
+
+def latency(score, applications, batch_size, repeats):
+    batches = [applications[i:i + batch_size] for i in range(0, len(applications) - batch_size + 1, batch_size)][:repeats]
+    score(batches[0])
+    timings = []
+    for batch in batches:
+        t0 = time.perf_counter()
+        score(batch)
+        timings.append(time.perf_counter() - t0)
+    timings = np.array(timings) * 1000
+    return round(float(np.percentile(timings, 50)), 4), round(float(np.percentile(timings, 99)), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    from utils.loader import model_state
+    pipeline, _, model_info = model_state.get()
+    compiled = CompiledModel(pipeline)
+    folded = CompiledModel(pipeline, fold=True)
+    if folded.folded is None:
+        raise SystemExit("The scaler could not be folded into this model")
+
+    applications = applications_from_rows(parity_rows(compiled, args.rows))
+    scorers = paths(pipeline, compiled, folded)
+    expected = scorers["pandas"](applications)
+
+    report = {"model_version": str(getattr(model_info, "version", None)), "rows": len(applications), "paths": {}}
+    failed = False
+    for name, scorer in scorers.items():
+        probabilities, contributions = scorer(applications)
+        exact = np.array_equal(probabilities, expected[0]) and np.array_equal(contributions, expected[1])
+        failed |= not exact
+        entry = {
+            "exact": exact,
+            "mismatched_rows": int(np.sum(
+                (probabilities != expected[0]) | np.any(contributions != expected[1], axis=1)
+            )),
+        }
+        for batch_size in args.batch_sizes:
+            p50, p99 = latency(scorer, applications, batch_size, args.repeats)
+            entry[f"batch_{batch_size}"] = {"p50_ms": p50, "p99_ms": p99}
+        report["paths"][name] = entry
+        timings = " ".join(
+            f"batch={size}: p50={entry[f'batch_{size}']['p50_ms']:.3f}ms p99={entry[f'batch_{size}']['p99_ms']:.3f}ms"
+            for size in args.batch_sizes
+        )
+        print(f"{name:>8} exact={exact} mismatched={entry['mismatched_rows']} {timings}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Offline load test of main:app with local stand-ins for MongoDB and the LLM.
+
+Run from Backend/:
+
+    python -m benchmarks.load_test --mix default --users 32 --duration 60 --output results.json
+    python -m benchmarks.load_test --baseline results.json --tolerance 0.15
+
+The app is driven in-process through its ASGI interface, with every
+collection in db.py replaced by benchmarks.memory_db and LLM_BASE_URL
+pointed at a benchmarks.stub_llm subprocess (--no-stub keeps the configured
+LLM). The model, SHAP explainer, embeddings and vector store are the real
+ones, so MLflow or an exported snapshot (MODEL_SNAPSHOT_OFFLINE=true) and
+the vector store must be available; drop "chat" from the mix to run without
+the retriever.
+
+Each virtual user signs up and logs in, then sends requests drawn from the
+mix until --duration or --requests runs out. --isolated adds one phase per
+endpoint so RSS growth can be attributed. The report has p50/p95/p99
+latency, RPS, error counts and RSS per endpoint, micro-benchmarks of
+predict_with_shap, CIBILScoreCalculator and custom_retriever, and the app's
+/stats at the end. With --baseline, p95 and RPS are compared against an
+earlier report and the exit status is 1 on a regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+import numpy as np
+
+MIXES = {
+    "default": {"predict": 30, "calculate_cibil": 20, "history_loan": 10, "history_cibil": 8,
+                "history_summary": 10, "chat": 15, "login": 7},
+    "inference": {"predict": 60, "calculate_cibil": 40},
+    "browse": {"history_loan": 35, "history_cibil": 30, "history_summary": 30, "login": 5},
+    "chat": {"chat": 100},
+}
+
+CHAT_QUERIES = (
+    "How can I improve my credit score?",
+    "What is a good debt to income ratio?",
+    "Should I pay off my credit card or my personal loan first?",
+    "How does loan tenure affect the EMI?",
+    "What documents are needed for a home loan?",
+    "Does checking my own credit score lower it?",
+    "What is the difference between secured and unsecured loans?",
+    "How long do late payments stay on my credit report?",
+)
+
+
+def rss_mb():
+    import psutil
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(args):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.stub_llm", "--port", str(port),
+        "--latency-ms", str(args.llm_latency_ms), "--tokens", str(args.llm_tokens),
+        "--token-ms", str(args.llm_token_ms), "--error-rate", str(args.llm_error_rate),
+    ])
+    import httpx
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/v1/stats", timeout=0.5)
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    else:
+        process.kill()
+        raise RuntimeError("stub LLM server did not start")
+    return process, f"http://127.0.0.1:{port}/v1"
+
+
+def loan_application(rng):
+    return {
+        "no_of_dependents": rng.randint(0, 5),
+        "education": rng.choice(["Graduate", "Not Graduate"]),
+        "self_employed": rng.random() < 0.3,
+        "income_annum": rng.randrange(200_000, 10_000_000, 100_000),
+        "loan_amount": rng.randrange(300_000, 40_000_000, 100_000),
+        "loan_term": rng.choice([2, 4, 6, 8, 10, 12, 14, 16, 18, 20]),
+        "cibil_score": rng.randint(300, 900),
+    }
+
+
+def cibil_request(rng):
+    return {
+        "on_time_payments_percent": round(rng.uniform(60, 100), 1),
+        "days_late_avg": round(rng.uniform(0, 30), 1),
+        "utilization_percent": round(rng.uniform(0, 100), 1),
+        "credit_age_years": round(rng.uniform(0, 20), 1),
+        "num_secured_loans": rng.randint(0, 3),
+        "num_unsecured_loans": rng.randint(0, 4),
+        "has_credit_card": rng.random() < 0.7,
+        "num_inquiries_6months": rng.randint(0, 6),
+        "num_new_accounts_6months": rng.randint(0, 3),
+    }
+
+
+class VirtualUser:
+    def __init__(self, client, rng):
+        self.client = client
+        self.rng = rng
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.password = "load-test-password"
+        self.headers = {}
+
+    async def signup(self):
+        return await self.client.post("/signup", json={
+            "full_name": "Load Test", "email": self.email, "password": self.password
+        })
+
+    async def login(self):
+        response = await self.client.post("/login", json={"email": self.email, "password": self.password})
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def predict(self):
+        return await self.client.post("/predict", json=loan_application(self.rng), headers=self.headers)
+
+    async def calculate_cibil(self):
+        return await self.client.post("/calculate_cibil", json=cibil_request(self.rng), headers=self.headers)
+
+    async def history_loan(self):
+        return await self.client.get("/history/loan", params={"view": "summary"}, headers=self.headers)
+
+    async def history_cibil(self):
+        return await self.client.get("/history/cibil", params={"view": "summary"}, headers=self.headers)
+
+    async def history_summary(self):
+        return await self.client.get("/history/summary", headers=self.headers)
+
+    async def chat(self):
+        return await self.client.post("/chat", params={"query": self.rng.choice(CHAT_QUERIES)}, headers=self.headers)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def call(self, name, request):
+        started = time.perf_counter()
+        try:
+            response = await request()
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if failed:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        for name, values in sorted(self.latencies.items()):
+            values = np.array(values) * 1000
+            report[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(float(np.percentile(values, 50)), 3),
+                "p95_ms": round(float(np.percentile(values, 95)), 3),
+                "p99_ms": round(float(np.percentile(values, 99)), 3),
+                "max_ms": round(float(values.max()), 3),
+            }
+        return report
+
+
+class RSSSampler:
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.start = self.peak = rss_mb()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, rss_mb())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.end = rss_mb()
+        self.peak = max(self.peak, self.end)
+
+    def report(self):
+        return {"rss_start_mb": round(self.start, 1), "rss_peak_mb": round(self.peak, 1),
+                "rss_end_mb": round(self.end, 1)}
+
+
+async def run_phase(users, mix, duration, requests):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    remaining = [requests]
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker(user):
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if requests:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            name = user.rng.choices(names, weights)[0]
+            await recorder.call(name, getattr(user, name))
+
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        elapsed = time.perf_counter() - started
+    return {"elapsed_s": round(elapsed, 3), **rss.report(),
+            "total_rps": round(sum(map(len, recorder.latencies.values())) / elapsed, 2),
+            "endpoints": recorder.summary(elapsed)}
+
+
+def timed(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return latency_report(latencies)
+
+
+def latency_report(latencies):
+    values = np.array(latencies) * 1000
+    return {
+        "iterations": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "ops_per_s": round(len(values) / (values.sum() / 1000), 1),
+    }
+
+
+async def micro_benchmarks(iterations, include_retriever):
+    from models import CIBILScoreRequest, LoanApplication
+    from utils.cibil_utils import CIBILScoreCalculator
+    from utils.loan_predictor_utils import predict_with_shap, predict_batch_with_shap
+
+    rng = random.Random(7)
+    report = {}
+    applications = [LoanApplication(**loan_application(rng)) for _ in range(64)]
+
+    latencies = []
+    await predict_with_shap(applications[0])
+    for index in range(iterations):
+        t0 = time.perf_counter()
+        await predict_with_shap(applications[index % len(applications)])
+        latencies.append(time.perf_counter() - t0)
+    report["predict_with_shap"] = latency_report(latencies)
+    report["predict_batch_with_shap_x1"] = timed(lambda: predict_batch_with_shap(applications[:1]), iterations)
+    report["predict_batch_with_shap_x64"] = timed(lambda: predict_batch_with_shap(applications), max(1, iterations // 10))
+
+    calculator = CIBILScoreCalculator()
+    request = CIBILScoreRequest(**cibil_request(rng))
+    report["cibil_calculate_score"] = timed(lambda: calculator.calculate_score(request), iterations)
+
+    if include_retriever:
+        try:
+            from utils import chatbot_utils
+            # Fresh texts miss the retrieval cache, so this times embedding
+            # plus search; the repeated query measures the cached path.
+            queries = iter(f"{rng.choice(CHAT_QUERIES)} ({index})" for index in range(iterations * 2))
+            report["custom_retriever_cold"] = timed(lambda: chatbot_utils.custom_retriever(next(queries)), iterations)
+            chatbot_utils.custom_retriever(CHAT_QUERIES[0])
+            report["custom_retriever_cached"] = timed(lambda: chatbot_utils.custom_retriever(CHAT_QUERIES[0]), iterations)
+        except Exception as e:
+            report["custom_retriever_cold"] = {"error": str(e)}
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Regressions in p95 latency or throughput beyond the tolerance."""
+    regressions = []
+
+    def check(label, current, previous):
+        if not previous or "error" in previous or "error" in current:
+            return
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        for key in ("rps", "ops_per_s"):
+            if key in current and current[key] < previous.get(key, 0) * (1 - tolerance):
+                regressions.append(f"{label}: {key} {previous[key]} -> {current[key]}")
+
+    for phase, result in report["phases"].items():
+        for name, current in result["endpoints"].items():
+            check(f"{phase}/{name}", current, baseline.get("phases", {}).get(phase, {}).get("endpoints", {}).get(name))
+    for name, current in report["micro"].items():
+        check(f"micro/{name}", current, baseline.get("micro", {}).get(name))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def run(args):
+    from benchmarks import memory_db
+    memory_db.install()
+    import httpx
+    from main import app, lifespan
+    from utils.resources import warm_all
+
+    rng = random.Random(args.seed)
+    mix = MIXES[args.mix]
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "phases": {},
+    }
+
+    async with lifespan(app):
+        await asyncio.to_thread(warm_all)
+        report["meta"]["rss_after_warmup_mb"] = round(rss_mb(), 1)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+            users = [VirtualUser(client, random.Random(rng.random())) for _ in range(args.users)]
+            setup = Recorder()
+            started = time.perf_counter()
+            await asyncio.gather(*(setup.call("signup", user.signup) for user in users))
+            await asyncio.gather(*(setup.call("login", user.login) for user in users))
+            report["phases"]["setup"] = {"endpoints": setup.summary(time.perf_counter() - started)}
+
+            report["phases"]["mixed"] = await run_phase(users, mix, args.duration, args.requests)
+            if args.isolated:
+                for name in mix:
+                    report["phases"][name] = await run_phase(users, {name: 1}, args.isolated_duration, 0)
+
+            report["app_stats"] = (await client.get(
+                "/stats", headers={"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"}
+            )).json()
+
+        if not args.skip_micro:
+            report["micro"] = await micro_benchmarks(args.micro_iterations, "chat" in mix)
+        else:
+            report["micro"] = {}
+    return report
+
+
+def print_report(report):
+    for phase, result in report["phases"].items():
+        extra = f" rss_peak={result['rss_peak_mb']}MB total_rps={result['total_rps']}" if "rss_peak_mb" in result else ""
+        print(f"[{phase}]{extra}")
+        for name, entry in result["endpoints"].items():
+            print(f"  {name:<16} " + " ".join(f"{key}={value}" for key, value in entry.items()))
+    if report["micro"]:
+        print("[micro]")
+        for name, entry in report["micro"].items():
+            print(f"  {name:<28} " + " ".join(f"{key}={value}" for key, value in entry.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--users", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds for the mixed phase (0: use --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="total requests for the mixed phase")
+    parser.add_argument("--isolated", action="store_true", help="also run each endpoint on its own")
+    parser.add_argument("--isolated-duration", type=float, default=10)
+    parser.add_argument("--micro-iterations", type=int, default=500)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-stub", action="store_true", help="use the configured LLM_BASE_URL")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--llm-token-ms", type=float, default=15)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the report as JSON here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("one of --duration or --requests is required")
+
+    # The model watcher would poll the registry mid-run and swap models.
+    os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+    # The virtual users are ordinary accounts; /stats is read with the
+    # scraper token instead.
+    os.environ["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN") or uuid.uuid4().hex
+    stub = None
+    if not args.no_stub:
+        stub, base_url = start_stub(args)
+        os.environ["LLM_BASE_URL"] = base_url
+        os.environ["LLM_API_KEY"] = "stub"
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
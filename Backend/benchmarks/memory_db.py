@@ -0,0 +1,289 @@
+"""In-memory stand-ins for the Motor collections in db.py.
+
+Only what the app uses is implemented: equality, $lt/$lte/$gt/$gte/$in/$ne
+and $or filters, inclusion/exclusion projections, sort/limit cursors, and the
+$set/$setOnInsert/$inc/$min/$max/$push($each, $slice) update operators on
+dotted paths, plus drop/rename for swapping in a rebuilt collection. Call install() before anything imports main, routes or utils,
+since those bind the collections with `from db import ...`.
+"""
+import asyncio
+import copy
+from types import SimpleNamespace
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+COLLECTIONS = ("users_collection", "refresh_tokens_collection", "loan_history_collection",
+               "cibil_history_collection", "explanation_cache_collection", "jobs_collection",
+               "rollups_collection")
+
+_MISSING = object()
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _parent(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    return doc, parts[-1]
+
+
+def _compare(value, operator, operand):
+    if operator == "$ne":
+        return value is _MISSING or value != operand
+    if operator == "$in":
+        return value is not _MISSING and value in operand
+    if value is _MISSING or value is None:
+        return False
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    raise NotImplementedError(f"filter operator {operator}")
+
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif value is _MISSING or value != condition:
+            return False
+    return True
+
+
+def project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include = {key for key, flag in projection.items() if flag and key != "_id"}
+    if include:
+        projected = {"_id": doc["_id"]} if projection.get("_id", 1) and "_id" in doc else {}
+        for path in include:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                parent, leaf = _parent(projected, path)
+                parent[leaf] = value
+        return projected
+    for path, flag in projection.items():
+        if not flag:
+            parent = _get(doc, path.rsplit(".", 1)[0]) if "." in path else doc
+            if isinstance(parent, dict):
+                parent.pop(path.rsplit(".", 1)[-1], None)
+    return doc
+
+
+def apply_update(doc, update, inserting=False):
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for path, operand in fields.items():
+            parent, leaf = _parent(doc, path)
+            current = parent.get(leaf, _MISSING)
+            if operator in ("$set", "$setOnInsert"):
+                parent[leaf] = copy.deepcopy(operand)
+            elif operator == "$inc":
+                parent[leaf] = (0 if current is _MISSING else current) + operand
+            elif operator == "$min":
+                parent[leaf] = operand if current is _MISSING else min(current, operand)
+            elif operator == "$max":
+                parent[leaf] = operand if current is _MISSING else max(current, operand)
+            elif operator == "$push":
+                values = list(operand["$each"]) if isinstance(operand, dict) and "$each" in operand else [operand]
+                items = ([] if current is _MISSING else current) + values
+                if isinstance(operand, dict) and "$slice" in operand:
+                    limit = operand["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                parent[leaf] = items
+            else:
+                raise NotImplementedError(f"update operator {operator}")
+
+
+def _sort_key(field):
+    # Missing fields sort first, as in MongoDB.
+    def key(doc):
+        value = _get(doc, field)
+        return (False, 0) if value is _MISSING else (True, value)
+    return key
+
+
+class MemoryCursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        keys = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            self._docs.sort(key=_sort_key(field), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def _results(self):
+        docs = self._docs[:self._limit] if self._limit else self._docs
+        return [project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+            await asyncio.sleep(0)
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self)
+        return self._collections[name]
+
+
+class MemoryCollection:
+    def __init__(self, name, database=None):
+        self.name = name
+        self.database = database if database is not None else MemoryDatabase()
+        self.database._collections.setdefault(name, self)
+        self._docs = {}
+
+    def _find(self, query):
+        if query and "_id" in query and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc is not None and matches(doc, query) else []
+        return [doc for doc in self._docs.values() if matches(doc, query)]
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"duplicate _id {doc['_id']}")
+        self._docs[doc["_id"]] = copy.deepcopy(doc)
+        return doc["_id"]
+
+    def _upsert(self, query, update):
+        doc = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+        apply_update(doc, update, inserting=True)
+        return self._insert(doc)
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", str(keys))
+
+    async def count_documents(self, query):
+        return len(self._find(query))
+
+    async def find_one(self, query=None, projection=None):
+        found = self._find(query)
+        return project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None):
+        return MemoryCursor(self._find(query), projection)
+
+    async def insert_one(self, doc):
+        return SimpleNamespace(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        inserted = []
+        for index, doc in enumerate(docs):
+            try:
+                inserted.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted)
+
+    async def update_one(self, query, update, upsert=False):
+        found = self._find(query)
+        if found:
+            apply_update(found[0], update)
+            return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        upserted_id = self._upsert(query, update) if upsert else None
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=upserted_id)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        found = self._find(query)
+        if not found:
+            if not upsert:
+                return None
+            doc = self._docs[self._upsert(query, update)]
+            return project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        before = project(found[0], projection)
+        apply_update(found[0], update)
+        return project(found[0], projection) if return_document == ReturnDocument.AFTER else before
+
+    async def replace_one(self, query, replacement, upsert=False):
+        found = self._find(query)
+        if found:
+            replacement = dict(replacement, _id=found[0]["_id"])
+            self._docs[found[0]["_id"]] = copy.deepcopy(replacement)
+        elif upsert:
+            self._insert(dict(replacement, **{k: v for k, v in query.items() if not isinstance(v, dict)}))
+        return SimpleNamespace(matched_count=len(found[:1]))
+
+    async def delete_one(self, query):
+        found = self._find(query)
+        if found:
+            del self._docs[found[0]["_id"]]
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query):
+        found = self._find(query)
+        for doc in found:
+            del self._docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def drop(self):
+        self._docs = {}
+
+    async def rename(self, new_name, dropTarget=False):
+        target = self.database[new_name]
+        if target._docs and not dropTarget:
+            raise OperationFailure(f"target namespace {new_name} exists")
+        target._docs, self._docs = self._docs, {}
+        return {"ok": 1}
+
+    async def bulk_write(self, requests, ordered=True):
+        # pymongo's request objects keep their arguments in private slots.
+        for request in requests:
+            await self.update_one(request._filter, request._doc, upsert=request._upsert)
+        return SimpleNamespace(matched_count=len(requests))
+
+
+def install():
+    """Swap every collection in db.py for an in-memory one."""
+    import db
+    database = MemoryDatabase()
+    for attribute in COLLECTIONS:
+        setattr(db, attribute, database[getattr(db, attribute).name])
+    return db
@@ -0,0 +1,131 @@
+"""Compare the Chroma and memory-mapped retriever backends.
+
+Run from Backend/ after exporting the index(es):
+
+    python -m utils.vector_index --out vector_index
+    python -m utils.vector_index --out vector_index_int8 --int8
+    python -m benchmarks.retriever_bench --queries 2000
+
+Each backend is measured in a fresh subprocess so startup time and RSS are
+not polluted by the other. Queries are stored chunk embeddings plus noise, so
+the sentence-transformer model is not needed and only retrieval is timed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+K = 4
+
+
+def rss_mb():
+    import psutil
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def run_worker(backend, location, queries_path):
+    started = time.perf_counter()
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        from utils.vector_index import resolve_directory
+        store = Chroma(persist_directory=resolve_directory(location))
+
+        def search(vector):
+            return [doc.page_content for doc in store.similarity_search_by_vector(vector.tolist(), k=K)]
+    else:
+        from utils.vector_index import MmapVectorIndex
+        index = MmapVectorIndex(location)
+
+        def search(vector):
+            return index.search(vector, K)
+    startup = time.perf_counter() - started
+    rss_after_open = rss_mb()
+
+    queries = np.load(queries_path)
+    search(queries[0])
+    latencies = []
+    results = []
+    for vector in queries:
+        t0 = time.perf_counter()
+        results.append(search(vector))
+        latencies.append(time.perf_counter() - t0)
+    latencies = np.array(latencies) * 1000
+
+    print(json.dumps({
+        "backend": backend,
+        "location": location,
+        "startup_s": round(startup, 4),
+        "rss_after_open_mb": round(rss_after_open, 1),
+        "rss_after_queries_mb": round(rss_mb(), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "results": results,
+    }))
+
+
+def make_queries(index_dir, count, noise, path):
+    from utils.vector_index import MmapVectorIndex
+    index = MmapVectorIndex(index_dir)
+    if index.scales is not None:
+        raise SystemExit("Use a float32 index to generate queries")
+    rng = np.random.default_rng(0)
+    rows = np.asarray(index.matrix[rng.integers(0, len(index), count)])
+    queries = rows + rng.normal(scale=noise, size=rows.shape).astype(np.float32)
+    np.save(path, queries.astype(np.float32))
+
+
+def recall(reference, candidate):
+    hits = sum(len(set(a) & set(b)) for a, b in zip(reference, candidate))
+    return hits / max(1, sum(len(a) for a in reference))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chroma", default="chroma_db")
+    parser.add_argument("--index", default="vector_index")
+    parser.add_argument("--int8-index", default="vector_index_int8")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--output", help="write the report as JSON here")
+    parser.add_argument("--worker", nargs=3, metavar=("BACKEND", "LOCATION", "QUERIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    queries_path = os.path.join(tempfile.mkdtemp(), "queries.npy")
+    make_queries(args.index, args.queries, args.noise, queries_path)
+
+    targets = [("chroma", args.chroma), ("mmap", args.index)]
+    if os.path.exists(args.int8_index):
+        targets.append(("mmap", args.int8_index))
+
+    reports = []
+    for backend, location in targets:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.retriever_bench", "--worker", backend, location, queries_path],
+            check=True, capture_output=True, text=True
+        ).stdout
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+
+    reference = reports[0]["results"]
+    for report in reports:
+        report[f"recall_at_{K}_vs_chroma"] = round(recall(reference, report.pop("results")), 4)
+        print(
+            f"{report['backend']:>6} {report['location']:<20} startup={report['startup_s']:.3f}s "
+            f"rss={report['rss_after_queries_mb']:.0f}MB p50={report['p50_ms']:.3f}ms "
+            f"p99={report['p99_ms']:.3f}ms recall@{K}={report[f'recall_at_{K}_vs_chroma']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Compare the native booster contributions with the joblib SHAP explainer.
+
+Run from Backend/ with the production model available:
+
+    python -m benchmarks.shap_bench --rows 2000 --batch-sizes 1 16 64
+
+Reports probability and contribution parity between the two backends on
+synthetic applicants plus the model watcher's canary rows, per-batch latency
+(p50/p99) and peak traced memory per call, plus the serialized size of the
+explainer artifact.
+
+The joblib explainer is built on background data (interventional SHAP)
+while pred_contribs uses the tree-path-dependent algorithm, so probabilities
+must match to float precision but contributions can only be expected to agree
+closely, with the same sign and ranking for the dominant features. Exits
+non-zero when any parity metric is outside its threshold; only set
+SHAP_BACKEND=native for a model that passes.
+"""
+import argparse
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from utils.inference_engine import score, FEATURES
+from utils.model_watcher import CANARY_ROWS
+
+
+def synthetic_applicants(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'no_of_dependents': rng.integers(0, 6, count),
+        'education': rng.integers(0, 2, count),
+        'self_employed': rng.integers(0, 2, count),
+        'income_annum': rng.integers(2, 100, count) * 100000,
+        'loan_amount': rng.integers(3, 395, count) * 100000,
+        'loan_term': rng.integers(1, 11, count) * 2,
+        'cibil_score': rng.integers(300, 901, count),
+    }, columns=FEATURES)
+
+
+def fixture_applicants(count, seed=0):
+    canary = pd.DataFrame(CANARY_ROWS, columns=FEATURES)
+    return pd.concat([synthetic_applicants(count, seed), canary], ignore_index=True)
+
+
+def parity(pipeline, explainer, frame):
+    native_p, native_c = score(pipeline, explainer, frame, backend="native")
+    reference_p, reference_c = score(pipeline, explainer, frame, backend="explainer")
+    top_native = np.argmax(np.abs(native_c), axis=1)
+    top_reference = np.argmax(np.abs(reference_c), axis=1)
+    signs = np.sign(native_c) == np.sign(reference_c)
+    return {
+        "rows": len(frame),
+        "max_probability_diff": float(np.max(np.abs(native_p - reference_p))),
+        "decision_agreement": float(np.mean((native_p > 0.5) == (reference_p > 0.5))),
+        "max_contribution_diff": float(np.max(np.abs(native_c - reference_c))),
+        "mean_contribution_diff": float(np.mean(np.abs(native_c - reference_c))),
+        "sign_agreement": float(np.mean(signs)),
+        "top_feature_agreement": float(np.mean(top_native == top_reference)),
+    }
+
+
+def parity_failures(report, thresholds):
+    failures = []
+    for metric, (kind, limit) in thresholds.items():
+        value = report[metric]
+        if (kind == "max" and value > limit) or (kind == "min" and value < limit):
+            failures.append(f"{metric}={value:.6g} ({kind} {limit:g})")
+    return failures
+
+
+def latency(pipeline, explainer, frame, backend, batch_size, repeats):
+    batches = [frame.iloc[i:i + batch_size] for i in range(0, len(frame) - batch_size + 1, batch_size)][:repeats]
+    score(pipeline, explainer, batches[0], backend=backend)
+    timings = []
+    for batch in batches:
+        t0 = time.perf_counter()
+        score(pipeline, explainer, batch, backend=backend)
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    score(pipeline, explainer, batches[0], backend=backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.array(timings) * 1000
+    return {
+        "backend": backend,
+        "batch_size": batch_size,
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--max-probability-diff", type=float, default=1e-6)
+    parser.add_argument("--max-contribution-diff", type=float, default=0.05)
+    parser.add_argument("--min-sign-agreement", type=float, default=0.99)
+    parser.add_argument("--min-top-feature-agreement", type=float, default=0.99)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+    thresholds = {
+        "max_probability_diff": ("max", args.max_probability_diff),
+        "decision_agreement": ("min", 1.0),
+        "max_contribution_diff": ("max", args.max_contribution_diff),
+        "sign_agreement": ("min", args.min_sign_agreement),
+        "top_feature_agreement": ("min", args.min_top_feature_agreement),
+    }
+
+    from utils.loader import model_state
+    pipeline, explainer, model_info = model_state.get()
+    if explainer is None:
+        raise SystemExit("The SHAP explainer artifact is needed as the parity reference")
+
+    frame = fixture_applicants(args.rows)
+    report = {
+        "model_version": str(getattr(model_info, "version", None)),
+        "explainer_artifact_kb": round(len(pickle.dumps(explainer)) / 1024, 1),
+        "parity": parity(pipeline, explainer, frame),
+        "latency": [
+            latency(pipeline, explainer, frame, backend, batch_size, args.repeats)
+            for batch_size in args.batch_sizes
+            for backend in ("explainer", "native")
+        ],
+    }
+
+    print(json.dumps(report["parity"], indent=2))
+    print(f"explainer artifact: {report['explainer_artifact_kb']} KB")
+    for entry in report["latency"]:
+        print(
+            f"{entry['backend']:>9} batch={entry['batch_size']:<4} p50={entry['p50_ms']:.3f}ms "
+            f"p99={entry['p99_ms']:.3f}ms peak={entry['peak_alloc_kb']:.0f}KB"
+        )
+
+    failures = parity_failures(report["parity"], thresholds)
+    report["parity_passed"] = not failures
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        print("Native contributions do not match the explainer: " + ", ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""A local stand-in for an OpenAI-compatible chat-completions server.
+
+    python -m benchmarks.stub_llm --port 9000 --latency-ms 300 --tokens 60 --token-ms 15
+
+Point the app at it with LLM_BASE_URL=http://127.0.0.1:9000/v1. Every
+request waits --latency-ms before answering (time to first token when
+streaming), then emits --tokens words --token-ms apart; non-streaming calls
+wait for the whole generation. --error-rate makes that fraction of requests
+fail with a 503 so retries show up in the numbers.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("credit", "score", "loan", "income", "repayment", "history", "ratio", "term",
+         "approval", "utilization", "payments", "improve", "risk", "profile", "debt")
+
+
+def create_app(latency_ms: float = 300, tokens: int = 60, token_ms: float = 15, error_rate: float = 0.0):
+    app = FastAPI()
+    app.state.requests = 0
+
+    def completion_id():
+        return f"chatcmpl-stub-{app.state.requests}"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        if random.random() < error_rate:
+            return JSONResponse({"error": {"message": "stub overloaded"}}, status_code=503)
+
+        words = [random.choice(WORDS) for _ in range(tokens)]
+        if not body.get("stream"):
+            await asyncio.sleep(tokens * token_ms / 1000)
+            return {
+                "id": completion_id(),
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens},
+            }
+
+        async def events():
+            for index, word in enumerate(words):
+                chunk = {"id": completion_id(), "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_ms / 1000)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(args.latency_ms, args.tokens, args.token_ms, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
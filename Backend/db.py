@@ -16,6 +16,9 @@ users_collection = db["users"]
 refresh_tokens_collection = db["refresh_tokens"]
 loan_history_collection = db["loan_history"]
 cibil_history_collection = db["cibil_history"]
+explanation_cache_collection = db["explanation_cache"]
+jobs_collection = db["jobs"]
+rollups_collection = db["user_rollups"]
 
 
 async def store_refresh_token(user_id: str, token: str):
@@ -1,8 +1,48 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import router
+from auth import bcrypt_executor
+from utils.resources import warm_all
+from utils.executor import inference_executor
+from utils.jobs import explanation_jobs
+from utils.llm_gateway import llm_gateway
+from utils.embedding_engine import embedding_executor
+from utils.model_watcher import model_watcher
+from utils.metrics import MetricsMiddleware
+from utils.history import ensure_history_indexes, loan_history_writer, cibil_history_writer
+from db import loan_history_collection, cibil_history_collection
 
-app = FastAPI()
+WARM_ON_STARTUP = os.getenv("WARM_ON_STARTUP", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await ensure_history_indexes(loan_history_collection, cibil_history_collection)
+    except Exception as e:
+        print(f"Warning: could not create history indexes: {e}")
+    # Warm models in the background: the worker serves /login and /healthz
+    # right away while /readyz reports 503 until every resource is loaded.
+    warmup = asyncio.create_task(asyncio.to_thread(warm_all)) if WARM_ON_STARTUP else None
+    model_watcher.start()
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await model_watcher.stop()
+    await explanation_jobs.shutdown()
+    # Jobs may still update buffered records, so the buffers flush after them.
+    await loan_history_writer.close()
+    await cibil_history_writer.close()
+    await llm_gateway.aclose()
+    inference_executor.shutdown(wait=False)
+    embedding_executor.shutdown(wait=False)
+    bcrypt_executor.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
 
 app.add_middleware(
@@ -13,6 +53,7 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
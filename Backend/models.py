@@ -1,4 +1,11 @@
-from pydantic import BaseModel, EmailStr
+import os
+from dotenv import load_dotenv
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
+
+load_dotenv()
+
+PREDICT_BATCH_MAX_APPLICATIONS = int(os.getenv("PREDICT_BATCH_MAX_APPLICATIONS", "1000"))
 
 class LoanApplication(BaseModel):
     no_of_dependents: int
@@ -9,6 +16,23 @@ class LoanApplication(BaseModel):
     loan_term: int
     cibil_score: int
 
+class LoanBatchRequest(BaseModel):
+    applications: List[LoanApplication] = Field(..., min_length=1, max_length=PREDICT_BATCH_MAX_APPLICATIONS)
+    include_explanations: bool = False
+
+class FeatureSweep(BaseModel):
+    feature: Literal['no_of_dependents', 'income_annum', 'loan_amount', 'loan_term', 'cibil_score']
+    values: Optional[List[int]] = None
+    start: Optional[int] = None
+    stop: Optional[int] = None
+    num: Optional[int] = Field(None, ge=1)
+    step: Optional[int] = Field(None, ge=1)
+
+class WhatIfRequest(BaseModel):
+    application: LoanApplication
+    sweeps: List[FeatureSweep] = Field(..., min_length=1, max_length=3)
+    include_shap: bool = False
+
 class CIBILScoreRequest(BaseModel):
     on_time_payments_percent: float
     days_late_avg: float = 0
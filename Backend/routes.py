@@ -1,12 +1,25 @@
 from fastapi import Query, HTTPException, APIRouter, Depends, Response, Request, status
-from models import LoanApplication, CIBILScoreRequest, UserLogin, UserSignup, PasswordResetRequest, PasswordResetConfirm
-from utils.chatbot_utils import chain
-from utils.loan_predictor_utils import get_explanation, predict_with_shap
-from utils.cibil_utils import get_improvement_suggestions, CIBILScoreCalculator
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from models import LoanApplication, LoanBatchRequest, WhatIfRequest, CIBILScoreRequest, UserLogin, UserSignup, PasswordResetRequest, PasswordResetConfirm
+from utils.chatbot_utils import answer_query, stream_answer, chat_cache_stats
+from utils.embedding_engine import embedding_stats
+from utils.loan_predictor_utils import get_explanation, stream_explanation, predict_with_shap, predict_batch_with_shap, predict_batcher, explanation_cache
+from utils.what_if import run_what_if, InvalidSweep
+from utils.cibil_utils import get_improvement_suggestions, stream_improvement_suggestions, CIBILScoreCalculator, suggestion_store
 from utils.email_utils import send_reset_password_email
+from utils.executor import inference_executor, InferenceQueueFull
+from utils.llm_gateway import llm_gateway
+from utils.sse import sse_event, SSE_HEADERS
+from utils.jobs import explanation_jobs, JobQueueFull
+from utils.resources import all_ready, startup_report
+from utils.model_watcher import model_watcher
+from utils.metrics import stage, render, register_stats
+from utils.rollups import get_summary
+from utils.history import history_page, stream_history_ndjson, InvalidCursor, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE, loan_history_writer, cibil_history_writer
 from db import store_refresh_token, get_refresh_token, delete_refresh_token, users_collection, loan_history_collection, cibil_history_collection
-from auth import verify_password, create_access_token, create_refresh_token, get_current_user, SECRET_KEY, ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS, pwd_context, create_password_reset_token
+from auth import verify_password, get_password_hash, invalidate_user, create_access_token, create_refresh_token, get_current_user, require_ops_access, SECRET_KEY, ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS, create_password_reset_token
 from datetime import datetime, timezone
+import asyncio
 from jose import JWTError, jwt
 
 router = APIRouter()
@@ -22,7 +35,7 @@ async def signup(user: UserSignup):
             detail="Email already registered"
         )
 
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await get_password_hash(user.password)
 
     new_user = {
         "full_name": user.full_name,
@@ -43,7 +56,7 @@ async def signup(user: UserSignup):
 @router.post("/login")
 async def login(user: UserLogin, response: Response):
     db_user = await users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    if not db_user or not await verify_password(user.password, db_user["hashed_password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     user_id = str(db_user["_id"])
@@ -88,6 +101,7 @@ async def refresh(request: Request, response: Response):
 @router.post("/logout")
 async def logout(request: Request, response: Response, user=Depends(get_current_user)):
     await delete_refresh_token(str(user["_id"]))
+    invalidate_user(str(user["_id"]))
     response.delete_cookie("refresh_token")
     return {"msg": "Logged out"}
 
@@ -135,27 +149,31 @@ async def reset_password(data: PasswordResetConfirm):
             detail="Token has expired or is invalid"
         )
 
-    hashed_password = pwd_context.hash(data.new_password)
-    result = await users_collection.update_one(
+    hashed_password = await get_password_hash(data.new_password)
+    updated_user = await users_collection.find_one_and_update(
         {"email": email},
-        {"$set": {"hashed_password": hashed_password}}
+        {"$set": {"hashed_password": hashed_password}},
+        projection={"_id": 1}
     )
 
-    if result.matched_count == 0:
+    if updated_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="User not found"
         )
+    invalidate_user(str(updated_user["_id"]))
 
     return {"message": "Password successfully updated. You can now log in with your new password."}
 
 
 @router.post("/predict")
-async def predict_loan_approval(data: LoanApplication, user=Depends(get_current_user)):
+async def predict_loan_approval(data: LoanApplication, defer_explanation: bool = Query(False), user=Depends(get_current_user)):
     try: 
-        prediction, shap_dict = await predict_with_shap(data)
+        with stage("predict"):
+            prediction, shap_dict, model_version = await predict_with_shap(data)
         input_data = data.model_dump() if hasattr(data, "model_dump") else data.model_dump()
-        explanation = await get_explanation(input_data, shap_dict, prediction)
+        with stage("explanation"):
+            explanation = None if defer_explanation else await get_explanation(input_data, shap_dict, prediction)
 
         approve_chances = round(prediction * 100, 2)
 
@@ -167,15 +185,140 @@ async def predict_loan_approval(data: LoanApplication, user=Depends(get_current_
                 "shap_values": shap_dict,
                 "reason": explanation
             },
+            "model_version": model_version,
             "created_at": datetime.now(timezone.utc)
         }
-        await loan_history_collection.insert_one(history_record)
+        with stage("history_write"):
+            history_id = await loan_history_writer.add(history_record)
 
-        return {
+        response = {
             "approve_chances": approve_chances,
             "shap_values": shap_dict,
             "reason": explanation
         }
+        if defer_explanation:
+            async def store_reason(reason):
+                await loan_history_writer.update_one(history_id, {"$set": {"outputs.reason": reason}})
+
+            response["job_id"] = await explanation_jobs.submit(
+                "loan_explanation",
+                str(user["_id"]),
+                lambda: get_explanation(input_data, shap_dict, prediction),
+                store_reason
+            )
+        return response
+    except (InferenceQueueFull, JobQueueFull) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.post("/predict/stream")
+async def predict_loan_approval_stream(data: LoanApplication, user=Depends(get_current_user)):
+    try:
+        with stage("predict"):
+            prediction, shap_dict, model_version = await predict_with_shap(data)
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    input_data = data.model_dump()
+    approve_chances = round(prediction * 100, 2)
+
+    async def events():
+        parts = []
+        try:
+            try:
+                yield sse_event("result", {"approve_chances": approve_chances, "shap_values": shap_dict})
+                async for token in stream_explanation(input_data, shap_dict, prediction):
+                    parts.append(token)
+                    yield sse_event("token", {"content": token})
+            finally:
+                # Recorded even if the client goes away or the explanation
+                # fails mid-stream, with whatever part of the reason was sent.
+                history_record = {
+                    "user_id": str(user["_id"]),
+                    "inputs": input_data,
+                    "outputs": {
+                        "approve_chances": approve_chances,
+                        "shap_values": shap_dict,
+                        "reason": "".join(parts)
+                    },
+                    "model_version": model_version,
+                    "created_at": datetime.now(timezone.utc)
+                }
+                await asyncio.shield(loan_history_writer.add(history_record))
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/predict/batch")
+async def predict_loan_approval_batch(request: LoanBatchRequest, user=Depends(get_current_user)):
+    try:
+        results = await inference_executor.run(predict_batch_with_shap, request.applications)
+        input_rows = [application.model_dump() for application in request.applications]
+
+        if request.include_explanations:
+            explanations = await asyncio.gather(*(
+                get_explanation(input_data, shap_dict, prediction)
+                for input_data, (prediction, shap_dict, _) in zip(input_rows, results)
+            ))
+        else:
+            explanations = [None] * len(results)
+
+        return {
+            "results": [
+                {
+                    "approve_chances": round(prediction * 100, 2),
+                    "shap_values": shap_dict,
+                    "reason": explanation,
+                    "model_version": model_version
+                }
+                for (prediction, shap_dict, model_version), explanation in zip(results, explanations)
+            ]
+        }
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.post("/predict/what-if")
+async def predict_what_if(request: WhatIfRequest, user=Depends(get_current_user)):
+    # Scores the whole scenario grid in one batch; no LLM calls, no history.
+    try:
+        with stage("what_if"):
+            return await inference_executor.run(run_what_if, request)
+    except InvalidSweep as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -183,11 +326,13 @@ async def predict_loan_approval(data: LoanApplication, user=Depends(get_current_
         )
 
 @router.post("/calculate_cibil")
-async def calculate_cibil(request: CIBILScoreRequest, user=Depends(get_current_user)):
+async def calculate_cibil(request: CIBILScoreRequest, defer_suggestions: bool = Query(False), user=Depends(get_current_user)):
     try:
-        score, contributions = calculator.calculate_score(request)
+        with stage("cibil_score"):
+            score, contributions = await inference_executor.run(calculator.calculate_score, request)
         input_data = request.model_dump() if hasattr(request, "model_dump") else request.model_dump()
-        improvement_suggestions = await get_improvement_suggestions(input_data, score, contributions)
+        with stage("suggestions"):
+            improvement_suggestions = None if defer_suggestions else await get_improvement_suggestions(input_data, score, contributions)
         
         history_record = {
             "user_id": str(user["_id"]),
@@ -199,13 +344,94 @@ async def calculate_cibil(request: CIBILScoreRequest, user=Depends(get_current_u
             },
             "created_at": datetime.now(timezone.utc)
         }
-        await cibil_history_collection.insert_one(history_record)
+        with stage("history_write"):
+            history_id = await cibil_history_writer.add(history_record)
 
-        return {
+        response = {
             "CIBIL Score": score,
             "Breakdown": contributions,
             "Suggestions": improvement_suggestions
         }
+        if defer_suggestions:
+            async def store_suggestions(suggestions):
+                await cibil_history_writer.update_one(history_id, {"$set": {"outputs.suggestions": suggestions}})
+
+            response["job_id"] = await explanation_jobs.submit(
+                "cibil_suggestions",
+                str(user["_id"]),
+                lambda: get_improvement_suggestions(input_data, score, contributions),
+                store_suggestions
+            )
+        return response
+    except (InferenceQueueFull, JobQueueFull) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.post("/calculate_cibil/stream")
+async def calculate_cibil_stream(request: CIBILScoreRequest, user=Depends(get_current_user)):
+    try:
+        with stage("cibil_score"):
+            score, contributions = await inference_executor.run(calculator.calculate_score, request)
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    input_data = request.model_dump()
+
+    async def events():
+        parts = []
+        try:
+            try:
+                yield sse_event("result", {"CIBIL Score": score, "Breakdown": contributions})
+                async for token in stream_improvement_suggestions(input_data, score, contributions):
+                    parts.append(token)
+                    yield sse_event("token", {"content": token})
+            finally:
+                # Same as /predict/stream: the score is recorded however the
+                # stream ends, with the suggestions sent so far.
+                history_record = {
+                    "user_id": str(user["_id"]),
+                    "inputs": input_data,
+                    "outputs": {
+                        "cibil_score": score,
+                        "breakdown": contributions,
+                        "suggestions": "".join(parts)
+                    },
+                    "created_at": datetime.now(timezone.utc)
+                }
+                await asyncio.shield(cibil_history_writer.add(history_record))
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user=Depends(get_current_user)):
+    job = await explanation_jobs.get(job_id, str(user["_id"]))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.get("/history/summary")
+async def get_history_summary(user=Depends(get_current_user)):
+    try:
+        return await get_summary(str(user["_id"]))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -213,15 +439,20 @@ async def calculate_cibil(request: CIBILScoreRequest, user=Depends(get_current_u
         )
 
 @router.get("/history/loan")
-async def get_loan_history(user=Depends(get_current_user)):
+async def get_loan_history(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    user=Depends(get_current_user)
+):
     try:
-        user_id = str(user["_id"])
-        cursor = loan_history_collection.find({"user_id": user_id}).sort("created_at", -1)
-        history = []
-        async for doc in cursor:
-            doc["id"] = str(doc.pop("_id"))
-            history.append(doc)
-        return {"loan_history": history}
+        history, next_cursor = await history_page(loan_history_collection, str(user["_id"]), limit, cursor, view)
+        return {"loan_history": history, "next_cursor": next_cursor}
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,28 +460,110 @@ async def get_loan_history(user=Depends(get_current_user)):
         )
 
 @router.get("/history/cibil")
-async def get_cibil_history(user=Depends(get_current_user)):
+async def get_cibil_history(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    user=Depends(get_current_user)
+):
     try:
-        user_id = str(user["_id"])
-        cursor = cibil_history_collection.find({"user_id": user_id}).sort("created_at", -1)
-        history = []
-        async for doc in cursor:
-            doc["id"] = str(doc.pop("_id"))
-            history.append(doc)
-        return {"cibil_history": history}
+        history, next_cursor = await history_page(cibil_history_collection, str(user["_id"]), limit, cursor, view)
+        return {"cibil_history": history, "next_cursor": next_cursor}
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+@router.get("/history/loan/export")
+async def export_loan_history(view: str = Query("full", pattern="^(full|summary)$"), user=Depends(get_current_user)):
+    return StreamingResponse(
+        stream_history_ndjson(loan_history_collection, str(user["_id"]), view),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/history/cibil/export")
+async def export_cibil_history(view: str = Query("full", pattern="^(full|summary)$"), user=Depends(get_current_user)):
+    return StreamingResponse(
+        stream_history_ndjson(cibil_history_collection, str(user["_id"]), view),
+        media_type="application/x-ndjson"
+    )
+
 @router.post("/chat")
 async def chat(query: str = Query(..., title="Search Query"), user=Depends(get_current_user)):
     try:
-        response = await chain.ainvoke(query)
-        return {"answer": response.content}
+        answer = await answer_query(query)
+        return {"answer": answer}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+@router.post("/chat/stream")
+async def chat_stream(query: str = Query(..., title="Search Query"), user=Depends(get_current_user)):
+    async def events():
+        try:
+            async for token in stream_answer(query):
+                yield sse_event("token", {"content": token})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/stats", dependencies=[Depends(require_ops_access)])
+async def get_stats():
+    return {
+        "predict_batcher": predict_batcher.stats(),
+        "inference_executor": inference_executor.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "explanation_cache": explanation_cache.stats(),
+        "suggestion_store": suggestion_store.stats(),
+        "explanation_jobs": explanation_jobs.stats(),
+        "loan_history_writer": loan_history_writer.stats(),
+        "cibil_history_writer": cibil_history_writer.stats(),
+        "chat_cache": chat_cache_stats(),
+        "embedding": embedding_stats()
+    }
+
+# Every /stats section is also exported on /metrics as gauges.
+for name, stats in {
+    "predict_batcher": predict_batcher.stats,
+    "inference_executor": inference_executor.stats,
+    "llm_gateway": llm_gateway.stats,
+    "explanation_cache": explanation_cache.stats,
+    "suggestion_store": suggestion_store.stats,
+    "explanation_jobs": explanation_jobs.stats,
+    "loan_history_writer": loan_history_writer.stats,
+    "cibil_history_writer": cibil_history_writer.stats,
+    "chat_cache": chat_cache_stats,
+    "embedding": embedding_stats,
+    "model": model_watcher.status,
+}.items():
+    register_stats(name, stats)
+
+@router.get("/metrics", dependencies=[Depends(require_ops_access)])
+async def get_metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/model", dependencies=[Depends(require_ops_access)])
+async def get_model():
+    return model_watcher.status()
+
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(response: Response):
+    ready = all_ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"ready": ready, "resources": startup_report()}
@@ -0,0 +1,85 @@
+import os
+import sys
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Read at import time by the app modules, so these are set before any of them
+# is imported. Tests never touch MongoDB, MLflow or the LLM provider.
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DB_NAME": "neurocred_test",
+    "WARM_ON_STARTUP": "false",
+    "MODEL_RELOAD_INTERVAL": "0",
+    "EXPLANATION_CACHE_MONGO": "false",
+    "SUGGESTION_STORE_DIR": "",
+})
+
+from benchmarks import memory_db
+
+memory_db.install()
+
+FEATURES = ['no_of_dependents', 'education', 'self_employed', 'income_annum',
+            'loan_amount', 'loan_term', 'cibil_score']
+
+
+def training_frame(count=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'no_of_dependents': rng.integers(0, 6, count),
+        'education': rng.integers(0, 2, count),
+        'self_employed': rng.integers(0, 2, count),
+        'income_annum': rng.integers(2, 100, count) * 100000,
+        'loan_amount': rng.integers(3, 395, count) * 100000,
+        'loan_term': rng.integers(1, 11, count) * 2,
+        'cibil_score': rng.integers(300, 901, count),
+    }, columns=FEATURES)
+    approved = (frame.cibil_score > 550) & (frame.loan_amount < frame.income_annum * 3.5)
+    return frame, approved.astype(int)
+
+
+@pytest.fixture(scope="session")
+def loan_model():
+    """A small pipeline with the production model's shape: RobustScaler -> XGBClassifier."""
+    import shap
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import RobustScaler
+    from xgboost import XGBClassifier
+
+    frame, labels = training_frame()
+    pipeline = Pipeline([
+        ('scaler', RobustScaler()),
+        ('model', XGBClassifier(n_estimators=40, max_depth=4, eval_metric="logloss")),
+    ]).fit(frame, labels)
+    scaled = pipeline.named_steps['scaler'].transform(frame)
+    explainer = shap.Explainer(pipeline.named_steps['model'].get_booster(), scaled[:200])
+    return pipeline, explainer
+
+
+@pytest.fixture(scope="session")
+def serving_model(loan_model):
+    from utils.loader import model_state
+    pipeline, explainer = loan_model
+    model_state.swap((pipeline, explainer, SimpleNamespace(version="test", run_id="test")))
+    return model_state
+
+
+@pytest.fixture(scope="session")
+def client(serving_model):
+    # One app lifespan per session: shutdown closes the shared executors.
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    client.post("/signup", json={"full_name": "Test User", "email": "test@example.com", "password": "password"})
+    response = client.post("/login", json={"email": "test@example.com", "password": "password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from utils.batching import MicroBatcher
+
+
+class SlowHandler:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.batches = []
+
+    async def __call__(self, items):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.batches.append(list(items))
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return [item * 10 for item in items]
+
+
+def submit_all(batcher, items):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(item) for item in items))
+    return asyncio.run(run())
+
+
+def test_batches_run_concurrently_up_to_the_limit():
+    handler = SlowHandler()
+    batcher = MicroBatcher(handler, max_batch_size=2, max_wait_ms=1, max_concurrency=3)
+    assert submit_all(batcher, range(12)) == [item * 10 for item in range(12)]
+    assert handler.peak == 3
+    assert sorted(item for batch in handler.batches for item in batch) == list(range(12))
+
+
+def test_items_coalesce_while_every_slot_is_busy():
+    handler = SlowHandler()
+    batcher = MicroBatcher(handler, max_batch_size=64, max_wait_ms=1, max_concurrency=1)
+
+    async def run():
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        rest = await asyncio.gather(*(batcher.submit(item) for item in range(1, 6)))
+        return [await first] + rest
+
+    assert asyncio.run(run()) == [0, 10, 20, 30, 40, 50]
+    assert handler.peak == 1
+    assert handler.batches == [[0], [1, 2, 3, 4, 5]]
+
+
+def test_handler_errors_reach_every_caller_and_free_the_slot():
+    calls = []
+
+    async def handler(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return items
+
+    batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=5, max_concurrency=1)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(item) for item in range(3)), return_exceptions=True)
+        return results, await batcher.submit(7)
+
+    results, after = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert after == 7
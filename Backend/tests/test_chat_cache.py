@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from utils import chatbot_utils
+from utils.embedding_engine import query_encoder
+from utils.llm_gateway import llm_gateway
+
+
+class WordHashEncoder:
+    backend = "test"
+
+    def encode(self, texts):
+        vectors = np.full((len(texts), 32), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 32] += 1
+        return vectors
+
+
+class StaticStore:
+    def __init__(self):
+        self.searches = 0
+
+    def similarity_search_by_vector(self, embedding, k):
+        self.searches += 1
+        return [SimpleNamespace(page_content=f"chunk {i}") for i in range(k)]
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    async def complete(messages, endpoint):
+        return "answer"
+
+    store = StaticStore()
+    monkeypatch.setattr(query_encoder, "_value", WordHashEncoder())
+    monkeypatch.setattr(chatbot_utils.vector_store, "_value", store)
+    monkeypatch.setattr(chatbot_utils, "RETRIEVER_BACKEND", "chroma")
+    monkeypatch.setattr(llm_gateway, "complete", complete)
+    monkeypatch.setattr(chatbot_utils, "retrieval_stats", {"hits": 0, "misses": 0})
+    chatbot_utils.retrieval_cache.clear()
+    chatbot_utils.answer_cache._entries.clear()
+    chatbot_utils.answer_cache._matrix = None
+    return store
+
+
+def test_cold_queries_count_one_miss_each(chat):
+    queries = ["what is a cibil score", "how does loan tenure affect emi", "fixed or floating interest"]
+    for query in queries:
+        asyncio.run(chatbot_utils.answer_query(query))
+
+    stats = chatbot_utils.chat_cache_stats()["retrieval"]
+    assert stats["misses"] == len(queries)
+    assert stats["hits"] == 0
+    assert stats["hit_rate"] == 0.0
+    assert chat.searches == len(queries)
+
+
+def test_repeated_query_counts_one_hit(chat):
+    async def stream(query):
+        return "".join([token async for token in chatbot_utils.stream_answer(query)])
+
+    asyncio.run(chatbot_utils.answer_query("what is a cibil score"))
+    asyncio.run(stream("What is a   CIBIL score"))
+
+    stats = chatbot_utils.chat_cache_stats()["retrieval"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert chat.searches == 1
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.cibil_batch import score_file
+
+
+def write_book(path):
+    pd.DataFrame({
+        "on_time_payments_percent": [98.0, 90.0, np.nan, 85.0, 99.0, 70.0],
+        "utilization_percent": [20.0, np.nan, 10.0, 40.0, 5.0, 60.0],
+        "has_credit_card": [True, False, True, None, True, False],
+    }).to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("chunksize", [2, 100])
+def test_empty_values_are_reported_not_scored(tmp_path, chunksize):
+    source, output = tmp_path / "book.csv", tmp_path / "scored.csv"
+    write_book(source)
+    with pytest.raises(SystemExit, match=r"3 row\(s\) .*: 2, 3, 4$"):
+        score_file(str(source), str(output), chunksize, verify=6)
+
+    scored = pd.read_csv(output)
+    assert scored["on_time_payments_percent"].tolist() == [98.0, 99.0, 70.0]
+    assert scored["cibil_score"].notna().all()
+
+
+def test_clean_book_scores_every_row(tmp_path):
+    source, output = tmp_path / "book.csv", tmp_path / "scored.csv"
+    pd.DataFrame({"on_time_payments_percent": [98.0, 60.0], "days_late_avg": [0.0, 12.0]}).to_csv(source, index=False)
+    score_file(str(source), str(output), 100, verify=2)
+    assert len(pd.read_csv(output)) == 2
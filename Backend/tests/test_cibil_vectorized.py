@@ -0,0 +1,83 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from models import CIBILScoreRequest
+from utils.cibil_utils import CIBILScoreCalculator
+
+COLUMNS = list(CIBILScoreRequest.model_fields)
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return CIBILScoreCalculator()
+
+
+def random_frame(count, seed=0):
+    rng = np.random.default_rng(seed)
+    # A mix of whole, one- and two-decimal percentages, as people type them.
+    on_time = rng.uniform(0, 100, count)
+    decimals = rng.integers(0, 3, count)
+    return pd.DataFrame({
+        "on_time_payments_percent": np.choose(decimals, [np.round(on_time, digits) for digits in range(3)]),
+        "days_late_avg": np.round(rng.uniform(0, 60, count) * (rng.random(count) < 0.6), 2),
+        "utilization_percent": np.round(rng.uniform(0, 100, count), 1),
+        "credit_age_years": np.round(rng.uniform(0, 15, count), 2),
+        "num_secured_loans": rng.integers(0, 4, count),
+        "num_unsecured_loans": rng.integers(0, 4, count),
+        "has_credit_card": rng.random(count) < 0.5,
+        "num_inquiries_6months": rng.integers(0, 8, count),
+        "num_new_accounts_6months": rng.integers(0, 5, count),
+    })
+
+
+def edge_frame():
+    # Every bin edge, the values just either side of it, and the caps on the
+    # penalties, crossed with each other where it matters.
+    def around(edges):
+        return sorted({value for edge in edges for value in (np.nextafter(edge, -np.inf), edge, np.nextafter(edge, np.inf))})
+
+    rows = []
+    for on_time, days_late in itertools.product(around([0, 95, 100]) + [94.99, 95.01, 99.995], around([0, 30]) + [15]):
+        rows.append({"on_time_payments_percent": on_time, "days_late_avg": days_late})
+    for utilization in around([0, 10, 30, 50, 75, 100]):
+        rows.append({"on_time_payments_percent": 100, "utilization_percent": utilization})
+    for age in around([0, 1, 3, 5, 8]):
+        rows.append({"on_time_payments_percent": 100, "credit_age_years": age})
+    for inquiries, new_accounts in itertools.product(range(7), range(5)):
+        rows.append({"on_time_payments_percent": 90, "num_inquiries_6months": inquiries,
+                     "num_new_accounts_6months": new_accounts})
+    for secured, unsecured, card in itertools.product([0, 1], [0, 2], [False, True]):
+        rows.append({"on_time_payments_percent": 80, "num_secured_loans": secured,
+                     "num_unsecured_loans": unsecured, "has_credit_card": card})
+    defaults = {name: field.default for name, field in CIBILScoreRequest.model_fields.items() if not field.is_required()}
+    return pd.DataFrame([dict(defaults, **row) for row in rows])
+
+
+def assert_rows_match(calculator, frame, columns):
+    arrays = {name: frame[name].to_numpy() for name in columns}
+    scores, components = calculator.calculate_scores(arrays)
+    for row in range(len(frame)):
+        fields = {name: frame[name].iloc[row].item() for name in columns}
+        score, breakdown = calculator.calculate_score(CIBILScoreRequest(**fields))
+        assert scores[row] == score, fields
+        assert {key: components[key][row] for key in breakdown} == breakdown, fields
+
+
+def test_random_profiles_match_the_scalar_scorer(calculator):
+    frame = random_frame(5000)
+    assert_rows_match(calculator, frame, COLUMNS)
+
+
+def test_bin_edges_and_caps_match_the_scalar_scorer(calculator):
+    frame = edge_frame()
+    assert_rows_match(calculator, frame, COLUMNS)
+
+
+@pytest.mark.parametrize("columns", [
+    ["on_time_payments_percent"],
+    ["on_time_payments_percent", "utilization_percent", "has_credit_card"],
+    ["on_time_payments_percent", "days_late_avg", "num_inquiries_6months"],
+])
+def test_missing_optional_columns_use_the_request_defaults(calculator, columns):
+    assert_rows_match(calculator, random_frame(500, seed=1), columns)
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from utils.llm_gateway import llm_gateway
+from utils.loan_predictor_utils import explanation_cache, explanation_signature, get_explanation, stream_explanation
+
+SHAP = {
+    'no_of_dependents': 0.01, 'education': -0.02, 'self_employed': 0.0, 'income_annum': 0.4,
+    'loan_amount': -0.3, 'loan_term': 0.1, 'cibil_score': 2.5,
+}
+
+APPLICANT_A = {
+    'no_of_dependents': 2, 'education': 'Graduate', 'self_employed': False,
+    'income_annum': 5040000, 'loan_amount': 10030000, 'loan_term': 10, 'cibil_score': 761,
+}
+APPLICANT_B = dict(APPLICANT_A, income_annum=5010000, loan_amount=10040000, cibil_score=772)
+
+
+def exact_figures(applicant):
+    return [f"{applicant['income_annum']:,}", f"{applicant['loan_amount']:,}", str(applicant['cibil_score'])]
+
+
+@pytest.fixture
+def echo_llm(monkeypatch):
+    # The worst case for a shared cache: an LLM that repeats every figure it
+    # was given.
+    prompts = []
+
+    async def complete(prompt, endpoint):
+        prompts.append(prompt)
+        return prompt
+
+    async def stream(prompt, endpoint):
+        prompts.append(prompt)
+        for start in range(0, len(prompt), 3):
+            yield prompt[start:start + 3]
+
+    explanation_cache.local.clear()
+    monkeypatch.setattr(llm_gateway, "complete", complete)
+    monkeypatch.setattr(llm_gateway, "stream", stream)
+    return prompts
+
+
+def test_applicants_share_a_signature():
+    assert explanation_signature(APPLICANT_A, SHAP, 0.9) == explanation_signature(APPLICANT_B, SHAP, 0.9)
+
+
+def test_prompt_holds_no_exact_figures(echo_llm):
+    asyncio.run(get_explanation(APPLICANT_A, SHAP, 0.9))
+    for figure in exact_figures(APPLICANT_A):
+        assert figure not in echo_llm[0]
+
+
+def test_cached_explanation_carries_each_applicants_own_figures(echo_llm):
+    first = asyncio.run(get_explanation(APPLICANT_A, SHAP, 0.9))
+    second = asyncio.run(get_explanation(APPLICANT_B, SHAP, 0.9))
+
+    assert len(echo_llm) == 1
+    assert all(figure in first for figure in exact_figures(APPLICANT_A))
+    assert all(figure in second for figure in exact_figures(APPLICANT_B))
+    assert not any(figure in second for figure in exact_figures(APPLICANT_A))
+    assert "{{" not in first and "{{" not in second
+
+
+def test_streamed_explanation_carries_each_applicants_own_figures(echo_llm):
+    async def collect(applicant):
+        return "".join([token async for token in stream_explanation(applicant, SHAP, 0.9)])
+
+    first = asyncio.run(collect(APPLICANT_A))
+    second = asyncio.run(collect(APPLICANT_B))
+
+    assert len(echo_llm) == 1
+    assert all(figure in first for figure in exact_figures(APPLICANT_A))
+    assert all(figure in second for figure in exact_figures(APPLICANT_B))
+    assert not any(figure in second for figure in exact_figures(APPLICANT_A))
+    assert "{{" not in first and "{{" not in second
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from models import LoanApplication
+from utils.inference_engine import CompiledModel, score
+from utils.loan_predictor_utils import build_feature_frame
+
+BASE = {
+    "no_of_dependents": 2, "education": "Graduate", "self_employed": False,
+    "income_annum": 5000000, "loan_amount": 10000000, "loan_term": 10, "cibil_score": 750,
+}
+
+EDGE_APPLICATIONS = [
+    LoanApplication(**BASE),
+    LoanApplication(**dict(BASE, education="Not Graduate", self_employed=True)),
+    # Anything but the two known labels encodes as "Not Graduate".
+    LoanApplication(**dict(BASE, education="PhD")),
+    LoanApplication(**dict(BASE, education="graduate")),
+    LoanApplication(**dict(BASE, education="")),
+    # The boolean spellings pydantic accepts for self_employed.
+    LoanApplication(**dict(BASE, self_employed="yes")),
+    LoanApplication(**dict(BASE, self_employed="0")),
+    LoanApplication(**dict(BASE, self_employed=1)),
+    LoanApplication(**{name: 0 for name in BASE} | {"education": "Graduate", "self_employed": False}),
+    LoanApplication(**dict(BASE, income_annum=0, loan_amount=0, loan_term=0, cibil_score=0)),
+    LoanApplication(**dict(BASE, income_annum=10 ** 12, loan_amount=10 ** 12)),
+    LoanApplication(**dict(BASE, income_annum=1, loan_amount=10 ** 15, cibil_score=10 ** 6)),
+    LoanApplication(**dict(BASE, no_of_dependents=10 ** 4, loan_term=10 ** 4)),
+    LoanApplication(**dict(BASE, income_annum=-1000000, cibil_score=-1)),
+    LoanApplication(**dict(BASE, loan_amount=10 ** 20)),
+]
+
+
+@pytest.fixture(params=[False, True], ids=["scaled", "folded"])
+def compiled(request, loan_model):
+    pipeline, _ = loan_model
+    return CompiledModel(pipeline, fold=request.param)
+
+
+def test_encode_matches_feature_frame(compiled):
+    expected = build_feature_frame(EDGE_APPLICATIONS).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(compiled.encode(EDGE_APPLICATIONS), expected)
+
+
+def test_scale_rows_matches_pipeline_scaler(compiled, loan_model):
+    pipeline, _ = loan_model
+    expected = pipeline.named_steps['scaler'].transform(build_feature_frame(EDGE_APPLICATIONS))
+    np.testing.assert_array_equal(compiled.scale_rows(compiled.encode(EDGE_APPLICATIONS)), expected)
+
+
+def test_compiled_scores_match_pipeline_predict_proba(compiled, loan_model):
+    pipeline, _ = loan_model
+    expected = pipeline.predict_proba(build_feature_frame(EDGE_APPLICATIONS))[:, 1]
+    probabilities, contributions = compiled.scores(compiled.encode(EDGE_APPLICATIONS))
+    np.testing.assert_allclose(probabilities, expected, rtol=0, atol=1e-6)
+    assert np.all(np.isfinite(contributions))
+
+
+def test_compiled_contributions_match_pandas_path(compiled, loan_model):
+    pipeline, explainer = loan_model
+    expected = score(pipeline, explainer, build_feature_frame(EDGE_APPLICATIONS), backend="native")
+    actual = compiled.scores(compiled.encode(EDGE_APPLICATIONS))
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+
+
+def test_default_score_never_builds_a_dataframe(loan_model, monkeypatch):
+    pipeline, explainer = loan_model
+    frame = build_feature_frame(EDGE_APPLICATIONS)
+    expected = score(pipeline, explainer, frame)
+    features = frame.to_numpy(dtype=np.float64)
+
+    def refuse(*args, **kwargs):
+        raise AssertionError("the array path must not go through pandas or the sklearn scaler")
+
+    monkeypatch.setattr(pd.DataFrame, "__init__", refuse)
+    monkeypatch.setattr(pipeline.named_steps['scaler'], "transform", refuse)
+    for backend in (None, "explainer"):
+        actual = score(pipeline, explainer, features, backend)
+        np.testing.assert_array_equal(actual[0], expected[0])
+        np.testing.assert_array_equal(actual[1], expected[1])
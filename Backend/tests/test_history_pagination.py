@@ -0,0 +1,130 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId
+import pytest
+from benchmarks.memory_db import MemoryCollection
+from utils.history import (
+    HISTORY_INDEX, HISTORY_INDEX_NAME, HISTORY_SORT, InvalidCursor, decode_cursor, encode_cursor,
+    ensure_history_indexes, explain_history_page, history_filter, history_page, is_index_backed, plan_stages
+)
+
+
+class RecordingCollection(MemoryCollection):
+    def __init__(self, name):
+        super().__init__(name)
+        self.indexes = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return await super().create_index(keys, **kwargs)
+
+
+@pytest.fixture
+def collection():
+    collection = MemoryCollection("loan_history")
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(7):
+        # Pairs of records share a timestamp, so paging must break ties on _id.
+        created_at = start + timedelta(minutes=i // 2)
+        docs.append({"user_id": "alice", "created_at": created_at, "outputs": {"reason": "text", "approve_chances": i}})
+        docs.append({"user_id": "bob", "created_at": created_at, "outputs": {"reason": "text", "approve_chances": i}})
+    asyncio.run(collection.insert_many(docs))
+    return collection
+
+
+def test_index_serves_the_filter_and_the_sort():
+    assert HISTORY_INDEX[0] == ("user_id", 1)
+    assert HISTORY_INDEX[1:] == HISTORY_SORT
+    assert HISTORY_SORT == [("created_at", -1), ("_id", -1)]
+
+
+def test_ensure_history_indexes_creates_the_keyset_index():
+    collections = [RecordingCollection("loan_history"), RecordingCollection("cibil_history")]
+    asyncio.run(ensure_history_indexes(*collections))
+    for collection in collections:
+        assert collection.indexes == [(HISTORY_INDEX, {"name": HISTORY_INDEX_NAME})]
+
+
+def test_next_page_filter_is_a_keyset_seek():
+    created_at, last_id = datetime(2025, 1, 1, tzinfo=timezone.utc), ObjectId()
+    cursor = encode_cursor({"created_at": created_at, "_id": last_id})
+    assert history_filter("alice") == {"user_id": "alice"}
+    assert history_filter("alice", cursor) == {
+        "user_id": "alice",
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ],
+    }
+
+
+def test_pages_cover_every_record_once_in_order(collection):
+    seen, cursor = [], None
+    while True:
+        page, cursor = asyncio.run(history_page(collection, "alice", limit=2, cursor=cursor))
+        assert len(page) <= 2
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert {doc["user_id"] for doc in seen} == {"alice"}
+    assert len({doc["id"] for doc in seen}) == 7
+    keys = [(doc["created_at"], ObjectId(doc["id"])) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_summary_view_leaves_out_the_narrative(collection):
+    page, _ = asyncio.run(history_page(collection, "alice", limit=3, view="summary"))
+    assert all("reason" not in doc["outputs"] and "approve_chances" in doc["outputs"] for doc in page)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_plan_check_requires_the_keyset_index_and_no_sort():
+    def plan(*stages):
+        root = None
+        for stage in reversed(stages):
+            root = dict(stage, **({"inputStage": root} if root else {}))
+        return {"queryPlanner": {"winningPlan": root}}
+
+    seek = {"stage": "IXSCAN", "indexName": HISTORY_INDEX_NAME}
+    assert is_index_backed(plan_stages(plan({"stage": "LIMIT"}, {"stage": "FETCH"}, seek)))
+    assert not is_index_backed(plan_stages(plan({"stage": "SORT"}, {"stage": "FETCH"}, seek)))
+    assert not is_index_backed(plan_stages(plan({"stage": "FETCH"}, {"stage": "IXSCAN", "indexName": "user_id_1"})))
+    assert not is_index_backed(plan_stages(plan({"stage": "COLLSCAN"})))
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_URL"), reason="MONGO_URL is not set")
+def test_keyset_queries_use_the_index_on_mongodb():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def explain_pages():
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        database = client[f"neurocred_plan_{ObjectId()}"]
+        try:
+            collection = database["loan_history"]
+            start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+            await collection.insert_many([
+                {"user_id": f"user-{i % 20}", "created_at": start + timedelta(minutes=i), "outputs": {}}
+                for i in range(2000)
+            ])
+            await ensure_history_indexes(collection)
+            cursor = encode_cursor({"created_at": start + timedelta(minutes=1000), "_id": ObjectId()})
+            return [
+                plan_stages(await explain_history_page(collection, "user-3", page))
+                for page in (None, cursor)
+            ]
+        finally:
+            await client.drop_database(database.name)
+            client.close()
+
+    for stages in asyncio.run(explain_pages()):
+        names = [stage.get("stage") for stage in stages]
+        assert "IXSCAN" in names and "SORT" not in names and "COLLSCAN" not in names
+        assert {stage["indexName"] for stage in stages if stage.get("stage") == "IXSCAN"} == {HISTORY_INDEX_NAME}
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from utils.llm_gateway import LLMGateway, LLMGatewayError
+
+
+class SlowBody(httpx.AsyncByteStream):
+    def __init__(self, tokens, stall):
+        self.tokens = tokens
+        self.stall = stall
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n".encode()
+        await asyncio.sleep(self.stall)
+        yield b"data: [DONE]\n\n"
+
+
+def gateway(handler, deadline=0.2, **kwargs):
+    llm = LLMGateway("http://llm.test/v1", None, "test", deadline=deadline, **kwargs)
+    llm._client = httpx.AsyncClient(base_url=llm.base_url, transport=httpx.MockTransport(handler))
+    return llm
+
+
+async def collect(llm, endpoint="default"):
+    return [token async for token in llm.stream("hello", endpoint)]
+
+
+def timed(coroutine):
+    started = time.perf_counter()
+    with pytest.raises(LLMGatewayError, match="deadline"):
+        asyncio.run(coroutine)
+    return time.perf_counter() - started
+
+
+def test_stream_returns_every_token():
+    llm = gateway(lambda request: httpx.Response(200, stream=SlowBody(["a", "b"], 0)))
+    assert asyncio.run(collect(llm)) == ["a", "b"]
+
+
+def test_deadline_covers_a_stalled_stream():
+    llm = gateway(lambda request: httpx.Response(200, stream=SlowBody(["a"], 5)))
+    assert timed(collect(llm)) < 1
+    assert llm.stats()["endpoints"]["default"]["timeouts"] == 1
+
+
+def test_deadline_covers_backoff_between_retries():
+    llm = gateway(lambda request: httpx.Response(503), max_retries=3, backoff_base=5)
+    assert timed(collect(llm)) < 1
+
+
+def test_deadline_covers_the_wait_for_a_slot():
+    llm = gateway(lambda request: httpx.Response(200, stream=SlowBody(["a"], 0)), endpoint_concurrency=1)
+
+    async def run():
+        stats = llm._endpoint_stats("default")
+        async with llm._slot("default", stats):
+            try:
+                await collect(llm)
+            finally:
+                assert stats["waiting"] == 0
+
+    assert timed(run()) < 1
+    # The timed-out waiter left no slot behind.
+    assert asyncio.run(collect(llm)) == ["a"]
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+import pytest
+from utils import executor, loader, model_snapshot
+from utils.loader import MODEL_NAME, model_state
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch, serving_model):
+    monkeypatch.setattr(model_snapshot, "MODEL_SNAPSHOT_DIR", str(tmp_path))
+    serving = model_state.get()
+    yield tmp_path
+    model_state.swap(serving)
+
+
+def refuse_registry(*args):
+    raise AssertionError("workers must not resolve the registry alias")
+
+
+def test_workers_load_the_version_the_parent_serves(snapshot_dir, monkeypatch, loan_model):
+    pipeline, explainer = loan_model
+    model_snapshot.export_snapshot(MODEL_NAME, SimpleNamespace(version="7", run_id="run-7"), pipeline, explainer)
+    monkeypatch.setattr(loader, "resolve_production", refuse_registry)
+    monkeypatch.setattr(loader, "load_from_registry", refuse_registry)
+
+    assert executor._preload_args(SimpleNamespace(version=7, run_id="run-7")) == ("7", "run-7")
+    assert executor._preload_args() == ("test", "test")
+
+    executor._preload_model_state("7", "run-7")
+    assert model_state.get()[2].version == "7"
+    assert model_state.get()[2].run_id == "run-7"
+
+
+def test_a_version_that_fails_to_load_is_skipped_until_the_alias_moves(serving_model, monkeypatch):
+    from utils import model_watcher
+    alias, loads = {"version": "8"}, []
+
+    def load_version(model_info):
+        loads.append(model_info.version)
+        raise OSError("artifact download failed")
+
+    monkeypatch.setattr(model_watcher, "resolve_production", lambda: SimpleNamespace(run_id="run", **alias))
+    monkeypatch.setattr(model_watcher, "load_version", load_version)
+    watcher = model_watcher.ModelWatcher(interval=0)
+
+    with pytest.raises(OSError):
+        watcher.check()
+    assert watcher.check() is False
+    assert loads == ["8"]
+    assert watcher.status()["failed_loads"] == 1
+
+    alias["version"] = "9"
+    with pytest.raises(OSError):
+        watcher.check()
+    assert loads == ["8", "9"]
+    assert model_state.get()[2].version == "test"
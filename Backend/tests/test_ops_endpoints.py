@@ -0,0 +1,30 @@
+import auth
+import pytest
+
+OPS_PATHS = ["/stats", "/metrics", "/model"]
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_ops_endpoints_require_credentials(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_a_signed_in_user_needs_to_be_on_the_allow_list(client, auth_headers, monkeypatch, path):
+    assert client.get(path, headers=auth_headers).status_code == 403
+    monkeypatch.setattr(auth, "OPS_USER_EMAILS", {"test@example.com"})
+    assert client.get(path, headers=auth_headers).status_code == 200
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_the_metrics_token_grants_access(client, monkeypatch, path):
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "scraper-secret")
+    assert client.get(path, headers={"Authorization": "Bearer scraper-secret"}).status_code == 200
+    assert client.get(path, headers={"Authorization": "Bearer scraper-guess"}).status_code == 401
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_ops_endpoints_can_be_opened_up(client, monkeypatch, path):
+    monkeypatch.setattr(auth, "OPS_ENDPOINTS_PUBLIC", True)
+    assert client.get(path).status_code == 200
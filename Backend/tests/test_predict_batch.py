@@ -0,0 +1,31 @@
+from models import PREDICT_BATCH_MAX_APPLICATIONS
+
+APPLICATION = {
+    "no_of_dependents": 2,
+    "education": "Graduate",
+    "self_employed": False,
+    "income_annum": 5000000,
+    "loan_amount": 10000000,
+    "loan_term": 10,
+    "cibil_score": 750,
+}
+
+
+def test_batch_scores_every_application(client, auth_headers):
+    applications = [APPLICATION, dict(APPLICATION, cibil_score=400)]
+    response = client.post("/predict/batch", json={"applications": applications}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 2
+    assert results[0]["approve_chances"] > results[1]["approve_chances"]
+
+
+def test_batch_rejects_empty_request(client, auth_headers):
+    response = client.post("/predict/batch", json={"applications": []}, headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_batch_rejects_oversized_request(client, auth_headers):
+    applications = [APPLICATION] * (PREDICT_BATCH_MAX_APPLICATIONS + 1)
+    response = client.post("/predict/batch", json={"applications": applications}, headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from utils import rollups
+from utils.rollups import apply_cibil_rollups, apply_loan_rollups, get_summary, rebuild
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def cibil_doc(user_id, minute, score):
+    return {
+        "user_id": user_id, "created_at": START + timedelta(minutes=minute),
+        "outputs": {"cibil_score": score, "breakdown": {"payment_history": score / 10, "credit_utilization": 5}}
+    }
+
+
+def loan_doc(user_id, minute, approve_chances):
+    return {
+        "user_id": user_id, "created_at": START + timedelta(minutes=minute),
+        "outputs": {"approve_chances": approve_chances}
+    }
+
+
+def seed_history(user_id, cibil_scores, loan_chances):
+    cibil = [cibil_doc(user_id, minute, score) for minute, score in enumerate(cibil_scores)]
+    loan = [loan_doc(user_id, minute, chances) for minute, chances in enumerate(loan_chances)]
+    asyncio.run(rollups.cibil_history_collection.insert_many(cibil))
+    asyncio.run(rollups.loan_history_collection.insert_many(loan))
+    return cibil, loan
+
+
+def incremental_summary(user_id, cibil, loan):
+    asyncio.run(rollups.rollups_collection.delete_one({"_id": user_id}))
+    asyncio.run(apply_cibil_rollups(cibil))
+    asyncio.run(apply_loan_rollups(loan))
+    return asyncio.run(get_summary(user_id))
+
+
+def test_full_rebuild_matches_the_incremental_rollups():
+    cibil, loan = seed_history("rollup-a", [610, 702, 688, 745] + list(range(650, 662)), [35.5, 72.25, 51.0])
+    expected_a = incremental_summary("rollup-a", cibil, loan)
+    cibil, loan = seed_history("rollup-b", [580], [49.0, 88.0])
+    expected_b = incremental_summary("rollup-b", cibil, loan)
+
+    # A stale rollup for a user without history and a corrupted one.
+    asyncio.run(rollups.rollups_collection.replace_one(
+        {"_id": "rollup-stale"}, {"loan": {"count": 3, "approved": 3, "approve_chances_sum": 240}}, upsert=True
+    ))
+    asyncio.run(rollups.rollups_collection.update_one({"_id": "rollup-a"}, {"$inc": {"cibil.count": 5}}))
+
+    assert asyncio.run(rebuild()) >= 2
+    assert asyncio.run(get_summary("rollup-a")) == expected_a
+    assert asyncio.run(get_summary("rollup-b")) == expected_b
+    assert asyncio.run(rollups.rollups_collection.find_one({"_id": "rollup-stale"})) is None
+    assert asyncio.run(rollups.rollups_collection.database["user_rollups_rebuild"].count_documents({})) == 0
+    assert expected_a["cibil"]["count"] == 16
+    assert expected_a["cibil"]["recent_scores"] == list(range(652, 662))
+    assert expected_b["loan"]["approval_rate"] == 0.5
+
+
+def test_single_user_rebuild_leaves_other_rollups_alone():
+    cibil, loan = seed_history("rollup-c", [700, 720], [60.0])
+    expected = incremental_summary("rollup-c", cibil, loan)
+    asyncio.run(rollups.rollups_collection.replace_one(
+        {"_id": "rollup-other"}, {"loan": {"count": 1, "approved": 1, "approve_chances_sum": 90}}, upsert=True
+    ))
+    asyncio.run(rollups.rollups_collection.update_one({"_id": "rollup-c"}, {"$set": {"cibil.max_score": 900}}))
+
+    assert asyncio.run(rebuild("rollup-c")) == 1
+    assert asyncio.run(get_summary("rollup-c")) == expected
+    assert asyncio.run(get_summary("rollup-other"))["loan"]["count"] == 1
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from utils import metrics
+from utils.batching import MicroBatcher
+from utils.executor import InferenceExecutor
+from utils.llm_gateway import llm_gateway
+from utils.metrics import stage
+
+APPLICATION = {
+    "no_of_dependents": 2, "education": "Graduate", "self_employed": False,
+    "income_annum": 5000000, "loan_amount": 10000000, "loan_term": 10, "cibil_score": 750,
+}
+
+
+def timing_names(response):
+    return [entry.split(";")[0].strip() for entry in response.headers["server-timing"].split(",")]
+
+
+def stage_count(name):
+    series = metrics.stage_seconds._series.get((name,))
+    return series[2] if series else 0
+
+
+def work(value):
+    with stage("test_work"):
+        return value * 2
+
+
+async def as_request(coroutine):
+    timings = []
+    token = metrics._request_timings.set(timings)
+    try:
+        return await coroutine, timings
+    finally:
+        metrics._request_timings.reset(token)
+
+
+@pytest.fixture
+def quiet_llm(monkeypatch):
+    async def complete(prompt, endpoint):
+        return "explanation"
+
+    monkeypatch.setattr(llm_gateway, "complete", complete)
+
+
+def test_predict_reports_inference_stages(client, auth_headers, quiet_llm):
+    response = client.post("/predict", json=APPLICATION, headers=dict(auth_headers, **{"X-Server-Timing": "1"}))
+    assert response.status_code == 200
+    names = timing_names(response)
+    for name in ("featurize", "scale", "shap_explainer", "predict", "total"):
+        assert name in names
+
+
+def test_batch_predict_reports_inference_stages(client, auth_headers):
+    response = client.post(
+        "/predict/batch", json={"applications": [APPLICATION]}, headers=dict(auth_headers, **{"X-Server-Timing": "1"})
+    )
+    assert response.status_code == 200
+    assert {"featurize", "scale", "shap_explainer"} <= set(timing_names(response))
+
+
+def test_server_timing_is_opt_in(client, auth_headers, quiet_llm):
+    response = client.post("/predict", json=APPLICATION, headers=auth_headers)
+    assert "server-timing" not in response.headers
+
+
+def test_executor_stages_reach_the_caller_once():
+    executor = InferenceExecutor("thread", max_workers=1)
+    before = stage_count("test_work")
+    try:
+        result, timings = asyncio.run(as_request(executor.run(work, 21)))
+    finally:
+        executor.shutdown()
+    assert result == 42
+    assert [name for name, _ in timings] == ["test_work"]
+    assert stage_count("test_work") == before + 1
+
+
+def test_batched_stages_reach_every_request_in_the_batch():
+    executor = InferenceExecutor("thread", max_workers=1)
+
+    async def handler(items):
+        return await executor.run(lambda values: [work(value) for value in values], items)
+
+    batcher = MicroBatcher(handler, max_batch_size=8, max_wait_ms=50)
+
+    async def requests():
+        return await asyncio.gather(*(as_request(batcher.submit(value)) for value in range(3)))
+
+    before = stage_count("test_work")
+    try:
+        responses = asyncio.run(requests())
+    finally:
+        executor.shutdown()
+    assert [result for result, _ in responses] == [0, 2, 4]
+    for _, timings in responses:
+        assert [name for name, _ in timings] == ["test_work"] * 3
+    # Observed once per executed stage, not once per request in the batch.
+    assert stage_count("test_work") == before + 3
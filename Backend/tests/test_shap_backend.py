@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from benchmarks.shap_bench import fixture_applicants, parity, parity_failures
+from utils import inference_engine
+from utils.inference_engine import score
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return fixture_applicants(200)
+
+
+def explainer_reference(loan_model, frame):
+    pipeline, explainer = loan_model
+    scaled = pipeline.named_steps['scaler'].transform(frame)
+    return pipeline.predict_proba(frame)[:, 1], explainer(scaled).values
+
+
+def test_default_backend_serves_the_explainer(loan_model, frame):
+    pipeline, explainer = loan_model
+    probabilities, contributions = score(pipeline, explainer, frame)
+    expected_probabilities, expected_contributions = explainer_reference(loan_model, frame)
+    np.testing.assert_array_equal(probabilities, expected_probabilities)
+    np.testing.assert_array_equal(contributions, expected_contributions)
+
+
+def test_native_failure_falls_back_to_the_explainer(loan_model, frame, monkeypatch):
+    def broken(booster, features):
+        raise RuntimeError("booster unavailable")
+
+    monkeypatch.setattr(inference_engine, "SHAP_BACKEND", "native")
+    monkeypatch.setattr(inference_engine, "native_scores", broken)
+    pipeline, explainer = loan_model
+    _, contributions = score(pipeline, explainer, frame)
+    np.testing.assert_array_equal(contributions, explainer_reference(loan_model, frame)[1])
+
+
+def test_explicit_native_backend_never_falls_back(loan_model, frame, monkeypatch):
+    def broken(booster, features):
+        raise RuntimeError("booster unavailable")
+
+    monkeypatch.setattr(inference_engine, "native_scores", broken)
+    pipeline, explainer = loan_model
+    with pytest.raises(RuntimeError):
+        score(pipeline, explainer, frame, backend="native")
+
+
+def test_missing_explainer_uses_native(loan_model, frame):
+    pipeline, _ = loan_model
+    probabilities, contributions = score(pipeline, None, frame)
+    expected = score(pipeline, None, frame, backend="native")
+    np.testing.assert_array_equal(probabilities, expected[0])
+    np.testing.assert_array_equal(contributions, expected[1])
+
+
+def test_backends_agree_on_probabilities(loan_model, frame):
+    report = parity(*loan_model, frame)
+    assert report["max_probability_diff"] < 1e-6
+    assert report["decision_agreement"] == 1.0
+
+
+def test_parity_failures_flag_out_of_range_metrics():
+    thresholds = {"max_contribution_diff": ("max", 0.05), "sign_agreement": ("min", 0.99)}
+    assert parity_failures({"max_contribution_diff": 0.01, "sign_agreement": 1.0}, thresholds) == []
+    failures = parity_failures({"max_contribution_diff": 0.3, "sign_agreement": 0.95}, thresholds)
+    assert [failure.split("=")[0] for failure in failures] == ["max_contribution_diff", "sign_agreement"]
@@ -0,0 +1,86 @@
+import asyncio
+from bson.objectid import ObjectId
+import pytest
+import routes
+from models import CIBILScoreRequest, LoanApplication
+from utils.cibil_utils import suggestion_store
+from utils.history import cibil_history_writer, loan_history_writer
+from utils.llm_gateway import llm_gateway
+from utils.loan_predictor_utils import explanation_cache
+
+APPLICATION = LoanApplication(
+    no_of_dependents=1, education="Graduate", self_employed=False,
+    income_annum=4200000, loan_amount=9100000, loan_term=12, cibil_score=705,
+)
+PROFILE = CIBILScoreRequest(on_time_payments_percent=91.5, utilization_percent=44, credit_age_years=3.5)
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    state = {"fail_after": None}
+
+    async def stream(prompt, endpoint):
+        for index, token in enumerate(["first ", "second ", "third"]):
+            if state["fail_after"] == index:
+                raise RuntimeError("LLM went away")
+            yield token
+
+    explanation_cache.local.clear()
+    suggestion_store.local.clear()
+    monkeypatch.setattr(llm_gateway, "stream", stream)
+    return state
+
+
+async def consume(response, events):
+    body = response.body_iterator
+    sent = [await body.__anext__() for _ in range(events)]
+    await body.aclose()
+    return sent
+
+
+def stored(writer, user_id):
+    async def run():
+        await writer.flush()
+        return await writer.collection.find({"user_id": user_id}).to_list(None)
+    return asyncio.run(run())
+
+
+def test_predict_stream_records_the_prediction_when_the_client_leaves(serving_model, tokens):
+    user = {"_id": ObjectId()}
+
+    async def run():
+        response = await routes.predict_loan_approval_stream(APPLICATION, user)
+        return await consume(response, 2)
+
+    sent = asyncio.run(run())
+    assert "result" in sent[0] and "token" in sent[1]
+    [record] = stored(loan_history_writer, str(user["_id"]))
+    assert record["outputs"]["approve_chances"] > 0
+    assert record["outputs"]["reason"] == "first "
+
+
+def test_predict_stream_records_the_prediction_when_the_explanation_fails(serving_model, tokens):
+    tokens["fail_after"] = 1
+    user = {"_id": ObjectId()}
+
+    async def run():
+        response = await routes.predict_loan_approval_stream(APPLICATION, user)
+        return [event async for event in response.body_iterator]
+
+    events = asyncio.run(run())
+    assert "error" in events[-1]
+    [record] = stored(loan_history_writer, str(user["_id"]))
+    assert record["outputs"]["reason"] == "first "
+
+
+def test_cibil_stream_records_the_score_when_the_client_leaves(tokens):
+    user = {"_id": ObjectId()}
+
+    async def run():
+        response = await routes.calculate_cibil_stream(PROFILE, user)
+        return await consume(response, 1)
+
+    asyncio.run(run())
+    [record] = stored(cibil_history_writer, str(user["_id"]))
+    assert record["outputs"]["cibil_score"] >= 300
+    assert record["outputs"]["suggestions"] == ""
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from models import CIBILScoreRequest
+from utils.cibil_utils import (
+    CIBILScoreCalculator, suggestion_store, suggestion_signature,
+    get_improvement_suggestions, stream_improvement_suggestions
+)
+from utils.llm_gateway import llm_gateway
+
+PROFILE_A = {
+    "on_time_payments_percent": 97.3, "days_late_avg": 6.5, "utilization_percent": 27.5,
+    "credit_age_years": 4.25, "num_secured_loans": 1, "num_unsecured_loans": 17,
+    "has_credit_card": True, "num_inquiries_6months": 2, "num_new_accounts_6months": 1,
+}
+# Same breakdown and buckets as A, different exact figures.
+PROFILE_B = dict(PROFILE_A, utilization_percent=26.5, credit_age_years=4.75, num_unsecured_loans=23)
+
+
+def scored(profile):
+    score, breakdown = CIBILScoreCalculator().calculate_score(CIBILScoreRequest(**profile))
+    return profile, score, breakdown
+
+
+def exact_figures(profile):
+    return [f"{profile[name]:g}" for name in
+            ("utilization_percent", "credit_age_years", "num_unsecured_loans")]
+
+
+@pytest.fixture
+def echo_llm(monkeypatch):
+    prompts = []
+
+    async def complete(prompt, endpoint):
+        prompts.append(prompt)
+        return prompt
+
+    async def stream(prompt, endpoint):
+        prompts.append(prompt)
+        for start in range(0, len(prompt), 3):
+            yield prompt[start:start + 3]
+
+    suggestion_store.local.clear()
+    monkeypatch.setattr(llm_gateway, "complete", complete)
+    monkeypatch.setattr(llm_gateway, "stream", stream)
+    return prompts
+
+
+def test_profiles_share_a_signature():
+    _, _, breakdown_a = scored(PROFILE_A)
+    _, _, breakdown_b = scored(PROFILE_B)
+    assert suggestion_signature(PROFILE_A, breakdown_a) == suggestion_signature(PROFILE_B, breakdown_b)
+
+
+def test_stored_suggestions_carry_each_profiles_own_figures(echo_llm):
+    first = asyncio.run(get_improvement_suggestions(*scored(PROFILE_A)))
+    second = asyncio.run(get_improvement_suggestions(*scored(PROFILE_B)))
+
+    assert len(echo_llm) == 1
+    assert not any(figure in echo_llm[0] for figure in exact_figures(PROFILE_A))
+    assert all(figure in first for figure in exact_figures(PROFILE_A))
+    assert all(figure in second for figure in exact_figures(PROFILE_B))
+    assert not any(figure in second for figure in exact_figures(PROFILE_A))
+
+
+def test_streamed_suggestions_carry_each_profiles_own_figures(echo_llm):
+    async def collect(profile):
+        return "".join([token async for token in stream_improvement_suggestions(*scored(profile))])
+
+    first = asyncio.run(collect(PROFILE_A))
+    second = asyncio.run(collect(PROFILE_B))
+
+    assert len(echo_llm) == 1
+    assert all(figure in first for figure in exact_figures(PROFILE_A))
+    assert not any(figure in second for figure in exact_figures(PROFILE_A))
+    assert "{{" not in second
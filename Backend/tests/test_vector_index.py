@@ -0,0 +1,76 @@
+import tracemalloc
+import numpy as np
+import pytest
+from utils.vector_index import MmapVectorIndex, build_index
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20000, 64)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(len(vectors))]
+    queries = rng.normal(size=(20, 64)).astype(np.float32)
+    return texts, vectors, queries
+
+
+@pytest.fixture(scope="module")
+def indexes(corpus, tmp_path_factory):
+    texts, vectors, _ = corpus
+    directory = tmp_path_factory.mktemp("indexes")
+    build_index(texts, vectors, str(directory / "float32"))
+    build_index(texts, vectors, str(directory / "int8"), quantize=True)
+    return MmapVectorIndex(str(directory / "float32")), MmapVectorIndex(str(directory / "int8"))
+
+
+def test_int8_scores_match_dequantized_rows(indexes, corpus):
+    _, quantized = indexes
+    _, _, queries = corpus
+    dequantized = np.asarray(quantized.matrix, dtype=np.float32) * np.asarray(quantized.scales)[:, None]
+    for query in queries:
+        unit = query / np.linalg.norm(query)
+        np.testing.assert_allclose(quantized.scores(query), dequantized @ unit, rtol=1e-5, atol=1e-6)
+
+
+def test_int8_search_agrees_with_float32(indexes, corpus):
+    exact, quantized = indexes
+    _, _, queries = corpus
+    overlap = [len(set(exact.search(query, 10)) & set(quantized.search(query, 10))) / 10 for query in queries]
+    assert np.mean(overlap) >= 0.9
+
+
+def test_int8_search_does_not_copy_the_matrix(indexes, corpus):
+    _, quantized = indexes
+    _, _, queries = corpus
+    quantized.search(queries[0])
+    tracemalloc.start()
+    quantized.search(queries[1])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < quantized.matrix.size * 4 / 4
+
+
+def test_top_k_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(3000, 48)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(len(vectors))]
+    build_index(texts, vectors, str(tmp_path / "float32"))
+    build_index(texts, vectors, str(tmp_path / "int8"), quantize=True)
+    exact, quantized = MmapVectorIndex(str(tmp_path / "float32")), MmapVectorIndex(str(tmp_path / "int8"))
+
+    units = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Largest score error int8 rows can cause for a unit query.
+    dequantized = np.asarray(quantized.matrix, dtype=np.float32) * np.asarray(quantized.scales)[:, None]
+    tolerance = float(np.linalg.norm(dequantized - units, axis=1).max())
+
+    k = 10
+    for query in rng.normal(size=(25, 48)).astype(np.float32):
+        truth = units @ (query / np.linalg.norm(query))
+        expected = np.argsort(-truth)[:k]
+        assert exact.search(query, k) == [texts[i] for i in expected]
+
+        found = [int(text.split()[1]) for text in quantized.search(query, k)]
+        assert len(set(found)) == k
+        # Anything int8 ranks in the top k is within the tolerance of the
+        # true k-th score, and every true hit clear of it is found.
+        assert truth[found].min() >= truth[expected[-1]] - 2 * tolerance
+        assert set(i for i in expected if truth[i] > truth[expected[-1]] + 2 * tolerance) <= set(found)
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from utils import chatbot_utils
+from utils.embedding_engine import query_encoder
+from utils.ingest import chroma_ids, publish_chroma
+from utils.llm_gateway import llm_gateway
+from utils.vector_index import MmapVectorIndex, build_index, resolve_directory
+from tests.test_chat_cache import WordHashEncoder
+
+
+def versions(directory):
+    parent, name = os.path.split(str(directory))
+    return sorted(entry for entry in os.listdir(parent) if entry.startswith(f".{name}.v"))
+
+
+def publish(directory, label, count=8, dim=32):
+    vectors = np.random.default_rng(len(label)).normal(size=(count, dim)).astype(np.float32)
+    build_index([f"{label} chunk {i}" for i in range(count)], vectors, str(directory))
+
+
+def test_publish_swaps_a_symlink_and_keeps_the_previous_version(tmp_path):
+    directory = tmp_path / "vector_index"
+    publish(directory, "first")
+    opened = MmapVectorIndex(str(directory))
+    publish(directory, "second")
+
+    assert os.path.islink(directory)
+    assert MmapVectorIndex(str(directory)).texts[0] == "second chunk 0"
+    # A reader that opened the previous version keeps working.
+    assert os.path.isdir(opened.directory)
+    assert opened.search(np.ones(32, dtype=np.float32), 2)
+
+    publish(directory, "third")
+    assert len(versions(directory)) == 2
+    assert not os.path.exists(opened.directory)
+    assert resolve_directory(str(directory)).endswith(versions(directory)[-1])
+
+
+def test_publish_over_an_unversioned_directory(tmp_path):
+    directory = tmp_path / "vector_index"
+    directory.mkdir()
+    (directory / "legacy.txt").write_text("old store")
+    publish(directory, "fresh")
+
+    assert os.path.islink(directory)
+    assert MmapVectorIndex(str(directory)).texts[0] == "fresh chunk 0"
+    legacy = [entry for entry in versions(directory) if os.path.exists(tmp_path / entry / "legacy.txt")]
+    assert len(legacy) == 1
+
+
+def test_unchanged_chroma_store_is_not_republished(tmp_path):
+    pytest.importorskip("chromadb")
+    directory = str(tmp_path / "chroma_db")
+    chunks = [{"hash": f"h{i}", "text": f"chunk {i}", "source": "test"} for i in range(5)]
+    vectors = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32)
+
+    assert publish_chroma(directory, chunks, vectors) == (5, 0)
+    first = resolve_directory(directory)
+    assert publish_chroma(directory, chunks, vectors) == (0, 0)
+    assert resolve_directory(directory) == first
+
+    assert publish_chroma(directory, chunks[1:], vectors[1:]) == (0, 1)
+    assert resolve_directory(directory) != first
+    assert chroma_ids(directory) == {f"h{i}" for i in range(1, 5)}
+
+
+@pytest.fixture
+def mmap_chat(tmp_path, monkeypatch):
+    prompts = []
+
+    async def complete(messages, endpoint):
+        prompts.append(messages[-1]["content"])
+        return "answer"
+
+    directory = tmp_path / "vector_index"
+    publish(directory, "first")
+    monkeypatch.setattr(query_encoder, "_value", WordHashEncoder())
+    monkeypatch.setattr(llm_gateway, "complete", complete)
+    monkeypatch.setattr(chatbot_utils, "RETRIEVER_BACKEND", "mmap")
+    monkeypatch.setattr(chatbot_utils, "VECTOR_INDEX_DIR", str(directory))
+    monkeypatch.setattr(chatbot_utils, "VECTOR_STORE_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(chatbot_utils, "store_version", None)
+    monkeypatch.setattr(chatbot_utils.vector_store, "_value", chatbot_utils.load_vector_store())
+    chatbot_utils.retrieval_cache.clear()
+    chatbot_utils.answer_cache.clear()
+    return directory, prompts
+
+
+def test_chat_picks_up_a_newly_published_index(mmap_chat):
+    directory, prompts = mmap_chat
+    query = "what is a cibil score"
+    asyncio.run(chatbot_utils.answer_query(query))
+    assert "first chunk" in prompts[-1]
+
+    publish(directory, "second")
+    asyncio.run(chatbot_utils.answer_query(query))
+    assert len(prompts) == 2
+    assert "second chunk" in prompts[-1] and "first chunk" not in prompts[-1]
+    assert chatbot_utils.vector_store.get().directory == resolve_directory(str(directory))
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from models import FeatureSweep
+from utils import what_if
+from utils.loader import model_state
+from utils.what_if import InvalidSweep, approval_boundary, sweep_values
+
+APPLICATION = {
+    "no_of_dependents": 2,
+    "education": "Graduate",
+    "self_employed": False,
+    "income_annum": 5000000,
+    "loan_amount": 10000000,
+    "loan_term": 10,
+    "cibil_score": 750,
+}
+
+
+def sweep(**kwargs):
+    return FeatureSweep(feature=kwargs.pop("feature", "cibil_score"), **kwargs)
+
+
+def test_sweep_values_cover_the_bounds():
+    np.testing.assert_array_equal(sweep_values(sweep(start=300, stop=900, step=100)), [300, 400, 500, 600, 700, 800, 900])
+    # A step that does not divide the range stops at the last point inside it.
+    np.testing.assert_array_equal(sweep_values(sweep(start=0, stop=10, step=4)), [0, 4, 8])
+    np.testing.assert_array_equal(sweep_values(sweep(start=0, stop=10, num=4)), [0, 3, 7, 10])
+    np.testing.assert_array_equal(sweep_values(sweep(start=5, stop=5, num=3)), [5])
+    np.testing.assert_array_equal(sweep_values(sweep(values=[700, 300, 700])), [300, 700])
+
+    default = sweep_values(sweep(start=300, stop=900))
+    assert len(default) == what_if.WHAT_IF_DEFAULT_POINTS
+    assert default[0] == 300 and default[-1] == 900
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"start": 900, "stop": 300},
+    {"start": 300, "stop": 900, "step": 10, "num": 5},
+    {"values": [300], "start": 300},
+    {"start": 300},
+    {},
+    {"values": []},
+    {"start": 0, "stop": 10 ** 12, "step": 1},
+])
+def test_invalid_sweeps_are_rejected(kwargs):
+    with pytest.raises(InvalidSweep):
+        sweep_values(sweep(**kwargs))
+
+
+def what_if_request(client, auth_headers, sweeps, include_shap=False):
+    return client.post(
+        "/predict/what-if",
+        json={"application": APPLICATION, "sweeps": sweeps, "include_shap": include_shap},
+        headers=auth_headers
+    )
+
+
+def test_scenario_grid_is_capped(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(what_if, "WHAT_IF_MAX_SCENARIOS", 100)
+    sweeps = [
+        {"feature": "cibil_score", "start": 300, "stop": 900, "num": 10},
+        {"feature": "loan_term", "start": 2, "stop": 20, "step": 2},
+    ]
+    assert what_if_request(client, auth_headers, sweeps).status_code == 200
+    sweeps[0]["num"] = 20
+    response = what_if_request(client, auth_headers, sweeps)
+    assert response.status_code == 400
+    assert "200 scenarios" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("sweeps", [
+    [{"feature": "cibil_score", "values": []}],
+    [{"feature": "cibil_score", "values": [300]}, {"feature": "cibil_score", "values": [900]}],
+])
+def test_empty_or_repeated_sweeps_are_rejected(client, auth_headers, sweeps):
+    assert what_if_request(client, auth_headers, sweeps).status_code == 400
+
+
+def test_boundary_on_a_monotone_sweep():
+    values = np.array([300, 400, 500, 600, 700, 800, 900])
+    boundary = approval_boundary(["cibil_score"], [values], values >= 600)
+    assert boundary == {"feature": "cibil_score", "slices": [{
+        "at": {},
+        "approved_min": 600,
+        "approved_max": 900,
+        "transitions": [{"between": [500, 600], "approved_above": True}],
+    }]}
+
+    terms = np.array([2, 10])
+    approved = np.stack([values >= 600, values >= 800], axis=1)
+    slices = approval_boundary(["cibil_score", "loan_term"], [values, terms], approved)["slices"]
+    assert [s["at"] for s in slices] == [{"loan_term": 2}, {"loan_term": 10}]
+    assert [s["transitions"][0]["between"] for s in slices] == [[500, 600], [700, 800]]
+
+    never = approval_boundary(["cibil_score"], [values], np.zeros(len(values), dtype=bool))["slices"][0]
+    assert never["approved_min"] is None and never["transitions"] == []
+
+
+def test_model_boundary_follows_the_cibil_cut(client, auth_headers):
+    # The test model approves above a CIBIL score of about 550.
+    sweeps = [{"feature": "cibil_score", "start": 300, "stop": 900, "step": 50}]
+    result = what_if_request(client, auth_headers, sweeps).json()
+    transitions = result["boundary"]["slices"][0]["transitions"]
+    assert len(transitions) == 1 and transitions[0]["approved_above"]
+    low, high = transitions[0]["between"]
+    assert low <= 550 <= high
+
+
+def test_without_shap_the_explainer_is_never_called(client, auth_headers, serving_model, monkeypatch):
+    pipeline, explainer, model_info = model_state.get()
+    calls = []
+
+    def refuse(*args, **kwargs):
+        raise AssertionError("include_shap=false must not run the explainer")
+
+    def predict_proba(features):
+        calls.append(len(features))
+        return type(pipeline.named_steps['model']).predict_proba(pipeline.named_steps['model'], features)
+
+    monkeypatch.setattr(what_if, "score", refuse)
+    monkeypatch.setattr(pipeline.named_steps['model'], "predict_proba", predict_proba)
+    model_state.swap((pipeline, refuse, model_info))
+    try:
+        sweeps = [{"feature": "cibil_score", "values": [400, 800]}]
+        response = what_if_request(client, auth_headers, sweeps)
+    finally:
+        model_state.swap((pipeline, explainer, model_info))
+
+    assert response.status_code == 200
+    assert "shap_values" not in response.json()
+    assert calls == [3]
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from pymongo.errors import AutoReconnect
+from benchmarks.memory_db import MemoryCollection
+from utils import write_behind
+from utils.write_behind import WriteBehindBuffer
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(write_behind, "_backoff", lambda attempt: 0)
+
+
+def flush_with_hook(hook, retries=3):
+    collection = MemoryCollection("loan_history")
+    writer = WriteBehindBuffer(collection, retries=retries, on_flush=hook)
+
+    async def run():
+        for i in range(3):
+            await writer.add({"user_id": "alice", "n": i})
+        await writer.close()
+        return await collection.count_documents({})
+
+    return writer, asyncio.run(run())
+
+
+def test_transient_hook_failures_are_retried():
+    calls = []
+
+    async def hook(docs):
+        calls.append(len(docs))
+        if len(calls) < 3:
+            raise AutoReconnect("primary stepped down")
+
+    writer, stored = flush_with_hook(hook)
+    assert stored == 3 and calls == [3, 3, 3]
+    assert writer.stats()["hook_retries"] == 2
+    assert writer.stats()["hook_failures"] == 0
+
+
+def test_a_hook_that_keeps_failing_is_counted():
+    calls = []
+
+    async def hook(docs):
+        calls.append(len(docs))
+        raise AutoReconnect("no primary")
+
+    writer, stored = flush_with_hook(hook, retries=2)
+    assert stored == 3 and len(calls) == 3
+    assert writer.stats()["hook_failures"] == 1
+
+
+def test_a_broken_hook_is_not_retried():
+    calls = []
+
+    async def hook(docs):
+        calls.append(len(docs))
+        raise KeyError("outputs")
+
+    writer, stored = flush_with_hook(hook)
+    assert stored == 3 and calls == [3]
+    assert writer.stats()["hook_retries"] == 0
+    assert writer.stats()["hook_failures"] == 1
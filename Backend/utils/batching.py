@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import time
+from utils.metrics import deferred_stages, record_stages, add_request_timings
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, float("inf")]
+
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into one handler call per batch.
+
+    A batch is closed when it reaches max_batch_size or when max_wait_ms has
+    passed since its first item arrived. The handler receives the list of items
+    and must return one result per item, in order. Up to max_concurrency
+    batches run at once; while they are all busy, new items queue up and go
+    out together in the next batch.
+    """
+
+    def __init__(self, handler, max_batch_size: int = 64, max_wait_ms: float = 2.0, max_concurrency: int = 1):
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrency = max(1, max_concurrency)
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._slots = None
+        self._running = set()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            # The worker serves every caller, so it must not inherit the
+            # context (and Server-Timing list) of the request that started it.
+            self._worker = contextvars.Context().run(loop.create_task, self._run())
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        result, stages = await future
+        add_request_timings(stages)
+        return result
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # A slot is taken before collecting, so the batch keeps filling
+            # for as long as every slot is busy.
+            await self._slots.acquire()
+            batch = await self._collect()
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            self._record(batch)
+            task = self._loop.create_task(self._dispatch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, batch):
+        items = [item for item, _, _ in batch]
+        try:
+            # Stages are recorded once for the batch and reported in the
+            # Server-Timing of every request that was part of it.
+            with deferred_stages() as stages:
+                try:
+                    results = await self.handler(items)
+                    error = None
+                except Exception as e:
+                    error = e
+        finally:
+            self._slots.release()
+        record_stages(stages)
+        if error is not None:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, stages))
+
+    def _record(self, batch):
+        now = time.perf_counter()
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._largest_batch = max(self._largest_batch, size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self._size_histogram[bucket] += 1
+                break
+        for _, _, enqueued_at in batch:
+            wait = now - enqueued_at
+            self._queue_wait_total += wait
+            self._queue_wait_max = max(self._queue_wait_max, wait)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_concurrency": self.max_concurrency,
+            "batches_in_flight": len(self._running),
+            "batches": self._batches,
+            "requests": self._items,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "batch_size_histogram": {f"le_{bucket}": count for bucket, count in self._size_histogram.items()},
+            "avg_queue_wait_ms": round(self._queue_wait_total / self._items * 1000, 3) if self._items else 0.0,
+            "max_queue_wait_ms": round(self._queue_wait_max * 1000, 3),
+        }
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from cachetools import LRUCache, TTLCache
+
+
+def significant_bucket(value, digits: int = 2):
+    # 1_234_567 -> 1_200_000: keeps relative precision for money amounts
+    return float(f"{float(value):.{digits}g}")
+
+
+def step_bucket(value, step: float):
+    return int(float(value) // step * step)
+
+
+def signature_key(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class MongoCacheStore:
+    def __init__(self, collection, ttl: float):
+        self.collection = collection
+        self.ttl = ttl
+        self._index_ready = False
+
+    async def _ensure_index(self):
+        if not self._index_ready:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._index_ready = True
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": key})
+        if doc is None:
+            return None
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return doc["value"]
+
+    async def set(self, key, value):
+        await self._ensure_index()
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+
+class DiskCacheStore:
+    def __init__(self, directory: str, size_limit: int = 2 ** 30):
+        from diskcache import Cache
+        self.cache = Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+
+    async def get(self, key):
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def set(self, key, value):
+        await asyncio.to_thread(self.cache.set, key, value)
+
+    def close(self):
+        self.cache.close()
+
+
+class TieredCache:
+    """In-process LRU (or LRU+TTL) cache with an optional persistent second tier.
+
+    Concurrent misses on the same key share one factory call.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None, store=None):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl) if ttl else LRUCache(maxsize=maxsize)
+        self.store = store
+        self._inflight = {}
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.store_errors = 0
+
+    async def _store_get(self, key):
+        try:
+            return await self.store.get(key)
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Warning: cache store lookup failed: {e}")
+            return None
+
+    async def _store_set(self, key, value):
+        try:
+            await self.store.set(key, value)
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Warning: cache store write failed: {e}")
+
+    def get_local(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    async def get(self, key):
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        if self.store is not None:
+            value = await self._store_get(key)
+            if value is not None:
+                self.store_hits += 1
+                self.local[key] = value
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        self.local[key] = value
+        if self.store is not None:
+            await self._store_set(key, value)
+
+    async def get_or_create(self, key, factory):
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await factory()
+            await self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; retrieve it here so it is never reported as unhandled.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        lookups = self.hits + self.store_hits + self.misses
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "ttl_seconds": getattr(self.local, "ttl", None),
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "store_errors": self.store_errors,
+            "hit_rate": round((self.hits + self.store_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SemanticCache:
+    """Answers keyed by unit-normalized embeddings, matched on cosine similarity.
+
+    Lookups are a single matrix-vector product over the live entries, which is
+    cheap for the few thousand entries this is sized for.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _index(self):
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][0] for key in self._keys]) if self._keys else None
+        return self._matrix
+
+    def lookup(self, embedding):
+        self._evict_expired()
+        matrix = self._index()
+        if matrix is not None:
+            similarities = matrix @ self._normalize(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                key = self._keys[best]
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][1]
+        self.misses += 1
+        return None
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+
+    def add(self, embedding, value):
+        self._entries[self._next_key] = (self._normalize(embedding), value, time.monotonic() + self.ttl)
+        self._next_key += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,20 +1,139 @@
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+import asyncio
 import os
+import threading
+import time
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from langchain_core.prompts import ChatPromptTemplate
+from utils.llm_gateway import llm_gateway
+from utils.cache import SemanticCache
+from utils.embedding_engine import query_encoder, embed_query as embed_batched
+from utils.metrics import stage
+from utils.resources import lazy_resource
+from utils.vector_index import resolve_directory
+
 load_dotenv()
 
-llm = ChatGroq(model="llama-3.1-8b-instant", groq_api_key=os.getenv("GROQ_API_KEY"))
+CHAT_RETRIEVAL_CACHE_SIZE = int(os.getenv("CHAT_RETRIEVAL_CACHE_SIZE", "2048"))
+CHAT_RETRIEVAL_CACHE_TTL = float(os.getenv("CHAT_RETRIEVAL_CACHE_TTL", "86400"))
+CHAT_ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", "1024"))
+CHAT_ANSWER_CACHE_TTL = float(os.getenv("CHAT_ANSWER_CACHE_TTL", "86400"))
+CHAT_SEMANTIC_THRESHOLD = float(os.getenv("CHAT_SEMANTIC_THRESHOLD", "0.95"))
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+VECTOR_STORE_CHECK_INTERVAL = float(os.getenv("VECTOR_STORE_CHECK_INTERVAL", "5"))
+CHROMA_DIR = "chroma_db"
+RETRIEVAL_K = 4
+
+def store_directory():
+    return VECTOR_INDEX_DIR if RETRIEVER_BACKEND == "mmap" else CHROMA_DIR
+
+# Version (resolved directory) the loaded store was opened from; ingest
+# publishes new versions behind a symlink, see utils.vector_index.
+store_version = None
+store_checked_at = 0.0
+
+def load_vector_store():
+    global store_version
+    version = resolve_directory(store_directory())
+    if RETRIEVER_BACKEND == "mmap":
+        from utils.vector_index import MmapVectorIndex
+        store = MmapVectorIndex(version)
+    else:
+        from langchain_chroma import Chroma
+        store = Chroma(persist_directory=version)
+    store_version = version
+    return store
+
+vector_store = lazy_resource("chat_vector_store", load_vector_store)
+
+def search_by_vector(embedding, k):
+    store = vector_store.get()
+    if RETRIEVER_BACKEND == "mmap":
+        return store.search(embedding, k)
+    return [result.page_content for result in store.similarity_search_by_vector(embedding, k=k)]
+
+# Level 1: exact query text -> embedding and retrieved chunks.
+retrieval_cache = TTLCache(maxsize=CHAT_RETRIEVAL_CACHE_SIZE, ttl=CHAT_RETRIEVAL_CACHE_TTL)
+retrieval_cache_lock = threading.Lock()
+retrieval_stats = {"hits": 0, "misses": 0}
+
+# Level 2: answers reused for queries whose embeddings are near-duplicates.
+answer_cache = SemanticCache(
+    maxsize=CHAT_ANSWER_CACHE_SIZE,
+    ttl=CHAT_ANSWER_CACHE_TTL,
+    threshold=CHAT_SEMANTIC_THRESHOLD
+)
+
+def vector_store_changed():
+    """Whether ingest has published a newer store than the one loaded (checked
+    at most every VECTOR_STORE_CHECK_INTERVAL seconds)."""
+    global store_checked_at
+    now = time.monotonic()
+    if store_version is None or now - store_checked_at < VECTOR_STORE_CHECK_INTERVAL:
+        return False
+    store_checked_at = now
+    return resolve_directory(store_directory()) != store_version
+
+async def refresh_vector_store():
+    # The new version is loaded off the event loop while the old one keeps
+    # serving; cached chunks and answers came from the old one, so they go.
+    if not vector_store_changed():
+        return
+    try:
+        store = await asyncio.to_thread(load_vector_store)
+    except Exception as e:
+        print(f"Warning: failed to load the new vector store: {e}")
+        return
+    vector_store.swap(store)
+    with retrieval_cache_lock:
+        retrieval_cache.clear()
+    answer_cache.clear()
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(persist_directory="chroma_db", embedding_function=embeddings)
-retriever = vectorstore.as_retriever()
-def custom_retriever(query):
-    results = retriever.invoke(query, k=4)
-    return [result.page_content for result in results]
+def _cache_key(query):
+    return " ".join(query.lower().split())
+
+def _cached_entry(key):
+    with retrieval_cache_lock:
+        entry = retrieval_cache.get(key)
+        retrieval_stats["hits" if entry is not None else "misses"] += 1
+    return entry
+
+def _store_entry(key, embedding):
+    with retrieval_cache_lock:
+        entry = retrieval_cache.get(key) or {"embedding": embedding, "chunks": None}
+        retrieval_cache[key] = entry
+    return entry
+
+def _retrieval_entry(query):
+    key = _cache_key(query)
+    entry = _cached_entry(key)
+    if entry is None:
+        with stage("embed"):
+            embedding = query_encoder.get().encode([query])[0].tolist()
+        entry = _store_entry(key, embedding)
+    return entry
+
+async def query_entry(query):
+    # Misses are coalesced with concurrent /chat queries into one forward
+    # pass on the embedding worker.
+    key = _cache_key(query)
+    entry = _cached_entry(key)
+    if entry is None:
+        with stage("embed"):
+            embedding = await embed_batched(query)
+        entry = _store_entry(key, embedding)
+    return entry
+
+def custom_retriever(query, entry=None):
+    # A request that already looked up its entry passes it in, so the
+    # retrieval cache counts one hit or miss per query.
+    if entry is None:
+        entry = _retrieval_entry(query)
+    if entry["chunks"] is None:
+        with stage("retrieval"):
+            entry["chunks"] = search_by_vector(entry["embedding"], RETRIEVAL_K)
+    return entry["chunks"]
 
 prompt = ChatPromptTemplate.from_template("""
     You are an expert financial assistant specializing in loans and personal finance.
@@ -35,8 +154,54 @@ prompt = ChatPromptTemplate.from_template("""
     {question}
 """)
 
-chain = (
-    {"context": custom_retriever, "question": RunnablePassthrough()}
-    | prompt
-    | llm
-)
\ No newline at end of file
+MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+def build_messages(context, query):
+    return [
+        {"role": MESSAGE_ROLES.get(message.type, "user"), "content": message.content}
+        for message in prompt.format_messages(context=context, question=query)
+    ]
+
+async def answer_query(query):
+    await refresh_vector_store()
+    entry = await query_entry(query)
+    embedding = entry["embedding"]
+    with stage("answer_cache"):
+        cached = answer_cache.lookup(embedding)
+    if cached is not None:
+        return cached
+
+    context = await asyncio.to_thread(custom_retriever, query, entry)
+    answer = await llm_gateway.complete(build_messages(context, query), endpoint="chat")
+    answer_cache.add(embedding, answer)
+    return answer
+
+async def stream_answer(query):
+    await refresh_vector_store()
+    entry = await query_entry(query)
+    embedding = entry["embedding"]
+    with stage("answer_cache"):
+        cached = answer_cache.lookup(embedding)
+    if cached is not None:
+        yield cached
+        return
+
+    context = await asyncio.to_thread(custom_retriever, query, entry)
+    parts = []
+    async for token in llm_gateway.stream(build_messages(context, query), endpoint="chat"):
+        parts.append(token)
+        yield token
+    answer_cache.add(embedding, "".join(parts))
+
+def chat_cache_stats():
+    lookups = retrieval_stats["hits"] + retrieval_stats["misses"]
+    return {
+        "retrieval": {
+            "size": len(retrieval_cache),
+            "maxsize": retrieval_cache.maxsize,
+            "ttl_seconds": retrieval_cache.ttl,
+            **retrieval_stats,
+            "hit_rate": round(retrieval_stats["hits"] / lookups, 4) if lookups else 0.0,
+        },
+        "answers": answer_cache.stats(),
+    }
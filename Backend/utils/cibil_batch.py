@@ -0,0 +1,120 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from models import CIBILScoreRequest
+from utils.cibil_utils import CIBILScoreCalculator
+
+INPUT_COLUMNS = list(CIBILScoreRequest.model_fields)
+COMPONENTS = ['payment_history', 'credit_utilization', 'credit_age', 'credit_mix', 'new_credit']
+
+
+def read_chunks(path: str, chunksize: int):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, frame):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a" if self._wrote_header else "w", header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def verify_sample(calculator, chunk, scores, components, sample_size, rng):
+    rows = rng.choice(len(chunk), size=min(sample_size, len(chunk)), replace=False)
+    for row in rows:
+        fields = {
+            name: chunk[name].iloc[row].item()
+            for name in INPUT_COLUMNS if name in chunk
+        }
+        score, breakdown = calculator.calculate_score(CIBILScoreRequest(**fields))
+        if score != scores[row] or any(breakdown[key] != components[key][row] for key in COMPONENTS):
+            raise SystemExit(f"Vectorized result differs from calculate_score for input {fields}")
+
+
+def invalid_rows(chunk):
+    """Positions of rows with an empty value in any input column present.
+
+    An empty value in an optional column is not the same as leaving the
+    column out: NaN would silently land in a bin and produce a score.
+    """
+    columns = [name for name in INPUT_COLUMNS if name in chunk]
+    return np.flatnonzero(~chunk[columns].notna().all(axis=1).to_numpy())
+
+
+def score_file(input_path, output_path, chunksize, verify):
+    calculator = CIBILScoreCalculator()
+    writer = ChunkWriter(output_path)
+    rng = np.random.default_rng(0)
+    total = 0
+    rejected = []
+    offset = 0
+    started = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunksize):
+            missing = {"on_time_payments_percent"} - set(chunk.columns)
+            if missing:
+                raise SystemExit(f"Input is missing required columns: {sorted(missing)}")
+
+            bad = invalid_rows(chunk)
+            # 1-based data row numbers (the CSV header is not counted).
+            rejected.extend((offset + bad + 1).tolist())
+            offset += len(chunk)
+            if len(bad):
+                # A column with blanks was read as object; re-infer it now
+                # that they are gone.
+                chunk = chunk.drop(index=chunk.index[bad]).infer_objects()
+            if chunk.empty:
+                continue
+
+            arrays = {name: chunk[name].to_numpy() for name in INPUT_COLUMNS if name in chunk}
+            scores, components = calculator.calculate_scores(arrays)
+            if verify:
+                verify_sample(calculator, chunk, scores, components, verify, rng)
+
+            chunk = chunk.assign(cibil_score=scores, **components)
+            writer.write(chunk)
+            total += len(chunk)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s) -> {output_path}")
+    if rejected:
+        shown = ", ".join(map(str, rejected[:20])) + (", ..." if len(rejected) > 20 else "")
+        raise SystemExit(f"Skipped {len(rejected)} row(s) with empty values, not scored: {shown}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet book of credit profiles with the vectorized CIBIL calculator.")
+    parser.add_argument("input", help="input .csv or .parquet with CIBILScoreRequest columns")
+    parser.add_argument("output", help="output .csv or .parquet; inputs plus cibil_score and component columns")
+    parser.add_argument("--chunksize", type=int, default=200000, help="rows held in memory at a time")
+    parser.add_argument("--verify", type=int, default=0, metavar="N", help="check N random rows per chunk against calculate_score")
+    args = parser.parse_args()
+    score_file(args.input, args.output, args.chunksize, args.verify)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
 import os
-from langchain_groq import ChatGroq
+import numpy as np
 from dotenv import load_dotenv
 from models import CIBILScoreRequest
+from utils.llm_gateway import llm_gateway
+from utils.cache import TieredCache, DiskCacheStore, step_bucket, signature_key
+from utils.placeholders import PlaceholderStream, fill_placeholders, placeholder
 
 load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
+
+SUGGESTION_STORE_SIZE = int(os.getenv("SUGGESTION_STORE_SIZE", "4096"))
+SUGGESTION_STORE_DIR = os.getenv("SUGGESTION_STORE_DIR")
+
+def _round_array(values, digits):
+    # np.round rounds the binary product values * 10**digits, so it can differ
+    # from Python's round() on near-ties; those few elements use round().
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, digits) for value in values[near_tie].tolist()]
+    return rounded
 
 class CIBILScoreCalculator:
 
@@ -102,10 +117,151 @@ class CIBILScoreCalculator:
         }
         return self.calculate_final_score(components)
 
+    # Columnar counterpart of calculate_score. Every step mirrors the scalar
+    # path operation for operation (including summation order) so both give
+    # identical scores.
+    UTILIZATION_BINS = [10, 30, 50, 75]
+    UTILIZATION_SCORES = np.array([1.0, 0.90, 0.70, 0.45, 0.20])
+    CREDIT_AGE_BINS = [1, 3, 5, 8]
+    CREDIT_AGE_SCORES = np.array([0.35, 0.55, 0.75, 0.90, 1.0])
+
+    def calculate_scores(self, arrays):
+        n = len(np.asarray(arrays["on_time_payments_percent"]))
+
+        def column(name, default=0, dtype=float):
+            if name in arrays:
+                return np.asarray(arrays[name], dtype=dtype)
+            return np.full(n, default, dtype=dtype)
+
+        on_time = column("on_time_payments_percent")
+        days_late = column("days_late_avg")
+
+        base = on_time / 100.0
+        base = np.where(on_time < 95, base - (0.95 - on_time / 100) * 1.5, base)
+        late_penalty = np.minimum(days_late / 30, 1.0)
+        base = np.where(days_late > 0, base * (1 - late_penalty * 0.4), base)
+        payment_history = _round_array(np.clip(base, 0.0, 1.0), 4)
+
+        credit_utilization = self.UTILIZATION_SCORES[
+            np.digitize(column("utilization_percent"), self.UTILIZATION_BINS, right=True)
+        ]
+        credit_age = self.CREDIT_AGE_SCORES[
+            np.digitize(column("credit_age_years"), self.CREDIT_AGE_BINS)
+        ]
+
+        mix = np.zeros(n)
+        mix = np.where(column("num_secured_loans", dtype=np.int64) > 0, mix + 0.40, mix)
+        mix = np.where(column("num_unsecured_loans", dtype=np.int64) > 0, mix + 0.30, mix)
+        mix = np.where(column("has_credit_card", False, dtype=bool), mix + 0.30, mix)
+        credit_mix = _round_array(np.minimum(mix, 1.0), 4)
+
+        inquiry_penalty = np.minimum(column("num_inquiries_6months", dtype=np.int64) * 0.12, 0.60)
+        new_acct_penalty = np.minimum(column("num_new_accounts_6months", dtype=np.int64) * 0.20, 0.60)
+        penalty = np.maximum(inquiry_penalty, new_acct_penalty)
+        new_credit = _round_array(np.maximum(1.0 - penalty, 0.2), 4)
+
+        components = {
+            'payment_history': payment_history,
+            'credit_utilization': credit_utilization,
+            'credit_age': credit_age,
+            'credit_mix': credit_mix,
+            'new_credit': new_credit
+        }
+
+        weighted_sum = np.zeros(n)
+        for key in components:
+            weighted_sum = weighted_sum + components[key] * self.weights[key]
 
-llm = ChatGroq(model="llama-3.1-8b-instant", groq_api_key=groq_api_key)
+        scaled = self.MIN_SCORE + weighted_sum * self.SCORE_RANGE
+        final = np.rint(scaled).astype(np.int64)
+        return np.clip(final, self.MIN_SCORE, self.MAX_SCORE), components
+
+
+suggestion_store = TieredCache(
+    maxsize=SUGGESTION_STORE_SIZE,
+    store=DiskCacheStore(SUGGESTION_STORE_DIR) if SUGGESTION_STORE_DIR else None
+)
+
+# Bumped whenever stored suggestions stop being valid for the current prompt.
+SUGGESTION_TEMPLATE_VERSION = 2
+
+# Counts are capped in the signature; at or above the cap the prompt only
+# knows "this many or more".
+SUGGESTION_COUNT_CAPS = {
+    "num_secured_loans": 5,
+    "num_unsecured_loans": 5,
+    "num_inquiries_6months": 10,
+    "num_new_accounts_6months": 10
+}
+
+SUGGESTION_STEPS = {
+    "on_time_payments_percent": 1,
+    "days_late_avg": 5,
+    "utilization_percent": 5,
+    "credit_age_years": 1
+}
+
+def suggestion_profile(input_data):
+    # Everything about the profile that the prompt shows the LLM. The store
+    # key is built from the same values, so stored suggestions only reflect
+    # what all profiles sharing the key have in common.
+    profile = {name: step_bucket(input_data.get(name, 0), step) for name, step in SUGGESTION_STEPS.items()}
+    profile.update({name: min(input_data.get(name, 0), cap) for name, cap in SUGGESTION_COUNT_CAPS.items()})
+    profile["has_credit_card"] = bool(input_data.get("has_credit_card", False))
+    return profile
+
+def suggestion_figures(input_data):
+    # The exact values filled into the stored text for each requester.
+    return {name: f"{input_data.get(name, 0):g}" for name in (*SUGGESTION_STEPS, *SUGGESTION_COUNT_CAPS)}
+
+def suggestion_signature(input_data, breakdown):
+    components = tuple(breakdown[key] for key in sorted(breakdown))
+    profile = tuple(suggestion_profile(input_data).values())
+    return signature_key(SUGGESTION_TEMPLATE_VERSION, components, profile)
 
 async def get_improvement_suggestions(input_data, score, breakdown):
+    key = suggestion_signature(input_data, breakdown)
+    template = await suggestion_store.get_or_create(
+        key, lambda: generate_improvement_suggestions(input_data, score, breakdown)
+    )
+    return fill_placeholders(template, suggestion_figures(input_data))
+
+async def stream_improvement_suggestions(input_data, score, breakdown):
+    key = suggestion_signature(input_data, breakdown)
+    figures = suggestion_figures(input_data)
+    cached = await suggestion_store.get(key)
+    if cached is not None:
+        yield fill_placeholders(cached, figures)
+        return
+
+    parts = []
+    filled = PlaceholderStream(figures)
+    async for token in llm_gateway.stream(build_suggestions_prompt(input_data, score, breakdown), endpoint="cibil_suggestions"):
+        parts.append(token)
+        text = filled.feed(token)
+        if text:
+            yield text
+    text = filled.finish()
+    if text:
+        yield text
+    await suggestion_store.set(key, "".join(parts))
+
+async def generate_improvement_suggestions(input_data, score, breakdown):
+    return await llm_gateway.complete(build_suggestions_prompt(input_data, score, breakdown), endpoint="cibil_suggestions")
+
+def _profile_value(profile, name, unit=""):
+    # The placeholder for the exact value, with what the prompt may know about it.
+    if name in SUGGESTION_STEPS:
+        low = profile[name]
+        return f"{placeholder(name)}{unit} (between {low}{unit} and {low + SUGGESTION_STEPS[name]}{unit})"
+    if profile[name] >= SUGGESTION_COUNT_CAPS[name]:
+        return f"{placeholder(name)} ({profile[name]} or more)"
+    return str(profile[name])
+
+def build_suggestions_prompt(input_data, score, breakdown):
+    # Built only from the breakdown and suggestion_profile, the values
+    # suggestion_signature keys on; the score follows from the breakdown.
+    profile = suggestion_profile(input_data)
     prompt = f"""
     You are an expert financial advisor specializing in credit health and CIBIL score improvement.
     Analyze the provided credit profile to deliver a concise, personalized credit health assessment.
@@ -123,15 +279,17 @@ async def get_improvement_suggestions(input_data, score, breakdown):
     - New Credit: {breakdown["new_credit"] * 100:.0f}%
 
     **Credit Profile:**
-    - On-time Payments: {input_data.get("on_time_payments_percent", 0)}%
-    - Average Days Late: {input_data.get("days_late_avg", 0)}
-    - Credit Utilization: {input_data.get("utilization_percent", 0)}%
-    - Credit Age: {input_data.get("credit_age_years", 0)} years
-    - Secured Loans: {input_data.get("num_secured_loans", 0)}
-    - Unsecured Loans: {input_data.get("num_unsecured_loans", 0)}
-    - Has Credit Card: {"Yes" if input_data.get("has_credit_card", False) else "No"}
-    - Credit Inquiries (Last 6 Months): {input_data.get("num_inquiries_6months", 0)}
-    - New Accounts (Last 6 Months): {input_data.get("num_new_accounts_6months", 0)}
+    - On-time Payments: {_profile_value(profile, "on_time_payments_percent", "%")}
+    - Average Days Late: {_profile_value(profile, "days_late_avg")}
+    - Credit Utilization: {_profile_value(profile, "utilization_percent", "%")}
+    - Credit Age: {_profile_value(profile, "credit_age_years")} years
+    - Secured Loans: {_profile_value(profile, "num_secured_loans")}
+    - Unsecured Loans: {_profile_value(profile, "num_unsecured_loans")}
+    - Has Credit Card: {"Yes" if profile["has_credit_card"] else "No"}
+    - Credit Inquiries (Last 6 Months): {_profile_value(profile, "num_inquiries_6months")}
+    - New Accounts (Last 6 Months): {_profile_value(profile, "num_new_accounts_6months")}
+
+    Exact Figures: whenever you mention a profile value shown as a placeholder, write the placeholder exactly as shown (e.g. {placeholder("utilization_percent")}%); it is replaced with the applicant's exact value. Never write the ranges given in brackets as the applicant's value.
 
     ---
 
@@ -147,7 +305,7 @@ async def get_improvement_suggestions(input_data, score, breakdown):
 
     #### 2. Key Strengths
     - Highlight the strongest contributors based on the score breakdown.
-    - Seamlessly integrate exact values from the profile (e.g., "Your credit utilization of 30% is healthy...").
+    - Seamlessly integrate the profile values (e.g., "Your credit utilization of {placeholder("utilization_percent")}% is healthy...").
 
     #### 3. Areas to Improve
     - Focus strictly on the weakest components from the breakdown, ranked by impact.
@@ -161,5 +319,4 @@ async def get_improvement_suggestions(input_data, score, breakdown):
     #### 5. Closing
     - End with a short, encouraging message focused on maintenance (if high score) or gradual progress (if lower score).
     """
-    response = llm.invoke(prompt)
-    return response.content
+    return prompt
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from utils.batching import MicroBatcher
+from utils.metrics import stage
+from utils.resources import lazy_resource
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "embedding_onnx")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "2"))
+
+MANIFEST_FILE = "manifest.json"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class SentenceTransformerEncoder:
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        self.model = HuggingFaceEmbeddings(model_name=model_name)
+
+    def encode(self, texts):
+        return np.asarray(self.model.embed_documents(list(texts)), dtype=np.float32)
+
+
+class OnnxEncoder:
+    """Runs an exported transformer with onnxruntime and pools like sentence-transformers.
+
+    Tokenization uses the model's fast tokenizer directly, so neither torch
+    nor transformers is imported at serving time.
+    """
+    backend = "onnx"
+
+    def __init__(self, directory: str = EMBEDDING_ONNX_DIR, threads: int = EMBEDDING_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from utils.vector_index import resolve_directory
+
+        directory = resolve_directory(directory)
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["model"] != EMBEDDING_MODEL:
+            raise ValueError(f"{directory} was exported from {self.manifest['model']}, not {EMBEDDING_MODEL}")
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(directory, self.manifest["model_file"]), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.manifest["max_length"])
+        self.tokenizer.enable_padding(pad_id=self.manifest["pad_id"], pad_token=self.manifest["pad_token"])
+
+    def encode(self, texts):
+        # Same newline handling as HuggingFaceEmbeddings.embed_documents.
+        encodings = self.tokenizer.encode_batch([text.replace("\n", " ") for text in texts])
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.manifest["normalize"]:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def load_encoder(backend: str = None):
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        try:
+            return OnnxEncoder()
+        except Exception as e:
+            print(f"Warning: ONNX embedding model unavailable, falling back to sentence-transformers: {e}")
+    return SentenceTransformerEncoder()
+
+
+query_encoder = lazy_resource("chat_embeddings", load_encoder)
+
+# One dedicated thread runs every forward pass: the runtime's own intra-op
+# threads parallelize a batch, and batches never compete with each other or
+# with the event loop.
+embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+
+def encode_batch(texts):
+    with stage("embed_batch"):
+        return query_encoder.get().encode(texts)
+
+
+async def _embed_coalesced(texts):
+    vectors = await asyncio.get_running_loop().run_in_executor(embedding_executor, encode_batch, texts)
+    return [vector.tolist() for vector in vectors]
+
+
+query_batcher = MicroBatcher(
+    _embed_coalesced,
+    max_batch_size=EMBEDDING_MAX_BATCH,
+    max_wait_ms=EMBEDDING_BATCH_WINDOW_MS
+)
+
+
+async def embed_query(text: str):
+    return await query_batcher.submit(text)
+
+
+def embedding_stats():
+    return {
+        "backend": query_encoder.get().backend if query_encoder.ready else None,
+        **query_batcher.stats(),
+    }
+
+
+def export_onnx(directory: str, model_name: str = EMBEDDING_MODEL, quantize: bool = True):
+    """Export the transformer to ONNX (optionally int8 dynamic-quantized) for OnnxEncoder."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from utils.vector_index import staging_directory, swap_directory
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"{model_name} does not use mean pooling")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    staging = staging_directory(directory)
+    sample = tokenizer(["an export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    fp32_path = os.path.join(staging, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=17,
+            dynamo=False
+        )
+
+    model_file = "model.onnx"
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(staging, "model_int8.onnx"), weight_type=QuantType.QInt8)
+        model_file = "model_int8.onnx"
+
+    tokenizer.backend_tokenizer.save(os.path.join(staging, TOKENIZER_FILE))
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "model": model_name,
+            "model_file": model_file,
+            "quantized": quantize,
+            "max_length": model.max_seq_length,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+            "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        }, f)
+    swap_directory(staging, directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the chatbot query-embedding model to ONNX.")
+    parser.add_argument("--out", default=EMBEDDING_ONNX_DIR, help="directory to write")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--no-quantize", action="store_true", help="keep float32 weights")
+    args = parser.parse_args()
+    export_onnx(args.out, args.model, quantize=not args.no_quantize)
+    print(f"Exported {args.model} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from types import SimpleNamespace
+from utils.metrics import deferred_stages, record_stages
+
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "256"))
+
+
+class InferenceQueueFull(Exception):
+    pass
+
+
+def _preload_model_state(version=None, run_id=None):
+    # Runs once per worker process so the pipeline and explainer are
+    # deserialized before the first task instead of on it. Workers load the
+    # version the parent validated and serves, never whatever the registry
+    # alias points at by the time they spawn.
+    from utils.loader import model_state, load_version
+    if version is None:
+        model_state.get()
+        return
+    model_state.swap(load_version(SimpleNamespace(version=version, run_id=run_id)))
+
+
+def _preload_args(model_info=None):
+    if model_info is None:
+        from utils.loader import model_state
+        if not model_state.ready:
+            return ()
+        model_info = model_state.get()[2]
+    return (str(model_info.version), getattr(model_info, "run_id", None))
+
+
+def _noop():
+    return None
+
+
+def _timed_call(func, args):
+    # Pool workers do not share the caller's context (or, for processes, its
+    # metrics), so stages are collected here and recorded by run().
+    started = time.perf_counter()
+    with deferred_stages() as stages:
+        result = func(*args)
+    return result, started, time.perf_counter(), stages
+
+
+class InferenceExecutor:
+    def __init__(self, kind: str = "thread", max_workers: int = 1, max_queue: int = 256):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self._pool = None
+        self._pending = 0
+        self._tasks = {}
+
+    def _create_pool(self, model_info=None):
+        if self.kind == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_preload_model_state,
+                initargs=_preload_args(model_info)
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = self._create_pool()
+        return self._pool
+
+    async def run(self, func, *args):
+        if self._pending >= self.max_queue:
+            raise InferenceQueueFull(f"Inference queue is full ({self.max_queue} pending tasks)")
+
+        name = getattr(func, "__qualname__", repr(func))
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished, stages = await loop.run_in_executor(self._get_pool(), _timed_call, func, args)
+        except Exception:
+            self._task_stats(name)["errors"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        self._record(name, started - submitted, finished - started)
+        record_stages(stages)
+        return result
+
+    def _task_stats(self, name):
+        if name not in self._tasks:
+            self._tasks[name] = {
+                "count": 0,
+                "errors": 0,
+                "run_total": 0.0,
+                "run_max": 0.0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+            }
+        return self._tasks[name]
+
+    def _record(self, name, wait, run):
+        task = self._task_stats(name)
+        task["count"] += 1
+        task["run_total"] += run
+        task["run_max"] = max(task["run_max"], run)
+        task["wait_total"] += wait
+        task["wait_max"] = max(task["wait_max"], wait)
+
+    def stats(self):
+        tasks = {}
+        for name, task in self._tasks.items():
+            count = task["count"]
+            tasks[name] = {
+                "count": count,
+                "errors": task["errors"],
+                "avg_run_ms": round(task["run_total"] / count * 1000, 3) if count else 0.0,
+                "max_run_ms": round(task["run_max"] * 1000, 3),
+                "avg_queue_wait_ms": round(task["wait_total"] / count * 1000, 3) if count else 0.0,
+                "max_queue_wait_ms": round(task["wait_max"] * 1000, 3),
+            }
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "tasks": tasks,
+        }
+
+    def recycle(self, model_info=None):
+        # Worker processes hold their own copy of the model, so after a model
+        # swap they are replaced. The new pool is spawned and warmed before it
+        # takes traffic; tasks already on the old pool finish there.
+        if self.kind != "process" or self._pool is None:
+            return
+        pool = self._create_pool(model_info)
+        for future in [pool.submit(_noop) for _ in range(self.max_workers)]:
+            future.result()
+        old, self._pool = self._pool, pool
+        old.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+inference_executor = InferenceExecutor(
+    kind=INFERENCE_EXECUTOR,
+    max_workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_MAX_QUEUE
+)
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+from datetime import datetime
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from db import loan_history_collection, cibil_history_collection
+from utils.rollups import apply_loan_rollups, apply_cibil_rollups
+from utils.write_behind import WriteBehindBuffer, HISTORY_FLUSH_SIZE, HISTORY_FLUSH_MS, HISTORY_BUFFER_LIMIT, HISTORY_WRITE_RETRIES
+
+load_dotenv()
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+
+# Keyset order for every history listing; the index below serves both the
+# user_id filter and this sort, so pages never scan or sort in memory.
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+HISTORY_INDEX = [("user_id", 1), ("created_at", -1), ("_id", -1)]
+HISTORY_INDEX_NAME = "user_id_created_at_id"
+
+# List views leave out the LLM narrative and the per-feature SHAP dict.
+SUMMARY_EXCLUDES = {
+    "loan_history": ["outputs.reason", "outputs.shap_values"],
+    "cibil_history": ["outputs.suggestions"],
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+# History records are queued and written in batches off the request path;
+# rollups are updated once each batch is stored.
+loan_history_writer = WriteBehindBuffer(
+    loan_history_collection,
+    max_batch=HISTORY_FLUSH_SIZE,
+    max_age_ms=HISTORY_FLUSH_MS,
+    max_pending=HISTORY_BUFFER_LIMIT,
+    retries=HISTORY_WRITE_RETRIES,
+    on_flush=apply_loan_rollups
+)
+cibil_history_writer = WriteBehindBuffer(
+    cibil_history_collection,
+    max_batch=HISTORY_FLUSH_SIZE,
+    max_age_ms=HISTORY_FLUSH_MS,
+    max_pending=HISTORY_BUFFER_LIMIT,
+    retries=HISTORY_WRITE_RETRIES,
+    on_flush=apply_cibil_rollups
+)
+
+
+async def ensure_history_indexes(*collections):
+    for collection in collections:
+        await collection.create_index(HISTORY_INDEX, name=HISTORY_INDEX_NAME)
+
+
+def encode_cursor(doc) -> str:
+    payload = json.dumps({"t": doc["created_at"].isoformat(), "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception:
+        raise InvalidCursor("Invalid history cursor")
+
+
+def history_filter(user_id: str, cursor: str = None):
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    return query
+
+
+def history_projection(collection, view: str):
+    if view == "summary":
+        return {field: 0 for field in SUMMARY_EXCLUDES.get(collection.name, [])} or None
+    return None
+
+
+def _public(doc):
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+async def history_page(collection, user_id: str, limit: int = None, cursor: str = None, view: str = "full"):
+    limit = max(1, min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE))
+    docs = await collection.find(
+        history_filter(user_id, cursor),
+        history_projection(collection, view)
+    ).sort(HISTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return [_public(doc) for doc in docs[:limit]], next_cursor
+
+
+async def stream_history_ndjson(collection, user_id: str, view: str = "full"):
+    cursor = collection.find({"user_id": user_id}, history_projection(collection, view)).sort(HISTORY_SORT)
+    async for doc in cursor:
+        yield json.dumps(jsonable_encoder(_public(doc))) + "\n"
+
+
+def plan_stages(plan):
+    """Flatten the winning plan of an explain() result into its stages."""
+    winning = plan["queryPlanner"]["winningPlan"]
+    stages = []
+
+    def walk(stage):
+        stages.append(stage)
+        for child in [stage.get("inputStage")] + stage.get("inputStages", []):
+            if child:
+                walk(child)
+
+    walk(winning.get("queryPlan", winning))
+    return stages
+
+
+def explain_history_page(collection, user_id: str, cursor: str = None):
+    return collection.find(history_filter(user_id, cursor)).sort(HISTORY_SORT).limit(HISTORY_PAGE_SIZE + 1).explain()
+
+
+def is_index_backed(stages) -> bool:
+    names = {stage.get("stage") for stage in stages}
+    seeks = [stage for stage in stages if stage.get("stage") == "IXSCAN"]
+    return (
+        bool(seeks) and all(stage.get("indexName") == HISTORY_INDEX_NAME for stage in seeks)
+        and "COLLSCAN" not in names and "SORT" not in names
+    )
+
+
+async def check_query_plans(*collections) -> bool:
+    """Explain the first-page and next-page queries and require an index-backed sort."""
+    probe_cursor = encode_cursor({"created_at": datetime(2024, 1, 1), "_id": ObjectId()})
+    ok = True
+    for collection in collections:
+        for label, cursor in (("first page", None), ("next page", probe_cursor)):
+            stages = plan_stages(await explain_history_page(collection, "plan-check", cursor))
+            indexed = is_index_backed(stages)
+            ok &= indexed
+            names = sorted({stage.get("stage") for stage in stages} - {None})
+            print(f"{collection.name:<16} {label:<11} {'ok' if indexed else 'NOT INDEXED'} stages={names}")
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Create and verify the history collection indexes.")
+    parser.add_argument("--create", action="store_true", help="create the indexes before checking")
+    args = parser.parse_args()
+
+    collections = (loan_history_collection, cibil_history_collection)
+    if args.create:
+        await ensure_history_indexes(*collections)
+    if not await check_query_plans(*collections):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
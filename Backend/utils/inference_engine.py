@@ -0,0 +1,238 @@
+import json
+import math
+import os
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from utils.metrics import stage
+
+# "explainer" serves the SHAP artifact logged with the model. "native" uses
+# the booster's path-dependent pred_contribs, which only approximates it; set
+# it for a model once benchmarks/shap_bench.py passes against that model.
+SHAP_BACKEND = os.getenv("SHAP_BACKEND", "explainer")
+FOLD_SCALER = os.getenv("FOLD_SCALER", "false").lower() == "true"
+
+FEATURES = ['no_of_dependents', 'education', 'self_employed', 'income_annum',
+            'loan_amount', 'loan_term', 'cibil_score']
+
+EDUCATION_MAPPING = {'Graduate': 1, 'Not Graduate': 0}
+
+
+class FoldError(Exception):
+    pass
+
+
+def native_scores(booster, features):
+    # pred_contribs returns one column per feature plus a bias column whose
+    # row sums are the raw margin, so the probability falls out of the same
+    # tree walk that produces the explanation.
+    import xgboost as xgb
+    with stage("booster"):
+        contributions = booster.predict(xgb.DMatrix(np.asarray(features, dtype=np.float32)), pred_contribs=True)
+    margins = contributions.sum(axis=1, dtype=np.float64)
+    probabilities = 1.0 / (1.0 + np.exp(-margins))
+    return probabilities, contributions[:, :-1].astype(np.float64)
+
+
+def explainer_scores(model, explainer, scaled):
+    with stage("predict_proba"):
+        probabilities = model.predict_proba(scaled)[:, 1]
+    with stage("shap_explainer"):
+        return probabilities, explainer(scaled).values
+
+
+def raw_threshold(threshold, center, scale):
+    """Smallest integer k whose scaled value lands on the right of the split."""
+    threshold = np.float32(threshold)
+
+    def goes_right(k):
+        return np.float32((k - center) / scale) >= threshold
+
+    k = math.ceil(float(threshold) * scale + center)
+    while goes_right(k - 1):
+        k -= 1
+    while not goes_right(k):
+        k += 1
+    return k
+
+
+def fold_scaler(booster, center, scale):
+    """Return a copy of the booster that takes raw values for as many features as possible.
+
+    Every feature reaching the model is an integer, so for each split the set
+    of raw values going left is exactly {x < k}. Rewriting the threshold to
+    float32(k) keeps that routing as long as k - 1 and k stay distinct in
+    float32; a feature with any split where they collapse (large loan amounts
+    can) is left scaled. Returns the booster, a mask of folded features and the
+    rewritten thresholds per feature.
+    """
+    import xgboost as xgb
+    model = json.loads(booster.save_raw("json"))
+    gradient_booster = model["learner"]["gradient_booster"]
+    if gradient_booster["name"] != "gbtree":
+        raise FoldError(f"cannot fold the scaler into a {gradient_booster['name']} booster")
+
+    splits = []
+    for tree in gradient_booster["model"]["trees"]:
+        if any(tree["split_type"]):
+            raise FoldError("cannot fold the scaler into categorical splits")
+        for node, (left, feature) in enumerate(zip(tree["left_children"], tree["split_indices"])):
+            if left != -1:
+                k = raw_threshold(tree["split_conditions"][node], center[feature], scale[feature])
+                splits.append((tree, node, feature, k))
+
+    folded_mask = np.ones(len(center), dtype=bool)
+    for _, _, feature, k in splits:
+        if np.float32(k - 1) == np.float32(k):
+            folded_mask[feature] = False
+    if not folded_mask.any():
+        raise FoldError("no feature can be folded exactly")
+
+    boundaries = {feature: set() for feature in range(len(center))}
+    for tree, node, feature, k in splits:
+        if folded_mask[feature]:
+            tree["split_conditions"][node] = float(np.float32(k))
+            boundaries[feature].add(k)
+
+    folded = xgb.Booster()
+    folded.load_model(bytearray(json.dumps(model).encode()))
+    return folded, folded_mask, boundaries
+
+
+def boundary_probe(boundaries, center):
+    # Rows that sit on both sides of every rewritten threshold, used to check
+    # the folded booster against the original before it is trusted.
+    columns = [sorted(values) or [round(c)] for c, values in zip(center, boundaries.values())]
+    rows = 2 * max(len(values) for values in columns)
+    probe = np.empty((rows, len(columns)), dtype=np.float64)
+    for feature, values in enumerate(columns):
+        for row in range(rows):
+            probe[row, feature] = values[(row // 2) % len(values)] - (row % 2)
+    return probe
+
+
+class CompiledModel:
+    """Pandas-free scoring for one loaded pipeline."""
+
+    def __init__(self, pipeline, fold: bool = False):
+        scaler = pipeline.named_steps['scaler']
+        width = len(FEATURES)
+        self.center = np.asarray(scaler.center_, dtype=np.float64) if scaler.with_centering else np.zeros(width)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_scaling else np.ones(width)
+        self.booster = pipeline.named_steps['model'].get_booster()
+        self.folded = None
+        self.folded_mask = np.zeros(width, dtype=bool)
+        self._local = threading.local()
+        if fold:
+            try:
+                self.folded, self.folded_mask = self._fold()
+            except FoldError as e:
+                print(f"Warning: scaler not folded into the model, scaling at request time: {e}")
+
+    def _fold(self):
+        folded, folded_mask, boundaries = fold_scaler(self.booster, self.center, self.scale)
+        probe = boundary_probe(boundaries, self.center)
+        expected = native_scores(self.booster, self.scale_rows(probe))
+        actual = native_scores(folded, self.scale_rows(probe, ~folded_mask))
+        if not all(np.array_equal(a, b) for a, b in zip(expected, actual)):
+            raise FoldError("folded booster disagrees with the scaled pipeline on boundary inputs")
+        if not folded_mask.all():
+            unfolded = [FEATURES[i] for i in np.flatnonzero(~folded_mask)]
+            print(f"Scaler folded into the model except for: {', '.join(unfolded)}")
+        return folded, folded_mask
+
+    def buffer(self, rows: int):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < rows:
+            buffer = np.empty((max(rows, 64), len(FEATURES)), dtype=np.float64)
+            self._local.buffer = buffer
+        return buffer[:rows]
+
+    def encode(self, applications):
+        # The returned rows are a view into this thread's buffer and are only
+        # valid until the next encode() on the same thread.
+        rows = self.buffer(len(applications))
+        for row, data in enumerate(applications):
+            rows[row] = (
+                data.no_of_dependents,
+                EDUCATION_MAPPING.get(data.education, 0),
+                data.self_employed,
+                data.income_annum,
+                data.loan_amount,
+                data.loan_term,
+                data.cibil_score
+            )
+        return rows
+
+    def scale_rows(self, features, columns=None):
+        # Same operations, in the same order and precision, as RobustScaler.transform.
+        scaled = np.array(features, dtype=np.float64)
+        if columns is None:
+            scaled -= self.center
+            scaled /= self.scale
+        elif columns.any():
+            scaled[:, columns] -= self.center[columns]
+            scaled[:, columns] /= self.scale[columns]
+        return scaled
+
+    def scores(self, features):
+        booster, columns = (self.folded, ~self.folded_mask) if self.folded is not None else (self.booster, None)
+        with stage("scale"):
+            scaled = self.scale_rows(features, columns)
+        return native_scores(booster, scaled)
+
+
+_compiled = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+
+
+def compiled_for(pipeline) -> CompiledModel:
+    compiled = _compiled.get(pipeline)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.get(pipeline)
+            if compiled is None:
+                compiled = CompiledModel(pipeline, fold=FOLD_SCALER)
+                _compiled[pipeline] = compiled
+    return compiled
+
+
+def _native(pipeline, features):
+    if isinstance(features, pd.DataFrame):
+        with stage("scale"):
+            scaled = pipeline.named_steps['scaler'].transform(features)
+        return native_scores(pipeline.named_steps['model'].get_booster(), scaled)
+    return compiled_for(pipeline).scores(features)
+
+
+def _explained(pipeline, explainer, features):
+    with stage("scale"):
+        if isinstance(features, pd.DataFrame):
+            scaled = pipeline.named_steps['scaler'].transform(features)
+        else:
+            scaled = compiled_for(pipeline).scale_rows(features)
+    return explainer_scores(pipeline.named_steps['model'], explainer, scaled)
+
+
+def score(pipeline, explainer, features, backend=None):
+    """Return (approval probabilities, per-feature contributions).
+
+    features is either a DataFrame, which goes through the sklearn scaler, or
+    a raw float64 array from CompiledModel.encode. An explicit backend is used
+    as is; the configured SHAP_BACKEND falls back to the other one when the
+    explainer is missing or the native path fails.
+    """
+    if backend == "explainer":
+        if explainer is None:
+            raise RuntimeError("the explainer backend was requested but no SHAP explainer is loaded")
+        return _explained(pipeline, explainer, features)
+    if backend == "native" or explainer is None:
+        return _native(pipeline, features)
+
+    if SHAP_BACKEND == "native":
+        try:
+            return _native(pipeline, features)
+        except Exception as e:
+            print(f"Warning: native SHAP failed, using the explainer instead: {e}")
+    return _explained(pipeline, explainer, features)
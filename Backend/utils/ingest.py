@@ -0,0 +1,302 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+from dotenv import load_dotenv
+from utils.embedding_engine import EMBEDDING_MODEL, SentenceTransformerEncoder
+from utils.vector_index import build_index, resolve_directory, staging_directory, swap_directory
+
+load_dotenv()
+
+CHROMA_COLLECTION = "langchain"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 150
+SOURCE_SUFFIXES = (".txt", ".md")
+
+VECTOR_INGEST_STATE_DIR = os.getenv("VECTOR_INGEST_STATE_DIR", "vector_ingest_state")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma")
+
+CHUNKS_FILE = "chunks.json"
+VECTORS_FILE = "vectors.npy"
+
+
+def clean_text(text):
+    # Same cleaning as Notebooks/load_vector_db.ipynb, so chunk hashes line up
+    # with a store built by the notebook.
+    text = re.sub(r'#+', '', text)
+    text = re.sub(r'\*+', '', text)
+    text = re.sub(r'_+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def iter_documents(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(SOURCE_SUFFIXES):
+                        yield from iter_documents([os.path.join(root, name)])
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield path, f.read()
+
+
+def iter_chunks(paths):
+    """Yield (hash, text, source) per cleaned chunk, one document at a time."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for source, text in iter_documents(paths):
+        for chunk in splitter.split_text(text):
+            chunk = clean_text(chunk)
+            if chunk:
+                yield chunk_hash(chunk), chunk, source
+
+
+def load_state(directory, model_name):
+    """Previously embedded chunks as {hash: vector}; empty if the model changed."""
+    directory = resolve_directory(directory)
+    try:
+        with open(os.path.join(directory, CHUNKS_FILE)) as f:
+            state = json.load(f)
+        vectors = np.load(os.path.join(directory, VECTORS_FILE))
+    except FileNotFoundError:
+        return {}
+    if state["model"] != model_name:
+        print(f"Warning: ingest state was built with {state['model']}, re-embedding everything")
+        return {}
+    return {chunk["hash"]: vectors[i] for i, chunk in enumerate(state["chunks"])}
+
+
+def seed_from_chroma(persist_directory):
+    """Reuse the embeddings of an existing Chroma store, keyed by content hash."""
+    import chromadb
+    if not os.path.isdir(persist_directory):
+        return {}
+    client = chromadb.PersistentClient(path=resolve_directory(persist_directory))
+    try:
+        data = client.get_or_create_collection(CHROMA_COLLECTION).get(include=["documents", "embeddings"])
+        return {
+            chunk_hash(document): np.asarray(embedding, dtype=np.float32)
+            for document, embedding in zip(data["documents"], data["embeddings"])
+        }
+    finally:
+        client.clear_system_cache()
+
+
+def save_state(directory, chunks, vectors, model_name):
+    staging = staging_directory(directory)
+    np.save(os.path.join(staging, VECTORS_FILE), vectors)
+    with open(os.path.join(staging, CHUNKS_FILE), "w") as f:
+        json.dump({"model": model_name, "chunks": chunks}, f)
+    swap_directory(staging, directory)
+
+
+_encoder = None
+
+
+def _init_worker(model_name):
+    global _encoder
+    _encoder = SentenceTransformerEncoder(model_name)
+
+
+def _embed_batch(texts):
+    return _encoder.encode(texts)
+
+
+class Embedder:
+    """Embeds batches in worker processes, keeping a bounded number in flight."""
+
+    def __init__(self, model_name, workers, batch_size):
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.results = {}
+        self._pending = []
+        self._in_flight = deque()
+        self._limit = max(1, workers) * 2
+        self._pool = None
+        self._started = False
+
+    def add(self, key, text):
+        self._pending.append((key, text))
+        if len(self._pending) >= self.batch_size:
+            self._submit()
+
+    def _start(self):
+        # Workers and the model are only loaded once there is something to embed.
+        self._started = True
+        if self.workers > 1:
+            # spawn: forking a process that already holds torch threads can hang.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"),
+                                             initializer=_init_worker, initargs=(self.model_name,))
+        else:
+            _init_worker(self.model_name)
+
+    def _submit(self):
+        if not self._started:
+            self._start()
+        batch, self._pending = self._pending, []
+        if self._pool is None:
+            self._store(batch, _embed_batch([text for _, text in batch]))
+            return
+        self._in_flight.append((batch, self._pool.submit(_embed_batch, [text for _, text in batch])))
+        while len(self._in_flight) >= self._limit:
+            self._collect()
+
+    def _collect(self):
+        batch, future = self._in_flight.popleft()
+        self._store(batch, future.result())
+
+    def _store(self, batch, vectors):
+        for (key, _), vector in zip(batch, vectors):
+            self.results[key] = vector
+
+    def finish(self):
+        if self._pending:
+            self._submit()
+        while self._in_flight:
+            self._collect()
+        if self._pool is not None:
+            self._pool.shutdown()
+        return self.results
+
+
+def chroma_ids(persist_directory):
+    import chromadb
+    if not os.path.isdir(persist_directory):
+        return set()
+    client = chromadb.PersistentClient(path=resolve_directory(persist_directory))
+    try:
+        return set(client.get_collection(CHROMA_COLLECTION).get(include=[])["ids"])
+    except Exception:
+        return set()
+    finally:
+        client.clear_system_cache()
+
+
+def publish_chroma(persist_directory, chunks, vectors):
+    """Apply the change set to a copy of the Chroma store and swap it in.
+
+    Chroma writes its files in place, so a new version starts as a copy of
+    the live one; a run with nothing to change publishes nothing.
+    """
+    import chromadb
+    wanted = {chunk["hash"]: i for i, chunk in enumerate(chunks)}
+    existing = chroma_ids(persist_directory)
+    # Ids from a notebook-built store are random, so they are replaced
+    # once by content-hash ids; embeddings are still reused via the state.
+    stale = [_id for _id in existing if _id not in wanted]
+    added = [i for _id, i in wanted.items() if _id not in existing]
+    if os.path.isdir(persist_directory) and not stale and not added:
+        return 0, 0
+
+    staging = staging_directory(persist_directory)
+    if os.path.isdir(persist_directory):
+        shutil.rmtree(staging)
+        shutil.copytree(resolve_directory(persist_directory), staging)
+
+    client = chromadb.PersistentClient(path=staging)
+    try:
+        collection = client.get_or_create_collection(CHROMA_COLLECTION)
+        step = client.get_max_batch_size()
+        for start in range(0, len(stale), step):
+            collection.delete(ids=stale[start:start + step])
+        for start in range(0, len(added), step):
+            rows = added[start:start + step]
+            collection.add(
+                ids=[chunks[i]["hash"] for i in rows],
+                documents=[chunks[i]["text"] for i in rows],
+                embeddings=vectors[rows].tolist()
+            )
+    finally:
+        client.clear_system_cache()
+    swap_directory(staging, persist_directory)
+    return len(added), len(stale)
+
+
+def ingest(paths, state_dir=VECTOR_INGEST_STATE_DIR, chroma_dir="chroma_db", index_dir=VECTOR_INDEX_DIR,
+           targets=(RETRIEVER_BACKEND,), workers=1, batch_size=256, quantize=False,
+           model_name=EMBEDDING_MODEL, dry_run=False):
+    started = time.perf_counter()
+    known = load_state(state_dir, model_name)
+    if not known and "chroma" in targets:
+        known = seed_from_chroma(chroma_dir)
+
+    chunks = []
+    wanted = set()
+    duplicates = 0
+    embedder = None if dry_run else Embedder(model_name, workers, batch_size)
+    for key, text, source in iter_chunks(paths):
+        if key in wanted:
+            duplicates += 1
+            continue
+        wanted.add(key)
+        chunks.append({"hash": key, "text": text, "source": source})
+        if key not in known and embedder is not None:
+            embedder.add(key, text)
+
+    report = {
+        "chunks": len(chunks),
+        "duplicates": duplicates,
+        "reused": sum(1 for key in wanted if key in known),
+        "embedded": sum(1 for key in wanted if key not in known),
+        "stale": sum(1 for key in known if key not in wanted),
+    }
+    if dry_run:
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        return report
+
+    embedded = embedder.finish()
+    report["embed_seconds"] = round(time.perf_counter() - started, 2)
+    dim = next(iter(embedded.values()), next(iter(known.values()), np.zeros(0))).shape[0]
+    vectors = np.empty((len(chunks), dim), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        vectors[i] = embedded[chunk["hash"]] if chunk["hash"] in embedded else known[chunk["hash"]]
+
+    # The state is written last: if a publish fails, the next run retries it
+    # with everything embedded so far still in the old state or the store.
+    if "chroma" in targets:
+        report["chroma_added"], report["chroma_deleted"] = publish_chroma(chroma_dir, chunks, vectors)
+    if "mmap" in targets:
+        build_index([chunk["text"] for chunk in chunks], vectors, index_dir, quantize=quantize, model_name=model_name)
+    save_state(state_dir, chunks, vectors, model_name)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally embed the chatbot corpus and publish the vector store.")
+    parser.add_argument("sources", nargs="*", default=["../Notebooks/data/chatbot_data.txt"],
+                        help=f"files or directories of {'/'.join(SOURCE_SUFFIXES)} documents")
+    parser.add_argument("--state", default=VECTOR_INGEST_STATE_DIR, help="ingest state directory (hashes and vectors)")
+    parser.add_argument("--chroma", default="chroma_db", help="Chroma persist directory to publish to")
+    parser.add_argument("--out", default=VECTOR_INDEX_DIR, help="memory-mapped index directory to publish to")
+    parser.add_argument("--target", choices=["chroma", "mmap", "both"], default=RETRIEVER_BACKEND)
+    parser.add_argument("--int8", action="store_true", help="publish an int8-quantized mmap index")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="embedding processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding batch")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    targets = ("chroma", "mmap") if args.target == "both" else (args.target,)
+    report = ingest(args.sources, args.state, args.chroma, args.out, targets, args.workers,
+                    args.batch_size, args.int8, dry_run=args.dry_run)
+    print(" ".join(f"{key}={value}" for key, value in report.items()))
+
+
+if __name__ == "__main__":
+    main()
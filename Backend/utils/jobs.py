@@ -0,0 +1,124 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from db import jobs_collection
+
+load_dotenv()
+
+EXPLANATION_JOB_WORKERS = int(os.getenv("EXPLANATION_JOB_WORKERS", "4"))
+EXPLANATION_JOB_QUEUE_SIZE = int(os.getenv("EXPLANATION_JOB_QUEUE_SIZE", "1000"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobRunner:
+    """Runs slow generation work on a fixed pool of asyncio workers.
+
+    Job state lives in MongoDB so GET /jobs/{id} works from any API worker.
+    """
+
+    def __init__(self, collection, workers: int = 4, max_queue: int = 1000):
+        self.collection = collection
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self._counts = {"submitted": 0, "succeeded": 0, "failed": 0}
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop or all(task.done() for task in self._tasks):
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, kind: str, user_id: str, run, on_result=None) -> str:
+        self._ensure_workers()
+        if self._queue.full():
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} pending jobs)")
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "user_id": user_id,
+            "kind": kind,
+            "status": "pending",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self.collection.insert_one(job)
+        try:
+            self._queue.put_nowait((result.inserted_id, run, on_result))
+        except asyncio.QueueFull:
+            await self._set_status(result.inserted_id, status="failed", error="Job queue was full")
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} pending jobs)")
+        self._counts["submitted"] += 1
+        return str(result.inserted_id)
+
+    async def _set_status(self, job_id, **fields):
+        fields["updated_at"] = datetime.now(timezone.utc)
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def _work(self):
+        while True:
+            job_id, run, on_result = await self._queue.get()
+            try:
+                await self._set_status(job_id, status="running")
+                result = await run()
+                if on_result is not None:
+                    await on_result(result)
+                await self._set_status(job_id, status="succeeded", result=result)
+                self._counts["succeeded"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._counts["failed"] += 1
+                try:
+                    await self._set_status(job_id, status="failed", error=str(e))
+                except Exception as update_error:
+                    print(f"Warning: could not record failure of job {job_id}: {update_error}")
+            finally:
+                self._queue.task_done()
+
+    async def get(self, job_id: str, user_id: str):
+        try:
+            object_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        job = await self.collection.find_one({"_id": object_id, "user_id": user_id})
+        if job is None:
+            return None
+        job["id"] = str(job.pop("_id"))
+        return job
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self._counts,
+        }
+
+    async def shutdown(self, timeout: float = 30):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"Warning: {self._queue.qsize()} explanation jobs left unfinished at shutdown")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+explanation_jobs = JobRunner(
+    jobs_collection,
+    workers=EXPLANATION_JOB_WORKERS,
+    max_queue=EXPLANATION_JOB_QUEUE_SIZE
+)
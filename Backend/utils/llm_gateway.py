@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+import random
+from contextlib import asynccontextmanager
+import httpx
+from dotenv import load_dotenv
+from utils.metrics import stage
+
+load_dotenv()
+
+# Any OpenAI-compatible chat-completions server works here, e.g. a local stub
+# for load tests: LLM_BASE_URL=http://127.0.0.1:9000/v1
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("GROQ_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_ENDPOINT_CONCURRENCY = int(os.getenv("LLM_ENDPOINT_CONCURRENCY", "8"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "20"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMGatewayError(Exception):
+    pass
+
+
+def _remaining(deadline):
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        raise asyncio.TimeoutError()
+    return remaining
+
+
+class LLMGateway:
+    def __init__(self, base_url: str, api_key: str, model: str, max_connections: int = 32,
+                 max_concurrency: int = 16, endpoint_concurrency: int = 8,
+                 request_timeout: float = 20, deadline: float = 45,
+                 max_retries: int = 3, backoff_base: float = 0.5):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.endpoint_concurrency = endpoint_concurrency
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._client = None
+        self._global_slots = None
+        self._endpoint_slots = {}
+        self._stats = {}
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.request_timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    def _slots(self, endpoint):
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        if endpoint not in self._endpoint_slots:
+            self._endpoint_slots[endpoint] = asyncio.Semaphore(self.endpoint_concurrency)
+        return self._endpoint_slots[endpoint], self._global_slots
+
+    def _endpoint_stats(self, endpoint):
+        if endpoint not in self._stats:
+            self._stats[endpoint] = {
+                "requests": 0,
+                "retries": 0,
+                "failures": 0,
+                "timeouts": 0,
+                "in_flight": 0,
+                "waiting": 0,
+            }
+        return self._stats[endpoint]
+
+    def _payload(self, prompt, **params):
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        return {"model": self.model, "messages": messages, **params}
+
+    def _backoff(self, attempt):
+        return self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+
+    async def _post_with_retries(self, payload, stats):
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post("/chat/completions", json=payload)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = LLMGatewayError(f"LLM endpoint returned {response.status_code}")
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+            except httpx.HTTPStatusError as e:
+                raise LLMGatewayError(f"LLM endpoint returned {e.response.status_code}") from e
+
+            if attempt == self.max_retries:
+                raise LLMGatewayError(f"LLM request failed after {attempt + 1} attempts: {error}")
+            stats["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    @asynccontextmanager
+    async def _slot(self, endpoint, stats, deadline=None):
+        # With a deadline, waiting for a slot counts against it.
+        endpoint_slot, global_slot = self._slots(endpoint)
+        held = []
+        stats["waiting"] += 1
+        try:
+            for slot in (endpoint_slot, global_slot):
+                if deadline is None:
+                    await slot.acquire()
+                else:
+                    await asyncio.wait_for(slot.acquire(), _remaining(deadline))
+                held.append(slot)
+        except BaseException:
+            stats["waiting"] -= 1
+            for slot in held:
+                slot.release()
+            raise
+        stats["waiting"] -= 1
+        stats["in_flight"] += 1
+        try:
+            yield
+        finally:
+            stats["in_flight"] -= 1
+            for slot in held:
+                slot.release()
+
+    async def _call(self, payload, endpoint, stats):
+        async with self._slot(endpoint, stats):
+            return await self._post_with_retries(payload, stats)
+
+    async def complete(self, prompt, endpoint: str = "default", **params) -> str:
+        stats = self._endpoint_stats(endpoint)
+        stats["requests"] += 1
+        try:
+            with stage(f"llm_{endpoint}"):
+                body = await asyncio.wait_for(
+                    self._call(self._payload(prompt, **params), endpoint, stats),
+                    timeout=self.deadline
+                )
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            stats["failures"] += 1
+            raise LLMGatewayError(f"LLM request exceeded the {self.deadline}s deadline")
+        except Exception:
+            stats["failures"] += 1
+            raise
+        return body["choices"][0]["message"]["content"]
+
+    async def _stream_tokens(self, response, deadline):
+        lines = response.aiter_lines()
+        while True:
+            try:
+                line = await asyncio.wait_for(lines.__anext__(), _remaining(deadline))
+            except StopAsyncIteration:
+                return
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            choices = json.loads(data).get("choices") or [{}]
+            token = (choices[0].get("delta") or {}).get("content")
+            if token:
+                yield token
+
+    async def stream(self, prompt, endpoint: str = "default", **params):
+        # Yields content deltas as they arrive. Retries only happen before the
+        # first token, so callers never see duplicated text. The deadline
+        # covers the wait for a slot, backoff between retries and every read.
+        stats = self._endpoint_stats(endpoint)
+        stats["requests"] += 1
+        payload = self._payload(prompt, stream=True, **params)
+        deadline = asyncio.get_running_loop().time() + self.deadline
+        try:
+            async with self._slot(endpoint, stats, deadline):
+                for attempt in range(self.max_retries + 1):
+                    started = False
+                    remaining = _remaining(deadline)
+                    timeout = httpx.Timeout(min(self.request_timeout, remaining), connect=min(5.0, remaining))
+                    try:
+                        async with self._get_client().stream("POST", "/chat/completions", json=payload,
+                                                             timeout=timeout) as response:
+                            if response.status_code not in RETRYABLE_STATUS_CODES:
+                                if response.status_code >= 400:
+                                    raise LLMGatewayError(f"LLM endpoint returned {response.status_code}")
+                                async for token in self._stream_tokens(response, deadline):
+                                    started = True
+                                    yield token
+                                return
+                            error = LLMGatewayError(f"LLM endpoint returned {response.status_code}")
+                    except (httpx.TransportError, httpx.TimeoutException) as e:
+                        if started:
+                            raise LLMGatewayError(f"LLM stream interrupted: {e}") from e
+                        error = e
+
+                    if attempt == self.max_retries:
+                        raise LLMGatewayError(f"LLM request failed after {attempt + 1} attempts: {error}")
+                    stats["retries"] += 1
+                    backoff = self._backoff(attempt)
+                    if backoff >= _remaining(deadline):
+                        raise asyncio.TimeoutError()
+                    await asyncio.sleep(backoff)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            stats["failures"] += 1
+            raise LLMGatewayError(f"LLM request exceeded the {self.deadline}s deadline")
+        except Exception:
+            stats["failures"] += 1
+            raise
+
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "endpoint_concurrency": self.endpoint_concurrency,
+            "endpoints": {name: dict(values) for name, values in self._stats.items()},
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_gateway = LLMGateway(
+    base_url=LLM_BASE_URL,
+    api_key=LLM_API_KEY,
+    model=LLM_MODEL,
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    endpoint_concurrency=LLM_ENDPOINT_CONCURRENCY,
+    request_timeout=LLM_REQUEST_TIMEOUT,
+    deadline=LLM_DEADLINE,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE
+)
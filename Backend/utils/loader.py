@@ -1,28 +1,75 @@
-import mlflow
-import mlflow.sklearn
 import joblib
 import os
 from concurrent.futures import ThreadPoolExecutor
+from utils.resources import lazy_resource
+from utils.model_snapshot import snapshot_path, export_snapshot, load_snapshot, latest_snapshot, read_manifest
 
 current_file_dir = os.path.dirname(os.path.abspath(__file__))
 mlruns_path = os.path.join(current_file_dir, "..", "..", "Notebooks", "mlruns")
 mlruns_path = os.path.abspath(mlruns_path)
 
-mlflow.set_tracking_uri(f"file://{mlruns_path}")
-mlflow.set_experiment("loan_approval_experiment")
-
 MODEL_NAME = "loan_approval_model"
 MODEL_ALIAS = "production"
-client = mlflow.tracking.MlflowClient()
+MODEL_SNAPSHOT_OFFLINE = os.getenv("MODEL_SNAPSHOT_OFFLINE", "false").lower() == "true"
+
+
+def get_client():
+    import mlflow
+    mlflow.set_tracking_uri(f"file://{mlruns_path}")
+    mlflow.set_experiment("loan_approval_experiment")
+    return mlflow.tracking.MlflowClient()
 
 
 def load_pipeline_and_explainer():
-    model_info = client.get_model_version_by_alias(MODEL_NAME, MODEL_ALIAS)
+    if MODEL_SNAPSHOT_OFFLINE:
+        snapshot = latest_snapshot(MODEL_NAME)
+        if snapshot is None:
+            raise RuntimeError("MODEL_SNAPSHOT_OFFLINE is set but no local model snapshot exists")
+        return load_snapshot(snapshot)
+
+    try:
+        model_info = resolve_production()
+    except Exception as e:
+        snapshot = latest_snapshot(MODEL_NAME)
+        if snapshot is None:
+            raise
+        print(f"Warning: MLflow registry unavailable ({e}); using local snapshot {snapshot}")
+        return load_snapshot(snapshot)
+
+    return load_version(model_info)
+
+
+def resolve_production():
+    return get_client().get_model_version_by_alias(MODEL_NAME, MODEL_ALIAS)
+
+
+def load_version(model_info):
+    # Only the alias lookup touches the registry when this version is
+    # already snapshotted locally.
+    snapshot = snapshot_path(MODEL_NAME, model_info.version)
+    if read_manifest(snapshot) is not None:
+        try:
+            return load_snapshot(snapshot)
+        except Exception as e:
+            print(f"Warning: Could not load model snapshot {snapshot}, re-exporting: {e}")
+
+    pipeline, explainer = load_from_registry(model_info)
+    try:
+        export_snapshot(MODEL_NAME, model_info, pipeline, explainer)
+    except Exception as e:
+        print(f"Warning: Could not write model snapshot: {e}")
+    return pipeline, explainer, model_info
+
+
+def load_from_registry(model_info):
+    import mlflow
+    import mlflow.sklearn
+
     model_version = model_info.version
     run_id = model_info.run_id
 
     def load_pipeline():
-        return mlflow.sklearn.load_model(f"models:/{MODEL_NAME}@{MODEL_ALIAS}")
+        return mlflow.sklearn.load_model(f"models:/{MODEL_NAME}/{model_version}")
     def load_explainer():
         try:
             artifact_path = mlflow.artifacts.download_artifacts(
@@ -42,7 +89,7 @@ def load_pipeline_and_explainer():
         pipeline = pipeline_future.result()
         explainer = explainer_future.result()
 
-    return pipeline, explainer, model_info
+    return pipeline, explainer
 
 
-pipeline, explainer, model_version = load_pipeline_and_explainer()
\ No newline at end of file
+model_state = lazy_resource("loan_model", load_pipeline_and_explainer)
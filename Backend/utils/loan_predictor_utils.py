@@ -1,46 +1,165 @@
 import pandas as pd
 from models import LoanApplication
 import os
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
-from utils.loader import pipeline, explainer
+from utils.loader import model_state
+from utils.batching import MicroBatcher
+from utils.executor import inference_executor
+from utils.metrics import stage
+from utils.inference_engine import score, compiled_for, FEATURES, EDUCATION_MAPPING
+from utils.llm_gateway import llm_gateway
+from utils.cache import TieredCache, MongoCacheStore, significant_bucket, step_bucket, signature_key
+from utils.placeholders import PlaceholderStream, fill_placeholders, placeholder
+from db import explanation_cache_collection
 
 load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
 
-llm = ChatGroq(model="llama-3.1-8b-instant", groq_api_key=groq_api_key)
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64"))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "4096"))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", "86400"))
+EXPLANATION_CACHE_MONGO = os.getenv("EXPLANATION_CACHE_MONGO", "false").lower() == "true"
+INFERENCE_FEATURIZER = os.getenv("INFERENCE_FEATURIZER", "compiled")
 
-FEATURES = ['no_of_dependents', 'education', 'self_employed', 'income_annum',
-            'loan_amount', 'loan_term', 'cibil_score']
-
-async def predict_with_shap(data: LoanApplication):
-    education_mapping = {'Graduate': 1, 'Not Graduate': 0}
-    education_num = education_mapping.get(data.education, 0)
-
-    input_data = pd.DataFrame([[
+def build_feature_frame(applications):
+    rows = [[
         data.no_of_dependents,
-        education_num,
+        EDUCATION_MAPPING.get(data.education, 0),
         data.self_employed,
         data.income_annum,
         data.loan_amount,
         data.loan_term,
         data.cibil_score
-    ]], columns=FEATURES)
-
-    scaler = pipeline.named_steps['scaler']
-    model = pipeline.named_steps['model'] 
-    
-    input_data_scaled = scaler.transform(input_data)
-    prediction = model.predict_proba(input_data_scaled)[0][1]
-
-    shap_values = explainer(input_data_scaled)
-    shap_dict = dict(zip(FEATURES, shap_values.values[0].round(4)))
+    ] for data in applications]
+    return pd.DataFrame(rows, columns=FEATURES)
+
+def featurize(pipeline, applications):
+    with stage("featurize"):
+        if INFERENCE_FEATURIZER == "pandas":
+            return build_feature_frame(applications)
+        return compiled_for(pipeline).encode(applications)
+
+def predict_batch_with_shap(applications):
+    # One handle per batch: a concurrent model swap never mixes versions
+    # within the rows scored here.
+    pipeline, explainer, model_info = model_state.get()
+    model_version = str(model_info.version) if model_info is not None else None
+    predictions, contributions = score(pipeline, explainer, featurize(pipeline, applications))
+    shap_rows = contributions.round(4)
+
+    return [
+        (float(prediction), dict(zip(FEATURES, row.tolist())), model_version)
+        for prediction, row in zip(predictions, shap_rows)
+    ]
+
+async def _score_coalesced(applications):
+    return await inference_executor.run(predict_batch_with_shap, applications)
+
+predict_batcher = MicroBatcher(
+    _score_coalesced,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_BATCH_WINDOW_MS,
+    # One batch per executor worker, so the pool is kept busy under load.
+    max_concurrency=inference_executor.max_workers
+)
 
-    return prediction, shap_dict
+async def predict_with_shap(data: LoanApplication):
+    return await predict_batcher.submit(data)
+
+explanation_cache = TieredCache(
+    maxsize=EXPLANATION_CACHE_SIZE,
+    ttl=EXPLANATION_CACHE_TTL,
+    store=MongoCacheStore(explanation_cache_collection, EXPLANATION_CACHE_TTL) if EXPLANATION_CACHE_MONGO else None
+)
+
+FEATURE_LABELS = {
+    'no_of_dependents': 'Dependents',
+    'education': 'Education Level',
+    'self_employed': 'Employment Type',
+    'income_annum': 'Annual Income',
+    'loan_amount': 'Loan Amount',
+    'loan_term': 'Loan Term',
+    'cibil_score': 'Credit Score'
+}
+
+# Bumped whenever cached explanations stop being valid for the current prompt.
+EXPLANATION_TEMPLATE_VERSION = 2
+
+def explanation_profile(applicant_dict):
+    # Everything about the applicant that the prompt shows the LLM. The cache
+    # key is built from the same values, so a cached explanation only reflects
+    # what all applicants sharing the key have in common.
+    return {
+        'no_of_dependents': applicant_dict.get('no_of_dependents', 'N/A'),
+        'education': applicant_dict.get('education', 'N/A'),
+        'self_employed': bool(applicant_dict.get('self_employed')),
+        'income_annum': significant_bucket(applicant_dict.get('income_annum', 0)),
+        'loan_amount': significant_bucket(applicant_dict.get('loan_amount', 0)),
+        'loan_term': applicant_dict.get('loan_term', 'N/A'),
+        'cibil_score': step_bucket(applicant_dict.get('cibil_score', 0), 25)
+    }
+
+def explanation_figures(applicant_dict):
+    # The exact values filled into the cached text for each requester.
+    return {
+        'income_annum': f"{applicant_dict.get('income_annum', 0):,}",
+        'loan_amount': f"{applicant_dict.get('loan_amount', 0):,}",
+        'cibil_score': applicant_dict.get('cibil_score', 'N/A')
+    }
+
+def ranked_contributions(shap_dict):
+    ranked = sorted(FEATURES, key=lambda feature: -abs(shap_dict.get(feature, 0)))
+    return [
+        (feature, 'positive' if shap_dict.get(feature, 0) > 0 else 'negative' if shap_dict.get(feature, 0) < 0 else 'neutral')
+        for feature in ranked
+    ]
+
+def explanation_signature(applicant_dict, shap_dict, prediction):
+    prediction_status = 'Approved' if prediction > 0.5 else 'Rejected'
+    contributions = ",".join(f"{feature}:{direction}" for feature, direction in ranked_contributions(shap_dict))
+    profile = tuple(explanation_profile(applicant_dict).values())
+    return signature_key(EXPLANATION_TEMPLATE_VERSION, prediction_status, contributions, profile)
 
 async def get_explanation(applicant_dict, shap_dict, prediction):
+    key = explanation_signature(applicant_dict, shap_dict, prediction)
+    template = await explanation_cache.get_or_create(
+        key, lambda: generate_explanation(applicant_dict, shap_dict, prediction)
+    )
+    return fill_placeholders(template, explanation_figures(applicant_dict))
+
+async def stream_explanation(applicant_dict, shap_dict, prediction):
+    key = explanation_signature(applicant_dict, shap_dict, prediction)
+    figures = explanation_figures(applicant_dict)
+    cached = await explanation_cache.get(key)
+    if cached is not None:
+        yield fill_placeholders(cached, figures)
+        return
+
+    parts = []
+    filled = PlaceholderStream(figures)
+    async for token in llm_gateway.stream(build_explanation_prompt(applicant_dict, shap_dict, prediction), endpoint="loan_explanation"):
+        parts.append(token)
+        text = filled.feed(token)
+        if text:
+            yield text
+    text = filled.finish()
+    if text:
+        yield text
+    await explanation_cache.set(key, "".join(parts))
+
+async def generate_explanation(applicant_dict, shap_dict, prediction):
+    return await llm_gateway.complete(build_explanation_prompt(applicant_dict, shap_dict, prediction), endpoint="loan_explanation")
+
+def build_explanation_prompt(applicant_dict, shap_dict, prediction):
+    # Built only from explanation_profile and the contribution ranking, the
+    # values explanation_signature keys on; exact figures go in as placeholders.
     prediction_status = 'Approved' if prediction > 0.5 else 'Rejected'
-    
+    profile = explanation_profile(applicant_dict)
+    income, loan, cibil = placeholder('income_annum'), placeholder('loan_amount'), placeholder('cibil_score')
+    contributions = "\n    ".join(
+        f"• {FEATURE_LABELS[feature]}: {direction}" for feature, direction in ranked_contributions(shap_dict)
+    )
+
     prompt = f"""
     You are an expert financial assistant specializing in loan assessments. Analyze the applicant's financial profile and explain the assessment in a clear, supportive, and easy-to-understand manner.
 
@@ -49,22 +168,16 @@ async def get_explanation(applicant_dict, shap_dict, prediction):
     Input Data:
     - Predicted Status: {prediction_status}
     - Applicant Profile:
-    • Dependents: {applicant_dict.get('no_of_dependents', 'N/A')}
-    • Education Level: {applicant_dict.get('education', 'N/A')}
-    • Employment Type: {applicant_dict.get('self_employed', 'N/A')}
-    • Annual Income: ₹{applicant_dict.get('income_annum', 0):,}
-    • Loan Amount: ₹{applicant_dict.get('loan_amount', 0):,}
-    • Loan Term: {applicant_dict.get('loan_term', 'N/A')} Years
-    • Credit Score: {applicant_dict.get('cibil_score', 'N/A')}
-
-    - Feature Contributions (Direction determines impact):
-    • Dependents: {shap_dict.get('no_of_dependents', 0):.4f}
-    • Education Level: {shap_dict.get('education', 0):.4f}
-    • Employment Type: {shap_dict.get('self_employed', 0):.4f}
-    • Annual Income: {shap_dict.get('income_annum', 0):.4f}
-    • Loan Amount: {shap_dict.get('loan_amount', 0):.4f}
-    • Loan Term: {shap_dict.get('loan_term', 0):.4f}
-    • Credit Score: {shap_dict.get('cibil_score', 0):.4f}
+    • Dependents: {profile['no_of_dependents']}
+    • Education Level: {profile['education']}
+    • Employment Type: {profile['self_employed']}
+    • Annual Income: ₹{income} (about ₹{profile['income_annum']:,.0f})
+    • Loan Amount: ₹{loan} (about ₹{profile['loan_amount']:,.0f})
+    • Loan Term: {profile['loan_term']} Years
+    • Credit Score: {cibil} (between {profile['cibil_score']} and {profile['cibil_score'] + 24})
+
+    - Feature Contributions (strongest influence first; direction determines impact):
+    {contributions}
 
     Task:
     Generate a concise, professional explanation structured into 5 sections:
@@ -86,13 +199,13 @@ async def get_explanation(applicant_dict, shap_dict, prediction):
 
     Strict Rules & Causality Guardrails:
     - Source of Truth: Feature contribution directions strictly determine strength vs. weakness. Never infer positive/negative impact from raw values alone, and never contradict these values.
-    - No False Causality: Describe relationships as associations within the application evaluation (e.g., "Your credit score of {applicant_dict.get('cibil_score', 'N/A')} positively associated with stronger repayment indicators") rather than definitive real-world causes (e.g., "Your low income caused your rejection").
+    - No False Causality: Describe relationships as associations within the application evaluation (e.g., "Your credit score of {cibil} positively associated with stronger repayment indicators") rather than definitive real-world causes (e.g., "Your low income caused your rejection").
     - No Counterfactual Promises: Do not guarantee outcomes based on parameter changes (e.g., Avoid "If you increase income by X, you will be approved"). Instead, frame recommendations as best practices to strengthen the overall profile.
     - Respect Feature Direction over Stereotypes: If a non-intuitive factor contributed positively/negatively (e.g., a high loan amount contributing positively due to income ratio context), explain it strictly according to its contribution sign, not general rule-of-thumb assumptions.
     - No Technical Jargon: Never mention SHAP, machine learning, models, predictions, algorithms, or feature weights.
     - Forbidden Phrases: Do not use "According to the model...", "The model predicts...", "SHAP shows...", or "The algorithm determined...".
     - Natural Language: Use terms like "Your application...", "Your overall profile...", "Your submitted details...", or "This assessment...".
-    - No Raw Metrics: Intertwine actual financial values (e.g., ₹{applicant_dict.get('income_annum', 0):,}) into text naturally, but NEVER reveal the numerical contribution scores.
+    - Exact Figures: Whenever you mention the annual income, loan amount or credit score, write the placeholder exactly as shown in the profile (₹{income}, ₹{loan}, {cibil}); it is replaced with the applicant's exact figure. Never write the approximate values or ranges given in brackets.
+    - No Raw Metrics: Intertwine these figures into the text naturally, but NEVER reveal the ranking of the contributions as numbers or scores.
     """
-    response = llm.invoke(prompt)
-    return response.content
\ No newline at end of file
+    return prompt
\ No newline at end of file
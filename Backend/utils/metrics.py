@@ -0,0 +1,231 @@
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PREFIX = "neurocred"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage timings of the request being handled, when it asked for Server-Timing.
+# asyncio.to_thread copies the context, so stages it runs land here too, but
+# executor pools and the micro-batcher's worker task do not run in the request
+# context: they collect their stages with deferred_stages() and hand them back
+# to be recorded by the caller (record_stages / add_request_timings).
+_request_timings = ContextVar("request_timings", default=None)
+# Set while stages are being collected for someone else to record.
+_deferred_stages = ContextVar("deferred_stages", default=None)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+stage_seconds = Histogram(f"{METRICS_PREFIX}_stage_seconds", "Time spent in each request stage.", ("stage",))
+request_seconds = Histogram(f"{METRICS_PREFIX}_http_request_seconds", "HTTP request latency.", ("method", "route", "status"))
+requests_in_flight = Gauge(f"{METRICS_PREFIX}_http_requests_in_flight", "HTTP requests being handled.")
+stages_in_flight = Gauge(f"{METRICS_PREFIX}_stage_in_flight", "Stages currently executing.", ("stage",))
+
+_collectors = {}
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a named stage; the histogram is always updated."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    stages_in_flight.inc(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages_in_flight.dec(name)
+        _finish_stage(name, time.perf_counter() - started)
+
+
+def _finish_stage(name, elapsed):
+    deferred = _deferred_stages.get()
+    if deferred is not None:
+        deferred.append((name, elapsed))
+        return
+    stage_seconds.observe(elapsed, name)
+    add_request_timings([(name, elapsed)])
+
+
+@contextmanager
+def deferred_stages():
+    """Collect the stages finished inside the block instead of recording them.
+
+    Used where work runs outside the request context (an executor worker, a
+    batch shared by several requests); the caller passes the collected list to
+    record_stages() once it is back in the right context.
+    """
+    collected = []
+    token = _deferred_stages.set(collected)
+    try:
+        yield collected
+    finally:
+        _deferred_stages.reset(token)
+
+
+def record_stages(timings):
+    """Record stages collected by deferred_stages() as if they ran here."""
+    for name, elapsed in timings:
+        _finish_stage(name, elapsed)
+
+
+def add_request_timings(timings):
+    """Add stages to the current request's Server-Timing only."""
+    request_timings = _request_timings.get()
+    if request_timings is not None:
+        request_timings.extend(timings)
+
+
+def register_stats(name: str, stats):
+    """Expose the numeric leaves of a component's stats() dict as gauges."""
+    _collectors[name] = stats
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, bool):
+        out.append((prefix, int(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, value))
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(f"{prefix}_{key}", child, out)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render() -> str:
+    lines = []
+    for metric in (request_seconds, requests_in_flight, stage_seconds, stages_in_flight):
+        lines.extend(metric.render())
+    for name, stats in _collectors.items():
+        try:
+            values = []
+            _flatten(f"{METRICS_PREFIX}_{name}", stats(), values)
+        except Exception as e:
+            print(f"Warning: metrics collector {name} failed: {e}")
+            continue
+        for metric, value in values:
+            metric = _metric_name(metric)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings):
+    return ", ".join(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in timings)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request latency per route and requests in flight,
+    plus a Server-Timing header for requests that send `X-Server-Timing: 1`.
+
+    Server-Timing can only carry stages that finished before the response
+    headers went out, so streamed bodies report their setup stages only.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        wants_timing = (b"x-server-timing", b"1") in scope.get("headers", [])
+        timings = [] if wants_timing else None
+        token = _request_timings.set(timings)
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings is not None:
+                    timings.append(("total", time.perf_counter() - started))
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", server_timing(timings).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_seconds.observe(time.perf_counter() - started, scope.get("method", ""), route_path, status_code)
+            _request_timings.reset(token)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import joblib
+
+MODEL_SNAPSHOT_DIR = os.getenv("MODEL_SNAPSHOT_DIR", "model_snapshots")
+
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "booster.ubj"
+SCALER_FILE = "scaler.joblib"
+EXPLAINER_FILE = "explainer.joblib"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(model_name: str, version) -> str:
+    return os.path.join(MODEL_SNAPSHOT_DIR, model_name, f"v{version}")
+
+
+def export_snapshot(model_name: str, model_info, pipeline, explainer) -> str:
+    target = snapshot_path(model_name, model_info.version)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(target))
+    try:
+        # The booster goes out in XGBoost's own binary format; the scaler and
+        # explainer are joblib pickles whose numpy arrays can be memory-mapped.
+        pipeline.named_steps["model"].save_model(os.path.join(staging, BOOSTER_FILE))
+        joblib.dump(pipeline.named_steps["scaler"], os.path.join(staging, SCALER_FILE))
+        if explainer is not None:
+            joblib.dump(explainer, os.path.join(staging, EXPLAINER_FILE))
+
+        files = {
+            name: _sha256(os.path.join(staging, name))
+            for name in sorted(os.listdir(staging))
+        }
+        manifest = {
+            "model_name": model_name,
+            "version": str(model_info.version),
+            "run_id": model_info.run_id,
+            "files": files,
+            "content_hash": hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest(),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return target
+
+
+def read_manifest(directory: str):
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_snapshot(model_name: str):
+    root = os.path.join(MODEL_SNAPSHOT_DIR, model_name)
+    if not os.path.isdir(root):
+        return None
+    versions = []
+    for entry in os.listdir(root):
+        manifest = read_manifest(os.path.join(root, entry))
+        if entry.startswith("v") and manifest is not None:
+            versions.append((int(manifest["version"]), os.path.join(root, entry)))
+    return max(versions)[1] if versions else None
+
+
+def load_snapshot(directory: str, verify: bool = True):
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise SnapshotError(f"No snapshot manifest in {directory}")
+    if verify:
+        for name, expected in manifest["files"].items():
+            if _sha256(os.path.join(directory, name)) != expected:
+                raise SnapshotError(f"Snapshot file {name} in {directory} does not match its content hash")
+
+    model = XGBClassifier()
+    model.load_model(os.path.join(directory, BOOSTER_FILE))
+    scaler = joblib.load(os.path.join(directory, SCALER_FILE), mmap_mode="r")
+    pipeline = Pipeline([("scaler", scaler), ("model", model)])
+
+    explainer = None
+    if EXPLAINER_FILE in manifest["files"]:
+        explainer = joblib.load(os.path.join(directory, EXPLAINER_FILE))
+
+    model_info = SimpleNamespace(
+        name=manifest["model_name"],
+        version=manifest["version"],
+        run_id=manifest["run_id"],
+        content_hash=manifest["content_hash"]
+    )
+    return pipeline, explainer, model_info
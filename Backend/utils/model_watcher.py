@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from utils.loader import model_state, resolve_production, load_version, MODEL_SNAPSHOT_OFFLINE
+from utils.executor import inference_executor
+from utils.inference_engine import score, FEATURES
+
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "60"))
+
+# Fixed applicant profiles spanning the input ranges; every candidate model
+# must score and explain these before it can take traffic.
+CANARY_ROWS = [
+    [0, 1, 0, 9600000, 29900000, 12, 778],
+    [2, 0, 1, 4100000, 12200000, 8, 417],
+    [3, 1, 0, 9100000, 29700000, 20, 506],
+    [5, 0, 1, 200000, 300000, 2, 300],
+    [1, 1, 1, 9900000, 39500000, 20, 900],
+    [4, 0, 0, 5500000, 15000000, 10, 650],
+]
+
+
+class CanaryFailed(Exception):
+    pass
+
+
+def score_canary(pipeline, explainer, backend=None):
+    return score(pipeline, explainer, np.asarray(CANARY_ROWS, dtype=np.float64), backend)
+
+
+def validate_candidate(pipeline, explainer):
+    probabilities, contributions = score_canary(pipeline, explainer)
+    if probabilities.shape != (len(CANARY_ROWS),) or not np.all(np.isfinite(probabilities)):
+        raise CanaryFailed("candidate produced invalid probabilities on the canary set")
+    if np.any(probabilities < 0) or np.any(probabilities > 1):
+        raise CanaryFailed("candidate probabilities fall outside [0, 1]")
+    if contributions.shape != (len(CANARY_ROWS), len(FEATURES)) or not np.all(np.isfinite(contributions)):
+        raise CanaryFailed("candidate produced invalid feature contributions on the canary set")
+    return probabilities
+
+
+class ModelWatcher:
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._task = None
+        self.loaded_at = None
+        self.last_checked = None
+        self.last_error = None
+        self.reloads = 0
+        self.rejected = 0
+        self.failed_loads = 0
+        # The last version that failed to load or was rejected by the canary;
+        # it is not retried until the alias points somewhere else.
+        self._failed_version = None
+
+    def current(self):
+        if not model_state.ready:
+            return None
+        return model_state.get()[2]
+
+    def check(self):
+        # Runs in a worker thread: the registry lookup, artifact load and
+        # canary scoring never touch the event loop or a request.
+        self.last_checked = datetime.now(timezone.utc)
+        current = self.current()
+        if current is None:
+            return False
+
+        model_info = resolve_production()
+        if str(model_info.version) in (str(current.version), self._failed_version):
+            return False
+        self._failed_version = None
+
+        started = time.perf_counter()
+        try:
+            pipeline, explainer, model_info = load_version(model_info)
+        except Exception:
+            self.failed_loads += 1
+            self._failed_version = str(model_info.version)
+            raise
+        try:
+            probabilities = validate_candidate(pipeline, explainer)
+        except Exception as e:
+            self.rejected += 1
+            self._failed_version = str(model_info.version)
+            raise CanaryFailed(f"version {model_info.version} rejected: {e}") from e
+
+        active_pipeline, active_explainer, _ = model_state.get()
+        baseline, _ = score_canary(active_pipeline, active_explainer)
+        drift = float(np.max(np.abs(probabilities - baseline)))
+
+        model_state.swap((pipeline, explainer, model_info))
+        inference_executor.recycle(model_info)
+        self.reloads += 1
+        self.loaded_at = datetime.now(timezone.utc)
+        print(
+            f"Model {model_info.version} is now active (was {current.version}); "
+            f"loaded in {time.perf_counter() - started:.2f}s, max canary drift {drift:.4f}"
+        )
+        return True
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.check)
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Warning: model reload check failed: {e}")
+
+    def start(self):
+        if self.interval > 0 and not MODEL_SNAPSHOT_OFFLINE and self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self):
+        current = self.current()
+        return {
+            "model_version": str(current.version) if current is not None else None,
+            "run_id": getattr(current, "run_id", None),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "reload_interval": self.interval,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_error": self.last_error,
+            "reloads": self.reloads,
+            "rejected": self.rejected,
+            "failed_loads": self.failed_loads,
+        }
+
+
+model_watcher = ModelWatcher(interval=MODEL_RELOAD_INTERVAL)
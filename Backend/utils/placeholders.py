@@ -0,0 +1,37 @@
+import re
+
+# Cached LLM text is shared by every request with the same cache signature, so
+# it never holds a requester's exact figures: the prompt asks for {{name}}
+# placeholders, which are filled per request after the lookup.
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def placeholder(name):
+    return "{{" + name + "}}"
+
+
+def fill_placeholders(text, values):
+    """Replace {{name}} with values[name]; unknown names are left as written."""
+    return PLACEHOLDER.sub(lambda match: str(values.get(match.group(1), match.group(0))), text)
+
+
+class PlaceholderStream:
+    """Fills placeholders in streamed tokens, holding back one split across tokens."""
+
+    def __init__(self, values):
+        self.values = values
+        self._pending = ""
+        # Braces plus a little whitespace around the longest name.
+        self._longest = max((len(name) for name in values), default=0) + 8
+
+    def feed(self, token):
+        text = fill_placeholders(self._pending + token, self.values)
+        cut = text.rfind("{{")
+        if cut == -1 or "}}" in text[cut:] or len(text) - cut > self._longest:
+            cut = len(text) - 1 if text.endswith("{") else len(text)
+        self._pending = text[cut:]
+        return text[:cut]
+
+    def finish(self):
+        text, self._pending = self._pending, ""
+        return text
@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_UNSET = object()
+
+
+class LazyResource:
+    """A heavy object built on first use (or explicitly warmed) exactly once."""
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def ready(self):
+        return self._value is not _UNSET
+
+    def get(self):
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    started = time.perf_counter()
+                    try:
+                        value = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.load_seconds = time.perf_counter() - started
+                    self.error = None
+                    self._value = value
+        return self._value
+
+    def swap(self, value):
+        # Callers that already fetched the old value keep using it; the next
+        # get() sees the new one. Rebinding a single attribute is atomic.
+        with self._lock:
+            self._value = value
+            self.error = None
+
+
+_registry = {}
+
+
+def lazy_resource(name: str, factory) -> LazyResource:
+    resource = LazyResource(name, factory)
+    _registry[name] = resource
+    return resource
+
+
+def warm_all():
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, len(_registry)), thread_name_prefix="warmup") as executor:
+        futures = {name: executor.submit(resource.get) for name, resource in _registry.items()}
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Warning: failed to warm {name}: {e}")
+
+    print(f"Startup warm-up finished in {time.perf_counter() - started:.2f}s")
+    for name, entry in startup_report().items():
+        if entry["ready"]:
+            print(f"  {name:<24} {entry['load_seconds']:.2f}s")
+        else:
+            print(f"  {name:<24} not ready: {entry['error']}")
+
+
+def all_ready():
+    return all(resource.ready for resource in _registry.values())
+
+
+def startup_report():
+    return {
+        name: {
+            "ready": resource.ready,
+            "load_seconds": round(resource.load_seconds, 4) if resource.load_seconds is not None else None,
+            "error": resource.error,
+        }
+        for name, resource in _registry.items()
+    }
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from db import rollups_collection, loan_history_collection, cibil_history_collection
+
+load_dotenv()
+
+ROLLUP_WINDOW = int(os.getenv("ROLLUP_WINDOW", "10"))
+
+
+def cibil_update(doc):
+    outputs = doc["outputs"]
+    score = outputs["cibil_score"]
+    return {
+        "$inc": {
+            "cibil.count": 1,
+            "cibil.score_sum": score,
+            **{f"cibil.component_sums.{name}": value for name, value in outputs["breakdown"].items()}
+        },
+        "$min": {"cibil.min_score": score},
+        "$max": {"cibil.max_score": score},
+        "$set": {"cibil.latest_score": score, "cibil.latest_at": doc["created_at"]},
+        "$push": {"cibil.recent_scores": {"$each": [score], "$slice": -ROLLUP_WINDOW}}
+    }
+
+
+def loan_update(doc):
+    approve_chances = doc["outputs"]["approve_chances"]
+    return {
+        "$inc": {
+            "loan.count": 1,
+            "loan.approved": 1 if approve_chances > 50 else 0,
+            "loan.approve_chances_sum": approve_chances
+        },
+        "$set": {"loan.latest_approve_chances": approve_chances, "loan.latest_at": doc["created_at"]}
+    }
+
+
+async def _apply(docs, build_update):
+    # One atomic upsert per history record, sent as a single ordered bulk
+    # write; the operators only ever add to a user's rollup, so concurrent
+    # writers never race on a read-modify-write.
+    await rollups_collection.bulk_write(
+        [UpdateOne({"_id": doc["user_id"]}, build_update(doc), upsert=True) for doc in docs],
+        ordered=True
+    )
+
+
+async def apply_cibil_rollups(docs):
+    await _apply(docs, cibil_update)
+
+
+async def apply_loan_rollups(docs):
+    await _apply(docs, loan_update)
+
+
+def summarize(rollup):
+    rollup = rollup or {}
+    cibil = rollup.get("cibil", {})
+    loan = rollup.get("loan", {})
+    cibil_count = cibil.get("count", 0)
+    loan_count = loan.get("count", 0)
+    recent = cibil.get("recent_scores", [])
+
+    return {
+        "cibil": {
+            "count": cibil_count,
+            "latest_score": cibil.get("latest_score"),
+            "latest_at": cibil.get("latest_at"),
+            "min_score": cibil.get("min_score"),
+            "max_score": cibil.get("max_score"),
+            "average_score": round(cibil["score_sum"] / cibil_count, 2) if cibil_count else None,
+            "moving_average": round(sum(recent) / len(recent), 2) if recent else None,
+            "recent_scores": recent,
+            "component_averages": {
+                name: round(total / cibil_count, 4)
+                for name, total in cibil.get("component_sums", {}).items()
+            } if cibil_count else {}
+        },
+        "loan": {
+            "count": loan_count,
+            "approved": loan.get("approved", 0),
+            "approval_rate": round(loan["approved"] / loan_count, 4) if loan_count else None,
+            "average_approve_chances": round(loan["approve_chances_sum"] / loan_count, 2) if loan_count else None,
+            "latest_approve_chances": loan.get("latest_approve_chances"),
+            "latest_at": loan.get("latest_at")
+        }
+    }
+
+
+async def get_summary(user_id: str):
+    return summarize(await rollups_collection.find_one({"_id": user_id}))
+
+
+async def rebuild(user_id: str = None):
+    """Recompute rollups from the history collections (backfill or repair).
+
+    Run it offline, with the API stopped: history flushed while the scan is
+    running is not counted, and a full rebuild replaces the collection, so
+    anything the write-behind flush adds in the meantime is dropped. A full
+    rebuild is written to a scratch collection and renamed over the live one,
+    so readers see either the old rollups or the new ones, never a partial set.
+    """
+    query = {"user_id": user_id} if user_id else {}
+    rollups = {}
+
+    cibil_cursor = cibil_history_collection.find(
+        query, {"user_id": 1, "outputs.cibil_score": 1, "outputs.breakdown": 1, "created_at": 1}
+    ).sort("created_at", 1)
+    async for doc in cibil_cursor:
+        score = doc.get("outputs", {}).get("cibil_score")
+        if score is None:
+            continue
+        cibil = rollups.setdefault(doc["user_id"], {}).setdefault("cibil", {
+            "count": 0, "score_sum": 0, "min_score": score, "max_score": score,
+            "recent_scores": [], "component_sums": {}
+        })
+        cibil["count"] += 1
+        cibil["score_sum"] += score
+        cibil["min_score"] = min(cibil["min_score"], score)
+        cibil["max_score"] = max(cibil["max_score"], score)
+        cibil["latest_score"] = score
+        cibil["latest_at"] = doc["created_at"]
+        cibil["recent_scores"] = (cibil["recent_scores"] + [score])[-ROLLUP_WINDOW:]
+        for name, value in doc["outputs"].get("breakdown", {}).items():
+            cibil["component_sums"][name] = cibil["component_sums"].get(name, 0) + value
+
+    loan_cursor = loan_history_collection.find(
+        query, {"user_id": 1, "outputs.approve_chances": 1, "created_at": 1}
+    ).sort("created_at", 1)
+    async for doc in loan_cursor:
+        chances = doc.get("outputs", {}).get("approve_chances")
+        if chances is None:
+            continue
+        loan = rollups.setdefault(doc["user_id"], {}).setdefault("loan", {
+            "count": 0, "approved": 0, "approve_chances_sum": 0
+        })
+        loan["count"] += 1
+        loan["approved"] += 1 if chances > 50 else 0
+        loan["approve_chances_sum"] += chances
+        loan["latest_approve_chances"] = chances
+        loan["latest_at"] = doc["created_at"]
+
+    if user_id:
+        if user_id in rollups:
+            await rollups_collection.replace_one({"_id": user_id}, rollups[user_id], upsert=True)
+        else:
+            await rollups_collection.delete_one({"_id": user_id})
+        return len(rollups)
+
+    if not rollups:
+        await rollups_collection.delete_many({})
+        return 0
+    scratch = rollups_collection.database[f"{rollups_collection.name}_rebuild"]
+    await scratch.drop()
+    await scratch.insert_many([dict(rollup, _id=owner) for owner, rollup in rollups.items()])
+    await scratch.rename(rollups_collection.name, dropTarget=True)
+    return len(rollups)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-user score rollups from history.")
+    parser.add_argument("--user", help="only rebuild this user_id")
+    args = parser.parse_args()
+    count = await rebuild(args.user)
+    print(f"Rebuilt rollups for {count} user(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
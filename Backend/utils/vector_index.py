@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+SCALES_FILE = "scales.npy"
+TEXTS_FILE = "texts.json"
+META_FILE = "meta.json"
+
+# int8 rows are widened to float32 this many at a time during a search.
+SEARCH_BLOCK_ROWS = 4096
+
+
+class MmapVectorIndex:
+    """Read-only top-k cosine index over a memory-mapped embedding matrix.
+
+    Rows are unit-normalized at build time, so a search is one matrix-vector
+    product. Pages are mapped from the .npy file, so every uvicorn worker on
+    the host shares the same physical memory for the index.
+    """
+
+    def __init__(self, directory: str):
+        directory = resolve_directory(directory)
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(directory, TEXTS_FILE)) as f:
+            self.texts = json.load(f)
+        self.matrix = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        self.scales = None
+        if self.meta["dtype"] == "int8":
+            self.scales = np.load(os.path.join(directory, SCALES_FILE), mmap_mode="r")
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def scores(self, embedding):
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if self.scales is None:
+            return self.matrix @ query
+        # matrix @ query would upcast the whole int8 matrix to a float32 copy
+        # on every query; widening one block at a time into a reused buffer
+        # keeps the per-query allocation to the score vector.
+        scores = np.empty(len(self.matrix), dtype=np.float32)
+        buffer = self._block_buffer()
+        for start in range(0, len(self.matrix), SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS]
+            widened = buffer[:len(block)]
+            np.copyto(widened, block)
+            np.dot(widened, query, out=scores[start:start + len(block)])
+        scores *= self.scales
+        return scores
+
+    def _block_buffer(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = np.empty((min(SEARCH_BLOCK_ROWS, len(self.matrix)), self.matrix.shape[1]), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def search(self, embedding, k: int = 4):
+        scores = self.scores(embedding)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.texts[i] for i in top]
+
+
+def build_index(texts, vectors, directory: str, quantize: bool = False, model_name: str = None):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    staging = staging_directory(directory)
+
+    if quantize:
+        # Symmetric per-row int8: row ~= int8_row * scale
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(staging, EMBEDDINGS_FILE), quantized)
+        np.save(os.path.join(staging, SCALES_FILE), scales.astype(np.float32))
+    else:
+        np.save(os.path.join(staging, EMBEDDINGS_FILE), vectors)
+
+    with open(os.path.join(staging, TEXTS_FILE), "w") as f:
+        json.dump(list(texts), f)
+    with open(os.path.join(staging, META_FILE), "w") as f:
+        json.dump({
+            "count": len(vectors),
+            "dim": int(vectors.shape[1]) if len(vectors) else 0,
+            "dtype": "int8" if quantize else "float32",
+            "model": model_name
+        }, f)
+
+    swap_directory(staging, directory)
+
+
+def staging_directory(directory: str) -> str:
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f".{os.path.basename(os.path.abspath(directory))}-", dir=parent)
+
+
+def resolve_directory(directory: str) -> str:
+    """The version a published directory points at right now.
+
+    Readers resolve once and open every file from the result, so a publish in
+    the middle of a load never mixes files from two versions. The resolved
+    path also serves as the version id when checking for a newer publish.
+    """
+    return os.path.realpath(directory)
+
+
+def swap_directory(staging: str, directory: str):
+    """Publish a finished staging directory as the new version of `directory`.
+
+    `directory` is a symlink to a versioned sibling (.<name>.v<ns>). The new
+    version is linked in with one os.replace, so a reader always finds either
+    the old version or the new one. The previous version is kept for readers
+    that still have it open; older ones are removed.
+    """
+    directory = os.path.abspath(directory)
+    parent, name = os.path.split(directory)
+    prefix = f".{name}.v"
+    previous = None
+    if os.path.islink(directory):
+        previous = os.path.basename(resolve_directory(directory))
+    elif os.path.isdir(directory):
+        # A directory published before versioning: move it aside as a version
+        # first. This is the only publish with a moment where the path is gone.
+        previous = f"{prefix}{time.time_ns()}"
+        os.rename(directory, os.path.join(parent, previous))
+
+    version = f"{prefix}{time.time_ns()}"
+    os.rename(staging, os.path.join(parent, version))
+    link = os.path.join(parent, f"{version}.link")
+    os.symlink(version, link)
+    os.replace(link, directory)
+
+    for entry in os.listdir(parent):
+        if entry.startswith(prefix) and entry[len(prefix):].isdigit() and entry not in (version, previous):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def export_from_chroma(persist_directory: str, directory: str, quantize: bool = False):
+    from langchain_chroma import Chroma
+    from utils.embedding_engine import EMBEDDING_MODEL
+    store = Chroma(persist_directory=resolve_directory(persist_directory))
+    data = store.get(include=["embeddings", "documents"])
+    build_index(data["documents"], data["embeddings"], directory, quantize=quantize,
+                model_name=EMBEDDING_MODEL)
+    return len(data["documents"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Chroma chatbot store into a memory-mapped vector index.")
+    parser.add_argument("--chroma", default="chroma_db", help="Chroma persist directory to read")
+    parser.add_argument("--out", default="vector_index", help="index directory to write")
+    parser.add_argument("--int8", action="store_true", help="store int8-quantized rows with per-row scales")
+    args = parser.parse_args()
+    count = export_from_chroma(args.chroma, args.out, quantize=args.int8)
+    print(f"Wrote {count} vectors to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+from collections import Counter
+from db import cibil_history_collection
+from utils.cibil_utils import suggestion_store, suggestion_signature, generate_improvement_suggestions, SUGGESTION_STORE_DIR
+from utils.llm_gateway import llm_gateway
+
+
+async def warm_up(top: int, scan_limit: int):
+    counts = Counter()
+    samples = {}
+    cursor = (
+        cibil_history_collection
+        .find({}, {"inputs": 1, "outputs": 1})
+        .sort("created_at", -1)
+        .limit(scan_limit)
+    )
+    async for doc in cursor:
+        inputs = doc.get("inputs")
+        outputs = doc.get("outputs") or {}
+        if not inputs or not outputs.get("breakdown"):
+            continue
+        key = suggestion_signature(inputs, outputs["breakdown"])
+        counts[key] += 1
+        samples.setdefault(key, doc)
+
+    totals = Counter()
+
+    async def warm(key):
+        if await suggestion_store.get(key) is not None:
+            totals["cached"] += 1
+            return
+        # Suggestions saved in history are filled in with that user's exact
+        # figures, so they are never copied into the shared store.
+        inputs, outputs = samples[key]["inputs"], samples[key]["outputs"]
+        try:
+            await suggestion_store.get_or_create(
+                key, lambda: generate_improvement_suggestions(inputs, outputs["cibil_score"], outputs["breakdown"])
+            )
+            totals["generated"] += 1
+        except Exception as e:
+            totals["failed"] += 1
+            print(f"Warning: could not generate suggestions for {key}: {e}")
+
+    await asyncio.gather(*(warm(key) for key, _ in counts.most_common(top)))
+    await llm_gateway.aclose()
+
+    covered = sum(count for key, count in counts.most_common(top))
+    print(
+        f"Scanned {sum(counts.values())} records with {len(counts)} distinct breakdowns; "
+        f"top {min(top, len(counts))} cover {covered} records. "
+        f"cached={totals['cached']} "
+        f"generated={totals['generated']} failed={totals['failed']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate CIBIL improvement suggestions for the most common breakdowns.")
+    parser.add_argument("--top", type=int, default=500, help="number of most frequent breakdowns to warm")
+    parser.add_argument("--scan-limit", type=int, default=100000, help="how many recent cibil_history records to scan")
+    args = parser.parse_args()
+
+    if not SUGGESTION_STORE_DIR:
+        raise SystemExit("SUGGESTION_STORE_DIR must be set so warmed suggestions persist to disk.")
+
+    asyncio.run(warm_up(args.top, args.scan_limit))
+    suggestion_store.store.close()
+
+
+if __name__ == "__main__":
+    main()
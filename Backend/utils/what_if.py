@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+from utils.loader import model_state
+from utils.inference_engine import FEATURES, compiled_for, score
+from utils.metrics import stage
+
+load_dotenv()
+
+WHAT_IF_MAX_SCENARIOS = int(os.getenv("WHAT_IF_MAX_SCENARIOS", "10000"))
+WHAT_IF_DEFAULT_POINTS = 20
+
+# Same cut as the history rollups: approve_chances > 50.
+APPROVAL_THRESHOLD = 0.5
+
+
+class InvalidSweep(Exception):
+    pass
+
+
+def sweep_values(sweep):
+    if sweep.values is not None:
+        if sweep.start is not None or sweep.stop is not None:
+            raise InvalidSweep(f"{sweep.feature}: give either values or start/stop, not both")
+        count = len(set(sweep.values))
+    elif sweep.start is not None and sweep.stop is not None:
+        if sweep.stop < sweep.start:
+            raise InvalidSweep(f"{sweep.feature}: stop must not be below start")
+        if sweep.step is not None and sweep.num is not None:
+            raise InvalidSweep(f"{sweep.feature}: give either step or num, not both")
+        count = (sweep.stop - sweep.start) // sweep.step + 1 if sweep.step else (sweep.num or WHAT_IF_DEFAULT_POINTS)
+    else:
+        raise InvalidSweep(f"{sweep.feature}: give either values or start and stop")
+
+    # Checked before anything is allocated.
+    if count == 0:
+        raise InvalidSweep(f"{sweep.feature}: no values to sweep")
+    if count > WHAT_IF_MAX_SCENARIOS:
+        raise InvalidSweep(f"{sweep.feature}: {count} values exceed the {WHAT_IF_MAX_SCENARIOS} scenario limit")
+
+    if sweep.values is not None:
+        return np.unique(np.array(sweep.values, dtype=np.int64))
+    if sweep.step:
+        return np.arange(sweep.start, sweep.stop + 1, sweep.step, dtype=np.int64)
+    # Features are integers, so nearby grid points may round to the same value.
+    return np.unique(np.rint(np.linspace(sweep.start, sweep.stop, count)).astype(np.int64))
+
+
+def build_scenarios(pipeline, application, sweeps):
+    """One row per grid point (row-major over the sweeps), then the base application."""
+    features = [sweep.feature for sweep in sweeps]
+    if len(set(features)) != len(features):
+        raise InvalidSweep("each feature can only be swept once")
+    axes = [sweep_values(sweep) for sweep in sweeps]
+    shape = tuple(len(axis) for axis in axes)
+    count = int(np.prod(shape))
+    if count > WHAT_IF_MAX_SCENARIOS:
+        raise InvalidSweep(f"{count} scenarios exceed the limit of {WHAT_IF_MAX_SCENARIOS}")
+
+    base = compiled_for(pipeline).encode([application])
+    matrix = np.repeat(base, count + 1, axis=0)
+    for feature, grid in zip(features, np.meshgrid(*axes, indexing="ij")):
+        matrix[:count, FEATURES.index(feature)] = grid.ravel()
+    return features, axes, shape, matrix
+
+
+def predict_scenarios(pipeline, explainer, matrix, include_shap: bool):
+    if include_shap:
+        return score(pipeline, explainer, matrix)
+    with stage("scale"):
+        scaled = compiled_for(pipeline).scale_rows(matrix)
+    with stage("predict_proba"):
+        return pipeline.named_steps['model'].predict_proba(scaled)[:, 1], None
+
+
+def approval_boundary(features, axes, approved):
+    """Where approval flips along the first swept feature, for every point on the others."""
+    values = axes[0]
+    slices = []
+    for index in np.ndindex(*approved.shape[1:]):
+        line = approved[(slice(None),) + index]
+        flips = np.nonzero(line[1:] != line[:-1])[0]
+        slices.append({
+            "at": {feature: int(axis[i]) for feature, axis, i in zip(features[1:], axes[1:], index)},
+            "approved_min": int(values[line].min()) if line.any() else None,
+            "approved_max": int(values[line].max()) if line.any() else None,
+            "transitions": [
+                {"between": [int(values[i]), int(values[i + 1])], "approved_above": bool(line[i + 1])}
+                for i in flips
+            ]
+        })
+    return {"feature": features[0], "slices": slices}
+
+
+def run_what_if(request):
+    # One model handle for the whole grid, like predict_batch_with_shap.
+    pipeline, explainer, model_info = model_state.get()
+    features, axes, shape, matrix = build_scenarios(pipeline, request.application, request.sweeps)
+    predictions, contributions = predict_scenarios(pipeline, explainer, matrix, request.include_shap)
+
+    predictions = np.asarray(predictions, dtype=np.float64)
+    base_prediction, predictions = predictions[-1], predictions[:-1]
+    approved = (predictions > APPROVAL_THRESHOLD).reshape(shape)
+    result = {
+        "model_version": str(model_info.version) if model_info is not None else None,
+        "scenarios": int(predictions.size),
+        "base_approve_chances": round(float(base_prediction) * 100, 2),
+        "axes": {feature: axis.tolist() for feature, axis in zip(features, axes)},
+        "approve_chances": np.round(predictions * 100, 2).reshape(shape).tolist(),
+        "approved_scenarios": int(approved.sum()),
+        "boundary": approval_boundary(features, axes, approved),
+    }
+    if contributions is not None:
+        contributions = contributions[:-1].round(4)
+        result["shap_values"] = {
+            feature: contributions[:, i].reshape(shape).tolist() for i, feature in enumerate(FEATURES)
+        }
+    return result
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import random
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+load_dotenv()
+
+HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", "100"))
+HISTORY_FLUSH_MS = float(os.getenv("HISTORY_FLUSH_MS", "200"))
+HISTORY_BUFFER_LIMIT = int(os.getenv("HISTORY_BUFFER_LIMIT", "5000"))
+HISTORY_WRITE_RETRIES = int(os.getenv("HISTORY_WRITE_RETRIES", "5"))
+
+DUPLICATE_KEY = 11000
+
+
+def _is_transient(error):
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label("RetryableWriteError")
+
+
+def _backoff(attempt):
+    return min(2.0, 0.05 * 2 ** attempt) * (0.5 + random.random())
+
+
+class WriteBehindBuffer:
+    """Queues documents and writes them with insert_many in the background.
+
+    Documents get a client-side _id when queued, so callers can reference the
+    record right away and a retried batch can never insert it twice. A batch
+    is written when it reaches max_batch or when the oldest queued document
+    is max_age_ms old. add() waits while max_pending documents are queued.
+    on_flush, if given, is awaited with every batch after it is written and
+    retried like the insert when it fails with a transient error.
+    """
+
+    def __init__(self, collection, max_batch: int = 100, max_age_ms: float = 200,
+                 max_pending: int = 5000, retries: int = 5, on_flush=None):
+        self.collection = collection
+        self.max_batch = max(1, max_batch)
+        self.max_age = max(0.0, max_age_ms) / 1000
+        self.max_pending = max(self.max_batch, max_pending)
+        self.retries = max(0, retries)
+        self.on_flush = on_flush
+        self._pending = []
+        self._unwritten = set()
+        self._loop = None
+        self._worker = None
+        self._wakeup = None
+        self._space = None
+        self._flush_lock = None
+        self._closing = False
+        self._counts = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0,
+                        "backpressure_waits": 0, "hook_retries": 0, "hook_failures": 0}
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._flush_lock = asyncio.Lock()
+            self._worker = loop.create_task(self._run())
+
+    async def add(self, doc) -> ObjectId:
+        self._ensure_worker()
+        if len(self._pending) >= self.max_pending:
+            self._counts["backpressure_waits"] += 1
+            self._wakeup.set()
+            async with self._space:
+                await self._space.wait_for(lambda: len(self._pending) < self.max_pending)
+
+        doc.setdefault("_id", ObjectId())
+        self._pending.append(doc)
+        self._unwritten.add(doc["_id"])
+        self._counts["queued"] += 1
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return doc["_id"]
+
+    async def update_one(self, _id, update):
+        # A record still in the buffer is written first so the update
+        # always finds it.
+        if _id in self._unwritten:
+            await self.flush()
+        return await self.collection.update_one({"_id": _id}, update)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_age)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush(None if self._closing else self.max_batch)
+            if self._closing:
+                return
+
+    async def flush(self, limit: int = None):
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+                async with self._space:
+                    self._space.notify_all()
+                await self._write(batch)
+                if limit is not None:
+                    limit -= len(batch)
+                    if limit <= 0:
+                        break
+
+    async def _write(self, batch):
+        attempt = 0
+        written = batch
+        while True:
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                break
+            except BulkWriteError as e:
+                # Duplicate keys mean an earlier attempt reached the server
+                # before failing; anything else is a bad document.
+                failed = {
+                    error["index"] for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                }
+                if failed:
+                    print(f"Warning: dropping {len(failed)} of {len(batch)} {self.collection.name} records: {e.details['writeErrors'][:1]}")
+                    self._counts["dropped"] += len(failed)
+                    written = [doc for index, doc in enumerate(batch) if index not in failed]
+                break
+            except Exception as e:
+                if not _is_transient(e) or attempt >= self.retries:
+                    print(f"Warning: dropping {len(batch)} {self.collection.name} records after {attempt + 1} attempts: {e}")
+                    self._counts["dropped"] += len(batch)
+                    self._unwritten.difference_update(doc["_id"] for doc in batch)
+                    return
+                attempt += 1
+                self._counts["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+
+        self._unwritten.difference_update(doc["_id"] for doc in batch)
+        self._counts["written"] += len(written)
+        self._counts["batches"] += 1
+        if self.on_flush is not None and written:
+            await self._after_write(written)
+
+    async def _after_write(self, written):
+        # Transient failures are retried like the insert; a hook that still
+        # fails is counted, and the records stay written.
+        attempt = 0
+        while True:
+            try:
+                await self.on_flush(written)
+                return
+            except Exception as e:
+                if not _is_transient(e) or attempt >= self.retries:
+                    print(f"Warning: post-write hook failed for {len(written)} {self.collection.name} records after {attempt + 1} attempts: {e}")
+                    self._counts["hook_failures"] += 1
+                    return
+                attempt += 1
+                self._counts["hook_retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+
+    async def close(self):
+        # The worker is asked to drain and exit rather than cancelled, so a
+        # batch is never abandoned halfway through a write.
+        if self._worker is not None and not self._worker.done():
+            self._closing = True
+            self._wakeup.set()
+            try:
+                await self._worker
+            finally:
+                self._closing = False
+        self._worker = None
+        if self._pending:
+            await self.flush()
+
+    def stats(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_age_ms": self.max_age * 1000,
+            "max_pending": self.max_pending,
+            "pending": len(self._pending),
+            "avg_batch_size": round(self._counts["written"] / self._counts["batches"], 2) if self._counts["batches"] else 0.0,
+            **self._counts,
+        }
@@ -24,7 +24,10 @@ export default function HistoryPage() {
   const [activeTab, setActiveTab] = useState<'loan' | 'cibil'>('loan');
   const [loanHistory, setLoanHistory] = useState<LoanHistoryItem[]>([]);
   const [cibilHistory, setCibilHistory] = useState<CIBILHistoryItem[]>([]);
+  const [loanCursor, setLoanCursor] = useState<string | null>(null);
+  const [cibilCursor, setCibilCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [expandedItems, setExpandedItems] = useState<Record<string, boolean>>({});
 
@@ -33,11 +36,13 @@ export default function HistoryPage() {
     setError('');
     try {
       const [loanRes, cibilRes] = await Promise.all([
-        apiService.getLoanHistory().catch(() => ({ loan_history: [] })),
-        apiService.getCibilHistory().catch(() => ({ cibil_history: [] }))
+        apiService.getLoanHistory().catch(() => ({ loan_history: [], next_cursor: null })),
+        apiService.getCibilHistory().catch(() => ({ cibil_history: [], next_cursor: null }))
       ]);
       setLoanHistory(loanRes.loan_history || []);
       setCibilHistory(cibilRes.cibil_history || []);
+      setLoanCursor(loanRes.next_cursor || null);
+      setCibilCursor(cibilRes.next_cursor || null);
     } catch (err: unknown) {
       const msg = err instanceof Error ? err.message : 'Failed to fetch history';
       setError(msg);
@@ -46,6 +51,28 @@ export default function HistoryPage() {
     }
   };
 
+  // The history endpoints return one page at a time; next_cursor fetches the next one.
+  const loadMore = async (tab: 'loan' | 'cibil') => {
+    setLoadingMore(true);
+    setError('');
+    try {
+      if (tab === 'loan' && loanCursor) {
+        const res = await apiService.getLoanHistory(loanCursor);
+        setLoanHistory((prev) => [...prev, ...(res.loan_history || [])]);
+        setLoanCursor(res.next_cursor || null);
+      } else if (tab === 'cibil' && cibilCursor) {
+        const res = await apiService.getCibilHistory(cibilCursor);
+        setCibilHistory((prev) => [...prev, ...(res.cibil_history || [])]);
+        setCibilCursor(res.next_cursor || null);
+      }
+    } catch (err: unknown) {
+      const msg = err instanceof Error ? err.message : 'Failed to fetch history';
+      setError(msg);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchHistory();
   }, []);
@@ -107,7 +134,7 @@ export default function HistoryPage() {
               }`}
             >
               <FileText className="w-5 h-5" />
-              Loan Application History ({loanHistory.length})
+              Loan Application History ({loanHistory.length}{loanCursor ? '+' : ''})
             </button>
             <button
               onClick={() => setActiveTab('cibil')}
@@ -118,7 +145,7 @@ export default function HistoryPage() {
               }`}
             >
               <CreditCard className="w-5 h-5" />
-              CIBIL Score History ({cibilHistory.length})
+              CIBIL Score History ({cibilHistory.length}{cibilCursor ? '+' : ''})
             </button>
           </div>
 
@@ -285,6 +312,15 @@ export default function HistoryPage() {
                           </div>
                         );
                       })}
+                      {loanCursor && (
+                        <button
+                          onClick={() => loadMore('loan')}
+                          disabled={loadingMore}
+                          className="w-full py-3 bg-white border border-gray-300 rounded-xl shadow-sm hover:bg-gray-50 text-gray-700 font-medium transition"
+                        >
+                          {loadingMore ? 'Loading...' : 'Load More'}
+                        </button>
+                      )}
                     </div>
                   )}
                 </div>
@@ -435,6 +471,15 @@ export default function HistoryPage() {
                           </div>
                         );
                       })}
+                      {cibilCursor && (
+                        <button
+                          onClick={() => loadMore('cibil')}
+                          disabled={loadingMore}
+                          className="w-full py-3 bg-white border border-gray-300 rounded-xl shadow-sm hover:bg-gray-50 text-gray-700 font-medium transition"
+                        >
+                          {loadingMore ? 'Loading...' : 'Load More'}
+                        </button>
+                      )}
                     </div>
                   )}
                 </div>
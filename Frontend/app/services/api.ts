@@ -93,6 +93,7 @@ export interface LoanHistoryItem {
 
 export interface LoanHistoryResponse {
   loan_history: LoanHistoryItem[];
+  next_cursor: string | null;
 }
 
 export interface CIBILHistoryItem {
@@ -109,6 +110,7 @@ export interface CIBILHistoryItem {
 
 export interface CIBILHistoryResponse {
   cibil_history: CIBILHistoryItem[];
+  next_cursor: string | null;
 }
 
 // Generic API call function
@@ -204,14 +206,16 @@ export const apiService = {
   },
 
   // History
-  getLoanHistory: async (): Promise<LoanHistoryResponse> => {
-    return apiCall<LoanHistoryResponse>('/history/loan', {
+  getLoanHistory: async (cursor?: string): Promise<LoanHistoryResponse> => {
+    const params = cursor ? `?${new URLSearchParams({ cursor })}` : '';
+    return apiCall<LoanHistoryResponse>(`/history/loan${params}`, {
       method: 'GET',
     });
   },
 
-  getCibilHistory: async (): Promise<CIBILHistoryResponse> => {
-    return apiCall<CIBILHistoryResponse>('/history/cibil', {
+  getCibilHistory: async (cursor?: string): Promise<CIBILHistoryResponse> => {
+    const params = cursor ? `?${new URLSearchParams({ cursor })}` : '';
+    return apiCall<CIBILHistoryResponse>(`/history/cibil${params}`, {
       method: 'GET',
     });
   },